@@ -1,21 +1,29 @@
 from math import sqrt, atan2, pi
 
 import numpy as np
-from scipy.optimize import fsolve
 
 from Robot import Robot, WorkspaceViolation
 
 
 class Delta(Robot):
-    def __init__(self, stepper_mode=1 / 32, steps_per_rev=200, step_delay=0.0208):
+    __slots__ = ()
+
+    # [R, r, l1, l2]
+    # R - distance from base center to driven joints
+    # r - distance from end-effector center to joints
+    # l1 - length of bar between driven joint and first undriven joint
+    # l2 - length of bar between first and second undriven joint
+    GEOMETRY = [41.7, 27.6, 48.6, 166.8]
+
+    # Sampling grid of the workspace map: (min, max, resolution) for [x, y, z] in [mm].
+    # The homing pose (z = -214.8) is the lowest pose, the cells start a bit above it, so its cell is reachable
+    WORKSPACE_BOUNDS = [(-80, 80, 4), (-80, 80, 4), (-214, -98, 4)]
+
+    def __init__(self, stepper_mode=1 / 32, steps_per_rev=200, step_delay=0.0208, pins=None, scheduler=None):
         super().__init__(dof=3, stepper_mode=stepper_mode, steps_per_rev=steps_per_rev, step_delay=step_delay,
-                         rot_comp=np.array([-1] * 3))
-        # [R, r, l1, l2]
-        # R - distance from base center to driven joints
-        # r - distance from end-effector center to joints
-        # l1 - length of bar between driven joint and first undriven joint
-        # l2 - length of bar between first and second undriven joint
-        self.geometricParams = [41.7, 27.6, 48.6, 166.8]
+                         rot_comp=np.array([-1] * 3), pins=pins, scheduler=scheduler)
+        self.geometricParams = list(self.GEOMETRY)  # can be changed in the configuration (see config.py)
+        self.workspaceBounds = list(self.WORKSPACE_BOUNDS)
 
     def inv_kinematic(self, pose: list):
         R, r, l1, l2 = self.geometricParams
@@ -72,29 +80,13 @@ class Delta(Robot):
         return thetas
 
     def forward_kinematic(self, angles):
-        angles_as_np_array = np.array(angles)  # convert to numpy array to subtract from another array
-
-        # create function to minimize
-        def func(x, h1=angles_as_np_array):
-            """This function returns the difference between the current position (`H1`) and a guess (`X`).
-            It is used for the numeric fsolve."""
-
-            motor_angles = self.inv_kinematic(x)
-            h2 = np.array(motor_angles)
-
-            difference = h1 - h2  # calculate the difference between calulated and real angles
-
-            return difference
-
         # initial guess/startingvalue
         # (first arm is pointing downward, pythagoras for second arm and effector/base radii)
         R, r, l1, l2 = self.geometricParams
         z = l1 + sqrt(l2 ** 2 - (R - r) ** 2)
         x_0 = np.array([0.0, 0.0, -z])
 
-        curr_pose = fsolve(func, x_0)  # solve numerically with initial guess
-
-        return list(curr_pose)
+        return self.solve_forward_kinematic(angles, x_0)
 
     def change_robot_dimensions(self, R, r, l1, l2, *_):
         self.geometricParams = [R, r, l1, l2]
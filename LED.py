@@ -1,61 +1,103 @@
-import time
+import logging
+from threading import RLock
+
 import RPi.GPIO as GPIO
 from Robot import Robot
+from scheduler import shared_wheel
+
+# LED colours (index into Robot.LED_Pins)
+RED = 0
+GREEN = 1
+BLUE = 2
+
+# Blink patterns as alternating on/off durations in [s] ('off' and 'on' are static)
+PATTERNS = {
+    'blink': (0.25, 0.25),
+    'fast': (0.1, 0.1),
+    'slow': (1.0, 1.0),
+    'heartbeat': (0.1, 0.15, 0.1, 0.65),
+}
+
+# old numeric modes of change_led
+MODES = {0: 'off', 1: 'on', 2: 'blink'}
+
+
+class LEDController:
+    """ Keeps the state of the status LEDs. GPIO-pins are only written if their level changes and
+        blink patterns run on the shared timer wheel instead of an own thread """
+
+    def __init__(self, pins=Robot.LED_Pins, wheel=None):
+        self.pins = list(pins)
+        self.wheel = shared_wheel() if wheel is None else wheel
+        self._lock = RLock()
+        self._patterns = ['off'] * len(self.pins)  # current pattern of every colour
+        self._levels = [GPIO.LOW] * len(self.pins)  # current level of every pin
+        self._timers = [None] * len(self.pins)  # running blink timer of every colour
+
+        GPIO.setmode(GPIO.BCM)  # use GPIO numbers (NOT pin numbers)
+        for pin in self.pins:
+            GPIO.setup(pin, GPIO.OUT)
+            GPIO.output(pin, GPIO.LOW)
+
+    def set(self, colour: int, pattern: str):
+        """ Sets LED `colour` to `pattern` ('off', 'on' or a name from PATTERNS).
+            Does nothing if the LED already shows this pattern """
+        if pattern not in ('off', 'on') and pattern not in PATTERNS:
+            raise ValueError(f'Unknown LED pattern: {pattern}')
+
+        with self._lock:
+            if self._patterns[colour] == pattern:
+                return
+
+            self._patterns[colour] = pattern
+            if self._timers[colour] is not None:
+                self.wheel.cancel(self._timers[colour])
+                self._timers[colour] = None
+
+            if pattern == 'off':
+                self._write(colour, GPIO.LOW)
+            elif pattern == 'on':
+                self._write(colour, GPIO.HIGH)
+            else:
+                self._blink(colour, pattern, 0)
+
+    def _blink(self, colour, pattern, phase):
+        """ one phase of a blink pattern, schedules the next one """
+        with self._lock:
+            if self._patterns[colour] != pattern:
+                return  # pattern was changed in the meantime
+
+            durations = PATTERNS[pattern]
+            self._write(colour, GPIO.HIGH if phase % 2 == 0 else GPIO.LOW)
+            self._timers[colour] = self.wheel.schedule(durations[phase], self._blink, colour, pattern,
+                                                       (phase + 1) % len(durations))
+
+    def _write(self, colour, level):
+        if self._levels[colour] != level:
+            GPIO.output(self.pins[colour], level)
+            self._levels[colour] = level
+
+    def all_off(self):
+        for colour in range(len(self.pins)):
+            self.set(colour, 'off')
+
+
+controller = None
+
 
-from main import stop_blink
 def init_led():
     """ initial Setup for the LED """
 
-    global colour
-    colour = Robot.LED_Pins[0]
-     
-
-def change_led(f,m):
-    """ first attribute sets colour of LED second sets mode of LED"""
-    
-    i = Robot.LED_Pins[f]
-    if m == 0:
-        # LED is off
-        global stop_blink
-        stop_blink = 1
-        GPIO.setmode(GPIO.BCM)  # use GPIO numbers (NOT pin numbers)
-        GPIO.setup(i, GPIO.OUT)
-        GPIO.output(i, GPIO.LOW)
-        
-    elif m == 1:
-        # LED is on
-        stop_blink = 1
-        GPIO.setmode(GPIO.BCM)  # use GPIO numbers (NOT pin numbers)
-        GPIO.setup(i, GPIO.OUT)
-        GPIO.output(i, GPIO.HIGH)
-
-    elif m == 2:
-        # LED flashes
-        global colour
-        colour = Robot.LED_Pins[f]
-        stop_blink = 0
-
-def blink_led():
-    """ Turns the desired LED into endless blinking mode """
-    
-   
-    while True:
-        
-        
-        farbe = colour
-        modus = stop_blink
-        if modus == 0:
-            
-            GPIO.setmode(GPIO.BCM)  # use GPIO numbers (NOT pin numbers)
-            GPIO.setup(farbe, GPIO.OUT)
-            GPIO.output(farbe, GPIO.HIGH)
-            time.sleep(0.25)
-            GPIO.output(farbe, GPIO.LOW)
-            time.sleep(0.25)
-        elif modus == 1:
-            
-            GPIO.setmode(GPIO.BCM)  # use GPIO numbers (NOT pin numbers)
-            GPIO.setup(farbe, GPIO.OUT)
-            GPIO.output(farbe, GPIO.LOW)
-            time.sleep(1.5)
-   
+    global controller
+    controller = LEDController()
+
+
+def change_led(f, m):
+    """ first attribute sets colour of LED second sets mode of LED
+        (0: off, 1: on, 2: flashes or the name of a pattern) """
+
+    if controller is None:
+        logging.debug('LEDs are not initialised yet')
+        return
+
+    controller.set(f, MODES.get(m, m))
@@ -1,9 +1,6 @@
 from math import atan2, sqrt, cos, sin, pi
-from operator import inv
 
 import numpy as np
-from kinematics import for_kinematic, inv_kinematic
-from scipy.optimize import fsolve
 from math import radians as rad
 from math import degrees as deg
 
@@ -11,15 +8,23 @@ from Robot import Robot, WorkspaceViolation
 
 
 class Quattro(Robot):
-    def __init__(self, stepper_mode=1 / 32, steps_per_rev=200, step_delay=0.0208):
+    __slots__ = ()
+
+    # [R, a, l1, l2]
+    # R - distance from base center to driven joints
+    # a - length of an end-effector bar
+    # l1 - length of bar between driven joint and first undriven joint
+    # l2 - length of bar between first and second undriven joint
+    GEOMETRY = [55.6, 39.3, 75.8, 166.8]
+
+    # Sampling grid of the workspace map: (min, max, resolution) for [x, y, z] in [mm] and phi in [rad]
+    WORKSPACE_BOUNDS = [(-80, 80, 5), (-80, 80, 5), (-245, -120, 5), (0.2, 1.2, 0.1)]
+
+    def __init__(self, stepper_mode=1 / 32, steps_per_rev=200, step_delay=0.0208, pins=None, scheduler=None):
         super().__init__(dof=4, stepper_mode=stepper_mode, steps_per_rev=steps_per_rev, step_delay=step_delay,
-                         rot_comp=np.array([-1] * 4))
-        # [R, a, l1, l2]
-        # R - distance from base center to driven joints
-        # a - length of an end-effector bar
-        # l1 - length of bar between driven joint and first undriven joint
-        # l2 - length of bar between first and second undriven joint
-        self.geometricParams = [55.6, 39.3, 75.8, 166.8]
+                         rot_comp=np.array([-1] * 4), pins=pins, scheduler=scheduler)
+        self.geometricParams = list(self.GEOMETRY)  # can be changed in the configuration (see config.py)
+        self.workspaceBounds = list(self.WORKSPACE_BOUNDS)
 
     def inv_kinematic(self, pose: list):
         R, a, l1, l2 = self.geometricParams
@@ -84,29 +89,13 @@ class Quattro(Robot):
         return thetas
 
     def forward_kinematic(self, angles):
-        angles_as_np_array = np.array(angles)  # convert to numpy array to subtract from another array
-
-        # create function to minimize
-        def func(x, h1=angles_as_np_array):
-            """This function returns the difference between the current position (`H1`) and a guess (`X`).
-            It is used for the numeric fsolve."""
-
-            motor_angles = self.inv_kinematic(x)
-            h2 = np.array(motor_angles)
-
-            difference = h1 - h2  # calculate the difference between calulated and real angles
-
-            return difference
-
         # initial guess/startingvalue
         # (first arm is pointing downward, pythagoras for second arm and effector/base radii)
         R, a, l1, l2 = self.geometricParams
         z = l1 + sqrt(l2 ** 2 - (R - a / sqrt(2)) ** 2)
         x_0 = np.array([0.0, 0.0, -z, pi / 4])
 
-        curr_pose = fsolve(func, x_0)  # solve numerically with initial guess
-
-        return list(curr_pose)
+        return self.solve_forward_kinematic(angles, x_0)
 
     def change_robot_dimensions(self, R, a, l1, l2, *_):
         self.geometricParams = [R, a, l1, l2]
@@ -1,12 +1,15 @@
 import abc
 import logging
 import math as m
+import threading
 import time
+from collections import OrderedDict
 
 import RPi.GPIO as GPIO
 import numpy as np
 
 import stepper
+import trajectory
 from slerp import slerp_pose, angle_to_turn
 
 
@@ -15,34 +18,127 @@ class WorkspaceViolation(ValueError):
 
 
 class Robot(metaclass=abc.ABCMeta):
+    # fixed attribute layout: no per-instance dict on the motion path
+    __slots__ = ('dof', 'M0', 'M1', 'M2', 'dirPins', 'stepPins', 'lightbarrierpins', 'ledpins', 'enablePin',
+                 'rotation_compensation', 'currPose', 'currSteps', 'homePose', 'workspaceBounds',
+                 '_geometricParams', '_stepCache', 'cacheHits', 'cacheMisses', 'stepsPerRev', 'baseStepDelay',
+                 '_stepperMode', 'stepAngle', 'stepDelay', '_stepBuf', '_movBuf', '_angleBuf', 'scheduler',
+                 '_motion', '_stepCorrection', '_correctionLock', 'axisStepDelays', 'axisAccelerations')
+
     DIR_PINS = [13, 5, 9, 22, 17, 3]
     STEP_PINS = [6, 11, 10, 27, 4, 2]
     Lightbarrier_Pins = [14, 15, 23, 24, 25, 8]
     LED_Pins = [18, 19 ,12]
+    MODE_PINS = [21, 20, 16]  # microstep pins M0, M1, M2
+    ENABLE_PIN = 0
+
+    STEP_CACHE_SIZE = 4096  # maximum number of poses kept in the step cache
+    POSE_QUANTUM = 1e-3  # resolution of the cache keys in [mm] and [rad]
+
+    LIN_TOLERANCE = m.radians(0.1)  # motor angle the joint path of a linear move may deviate from its line [rad]
+    SEGMENT_STEPS = 16  # most steps of a motor between two samples of the spline of a path (see `follow_path`)
 
-    def __init__(self, dof, stepper_mode, steps_per_rev, step_delay, rot_comp):
+    def __init__(self, dof, stepper_mode, steps_per_rev, step_delay, rot_comp, pins=None, scheduler=None):
+        """
+        `pins`: GPIO pins of this robot as dict with the keys 'dir', 'step', 'lightbarrier', 'led', 'mode' (M0, M1, M2)
+        and 'enable'. Missing keys use the pins of the class (several robots on one Raspberry Pi need own pins)
+        `scheduler`: stepper.StepScheduler shared with other robots (the robot makes its own pulses if not given)
+        """
         self.dof = dof
+        pins = pins or {}
 
         # Robot GPIO-pins:
-        self.M0 = 21
-        self.M1 = 20
-        self.M2 = 16
-        self.dirPins = self.DIR_PINS[:dof]
-        self.stepPins = self.STEP_PINS[:dof]
-        self.lightbarrierpins = self.Lightbarrier_Pins[:dof]
-        self.ledpins = self.LED_Pins[:3]
-        self.enablePin = 0
-        self.rotation_compensation = rot_comp
-
-        self.currPose = [0.0] * dof  # current pose of the robot: [x, y, z, alpha, beta, gamma]
-        self.currSteps = [0] * dof  # current motorangles as steps #TODO: this varriable is not updated yet
-        self.homePose = [0.0] * dof # homing pose of robot: [x, y, z, alpha, beta, gamma]
-
-        self.stepAngle = stepper_mode * 2 * m.pi / steps_per_rev  # angle corresponding to one step
-        self.stepperMode = stepper_mode  # set mode to class variable
-        self.stepDelay = stepper_mode * step_delay  # calculate time between steps
+        self.M0, self.M1, self.M2 = pins.get('mode', self.MODE_PINS)
+        self.dirPins = list(pins.get('dir', self.DIR_PINS))[:dof]
+        self.stepPins = list(pins.get('step', self.STEP_PINS))[:dof]
+        self.lightbarrierpins = list(pins.get('lightbarrier', self.Lightbarrier_Pins))[:dof]
+        self.ledpins = list(pins.get('led', self.LED_Pins))[:3]
+        self.enablePin = pins.get('enable', self.ENABLE_PIN)
+        self.scheduler = scheduler
+        self.rotation_compensation = np.asarray(rot_comp, dtype=np.int32)
+
+        # Motion state is kept in preallocated arrays which are only updated in place
+        self.currPose = np.zeros(dof, dtype=np.float64)  # current pose of the robot: [x, y, z, alpha, beta, gamma]
+        self.currSteps = np.zeros(dof, dtype=np.int32)  # current motorangles as steps
+        self.homePose = np.zeros(dof, dtype=np.float64)  # homing pose of robot: [x, y, z, alpha, beta, gamma]
+
+        # Scratch buffers for the step calculations of one movement
+        self._stepBuf = np.zeros(dof, dtype=np.int32)  # steps to move
+        self._movBuf = np.zeros(dof, dtype=np.int32)  # steps to move with rotation compensation
+        self._angleBuf = np.zeros(dof, dtype=np.float64)  # angles in steps (before rounding)
+
+        # Progress of the running movement (start steps, direction and step counter per motor) and corrections of
+        # the step count found while moving (see `live_steps` and `correct_steps`)
+        self._motion = None
+        self._stepCorrection = np.zeros(dof, dtype=np.int32)
+        self._correctionLock = threading.Lock()
+
+        # LRU cache of already calculated poses: quantized pose -> steps
+        self._stepCache = OrderedDict()
+        self.cacheHits = 0
+        self.cacheMisses = 0
+
+        self.stepsPerRev = steps_per_rev
+        self.baseStepDelay = step_delay
+        # limits of every motor found by tuning (full-step delay [s] and acceleration [full steps/s²]), see
+        # `step_limits`. None: all motors use the step delay of the robot without an acceleration limit
+        self.axisStepDelays = None
+        self.axisAccelerations = None
+        self._stepperMode = None
+        self.stepperMode = stepper_mode  # set mode to class variable (also sets step angle and delay)
         self.init_gpio()  # initialise needed GPIO-pins
 
+    @property
+    def stepperMode(self):
+        return self._stepperMode
+
+    @stepperMode.setter
+    def stepperMode(self, stepper_mode):
+        if self._stepperMode is not None:
+            # keep the current motor angles when the step size changes
+            self.currSteps[:] = np.rint(self.currSteps * (self._stepperMode / stepper_mode))
+
+        self._stepperMode = stepper_mode
+        self.stepAngle = stepper_mode * 2 * m.pi / self.stepsPerRev  # angle corresponding to one step
+        self.stepDelay = stepper_mode * self.baseStepDelay  # calculate time between steps
+        self.clear_step_cache()  # cached steps belong to the old step size
+
+    @property
+    def geometricParams(self):
+        return self._geometricParams
+
+    @geometricParams.setter
+    def geometricParams(self, params):
+        self._geometricParams = params
+        self.clear_step_cache()  # cached steps belong to the old dimensions
+
+    def step_limits(self):
+        """
+        `returns`: steps per second every motor can make and its acceleration [steps/s²] (None: unlimited),
+        both in steps of the current stepper mode
+        """
+        if self.axisStepDelays is None:
+            rates = np.full(self.dof, 1 / (2 * self.stepDelay))  # one step takes a pulse and a pause
+        else:
+            rates = 1 / (2 * self.stepperMode * np.asarray(self.axisStepDelays, dtype=np.float64))
+        if self.axisAccelerations is None:
+            return rates, None
+        return rates, np.asarray(self.axisAccelerations, dtype=np.float64) / self.stepperMode
+
+    def clear_step_cache(self):
+        """Removes all poses from the step cache (the hit-rate counters are kept)"""
+        self._stepCache.clear()
+
+    def cache_info(self):
+        """returns the statistics of the step cache as dict"""
+        calls = self.cacheHits + self.cacheMisses
+        return {
+            'hits': self.cacheHits,
+            'misses': self.cacheMisses,
+            'size': len(self._stepCache),
+            'hit_rate': self.cacheHits / calls if calls else 0.0,
+        }
+
     def init_gpio(self):
         """This initialises all GPIO pins of the Raspberry Pi that are needed.
         The pins are hardcoded and defined in the documentation! If they have to be
@@ -95,9 +191,36 @@ class Robot(metaclass=abc.ABCMeta):
     def disable_steppers(self):
         GPIO.output(self.enablePin, GPIO.HIGH)
 
-    def angles2steps(self, angles: list):
-        """converts list of angles [rad] to list of steps"""
-        steps = [round(x / self.stepAngle) for x in angles]
+    def angles2steps(self, angles: list, out=None):
+        """converts list of angles [rad] to an int32-array of steps
+        `out`: optional int32-array to write the steps into (a new array is returned if not given)"""
+        if out is None:
+            out = np.empty(self.dof, dtype=np.int32)
+
+        np.divide(angles, self.stepAngle, out=self._angleBuf)
+        np.rint(self._angleBuf, out=self._angleBuf)
+        np.copyto(out, self._angleBuf, casting='unsafe')
+        return out
+
+    def pose2steps(self, pose: list):
+        """Returns the motor positions of `pose` as int32-array of steps (read only, do not modify).
+        Results are kept in a bounded LRU cache, so poses that are visited again (e.g. in every loop of a
+        demo program) skip the inverse kinematics. Raises WorkspaceViolation like `inv_kinematic`"""
+        key = tuple(round(float(v) / self.POSE_QUANTUM) for v in pose[:self.dof])
+
+        steps = self._stepCache.get(key)
+        if steps is None:
+            self.cacheMisses += 1
+            steps = self.angles2steps(self.inv_kinematic(pose))
+            steps.flags.writeable = False
+            self._stepCache[key] = steps
+
+            if len(self._stepCache) > self.STEP_CACHE_SIZE:
+                self._stepCache.popitem(last=False)  # drop the least recently used pose
+        else:
+            self.cacheHits += 1
+            self._stepCache.move_to_end(key)
+
         return steps
 
     def homing(self, method: str) -> None:
@@ -113,59 +236,120 @@ class Robot(metaclass=abc.ABCMeta):
             angles = [m.pi / 2] * self.dof
             homing_pose = self.forward_kinematic(angles)  # calculate the position via forward kinematics
             logging.info(f'Robot is now at homing pose: {homing_pose}')
-            self.currPose = homing_pose
-            self.homePose = homing_pose           
-            self.currSteps = self.angles2steps(angles)
+            self.currPose[:] = homing_pose
+            self.homePose[:] = homing_pose
+            self.angles2steps(angles, out=self.currSteps)
         else:
             raise ValueError('Chosen homing-method is not defined!')
 
-    def mov_steps(self, step_list, new_pose: list):
+    def update_pose(self) -> None:
+        """
+        Recalculates the homing pose and the current pose after the dimensions changed. The motors did not move,
+        so the step count is kept and the pose follows from it with the forward kinematics
+        """
+        self.homePose[:] = self.forward_kinematic([m.pi / 2] * self.dof)
+        self.currPose[:] = self.forward_kinematic(self.currSteps * self.stepAngle)
+        logging.info(f'Robot is now at pose: {self.currPose.tolist()}')
+
+    def mov_steps(self, step_list, new_pose: list, start: float = None, duration: float = None):
         """ This funktion moves every motor x steps, where x are the number of steps to take
         `stepList` is a np-array or list with 6 Values for the steps to take
         `newPose`:list is the pose after the movement was done
+        `start`, `duration`: spread the steps evenly over `duration` [s] from `start` on (`time.perf_counter`
+        clock) instead of stepping as fast as possible
         """
-        new_pose = new_pose[:self.dof]
         step_list = step_list[:self.dof]
 
-        # movVec = np.array([2, -5, 1, -10, 0, 0])
-        mov_vec = np.array(step_list)  # convert to np.array for vector calculations
-
         # compensate for motor placement (switch direction every second motor)
-        mov_vec = np.multiply(mov_vec, self.rotation_compensation)
+        mov_vec = np.multiply(step_list, self.rotation_compensation, out=self._movBuf, casting='unsafe')
 
-        step_count = np.zeros(self.dof, dtype=int)  # step counter for calculating on wich loop to move
+        max_steps = int(np.abs(mov_vec).max())  # maximum steps to move
+        # after which increments to take one step (as python floats, the loop below is scalar)
+        step_after_inc = (max_steps / (np.abs(mov_vec) + 1)).tolist()
 
-        max_steps = int(max(abs(mov_vec)))  # maximum steps to move
-        step_after_inc = max_steps / (abs(mov_vec) + 1)  # after which increments to take one step
+        # determine direction from sign of vector-element (0: negative, 1: positive)
+        directions = [int(v >= 0) for v in mov_vec.tolist()]
 
-        # determine direction from sign of vector-element
-        directions = [0] * self.dof  # saves in which directions the motors should turn
-        for i, _ in enumerate(directions):
-            if mov_vec[i] < 0:
-                directions[i] = 0
+        # the step counters of the movement are shared, so the position can be checked while moving
+        step_count = [0] * self.dof
+        self._motion = (self.currSteps.tolist(), np.sign(step_list).tolist(), step_count)
+        ticks = self._step_ticks(max_steps, step_after_inc, step_count)
+
+        if duration is None:
+            if self.scheduler is None:
+                for step_motors in ticks:
+                    # Execute steps for motors, if they should step
+                    stepper.do_multi_step(step_motors, self.stepPins, self.dirPins, directions, delay=self.stepDelay)
             else:
-                directions[i] = 1
+                # the pulses are made by the step thread shared with the other robots
+                self.scheduler.run(ticks, self.stepPins, self.dirPins, directions, delay=self.stepDelay)
+        else:
+            # on a timetable: the last step is made at the end of the duration. The pulse fits into one step
+            # period, so steps that are late follow each other no faster than planned
+            dt = duration / max(max_steps, 1)
+            delay = min(self.stepDelay, dt / 2)
+            if self.scheduler is None:
+                t_step = start
+                for step_motors in ticks:
+                    t_step += dt
+                    wait = t_step - time.perf_counter()
+                    if wait > 0:
+                        time.sleep(wait)
+                    stepper.do_multi_step(step_motors, self.stepPins, self.dirPins, directions, delay=delay)
+            else:
+                ticks = ((start + (i + 1) * dt, step_motors) for i, step_motors in enumerate(ticks))
+                self.scheduler.run(ticks, self.stepPins, self.dirPins, directions, delay=delay, timed=True)
 
-        for i in range(max_steps):  # loop with step for highest amount of steps
-            step_motors = [0] * self.dof  # reset
+        # Update current pose and current steps (in place)
+        np.add(self.currSteps, step_list, out=self.currSteps, casting='unsafe')
+        self.currPose[:] = new_pose[:self.dof]
+        self._motion = None
+        if self._stepCorrection.any():
+            self._apply_step_correction()  # lost steps are made up by the next movement
+
+    def _step_ticks(self, max_steps, step_after_inc, step_count):
+        """yields for every loop of a movement which motors make a step (list of 0 or 1, the list is reused)
+        `step_count`: step counter per motor for calculating on wich loop to move (counted up in place)"""
+        step_motors = [0] * self.dof  # which motors step in the current loop
 
+        for i in range(max_steps):  # loop with step for highest amount of steps
             for n, incNr in enumerate(step_after_inc):  # loop trough all motor step-values
                 # n in here is the number of the targetmotor. Starting from 0
-                if np.isinf(incNr):  # if number is infinite skip loop (happens if steps to move are 0)
-                    continue
-
-                c = round(((step_count[n] + 1) * incNr))
+                c = round((step_count[n] + 1) * incNr)
 
                 if c == i or incNr < 1:  # test if a step should be executed
                     step_count[n] += 1  # Adding steps for calculating the next step
                     step_motors[n] = 1  # Add that this motor should
+                else:
+                    step_motors[n] = 0
 
-            # Execute steps for motors, if they should step
-            stepper.do_multi_step(step_motors, self.stepPins, self.dirPins, directions, delay=self.stepDelay)
+            yield step_motors
+
+    def live_steps(self, axis: int):
+        """
+        position of motor `axis` while the robot moves (may be one step ahead, called from other threads)
+        `returns`: (steps, direction of the movement: -1, 0 or 1) or None at standstill
+        """
+        motion = self._motion
+        if motion is None:
+            return None
+        start, directions, step_count = motion
+        return start[axis] + directions[axis] * step_count[axis] + int(self._stepCorrection[axis]), directions[axis]
+
+    def correct_steps(self, axis: int, delta: int):
+        """
+        corrects the step count of motor `axis` by `delta` steps (e.g. lost steps found at a light barrier).
+        Thread-safe, during a movement the correction is applied when the movement ends
+        """
+        with self._correctionLock:
+            self._stepCorrection[axis] += delta
+        if self._motion is None:
+            self._apply_step_correction()
 
-        # Update current pose and current steps
-        self.currSteps = list(np.array(self.currSteps) + np.array(step_list))
-        self.currPose = new_pose
+    def _apply_step_correction(self):
+        with self._correctionLock:
+            np.add(self.currSteps, self._stepCorrection, out=self.currSteps)
+            self._stepCorrection[:] = 0
 
     # MOVING
     def mov(self, pose: list):
@@ -173,26 +357,89 @@ class Robot(metaclass=abc.ABCMeta):
         This is a synchronous PTP implementation"""
         pose = pose[:self.dof]
 
-        new_angles = self.inv_kinematic(pose)  # get new angles
-        #logging.info(f'New joint angles: {new_angles}')
-        new_steps = self.angles2steps(new_angles)  # calculate steps of new position
+        new_steps = self.pose2steps(pose)  # calculate steps of new position
 
-        # create list of steps to move
-        #logging.info(f'New steps: {new_steps}')
-        #logging.info(f'Current steps: {self.currSteps}')
-        steps_to_move = np.array(new_steps) - np.array(self.currSteps)
+        # create array of steps to move
+        steps_to_move = np.subtract(new_steps, self.currSteps, out=self._stepBuf)
         
         # move motors corresponding to stepsToMove-list
         #logging.info(f'Moving to {pose}')
         self.mov_steps(steps_to_move, pose)
 
-    def mov_lin(self, pose: list, pos_res: float = 10, ang_res: float = 3, vel: float = None) -> None:
+    def mov_lin(self, pose: list, pos_res: float = 10, ang_res: float = 3, vel: float = None,
+                tolerance: float = None) -> None:
         """
         Move to new position with linear interpolation
         `pose`: list with values of the pose to move to
-        `posRes`: how many interpolating points should be used in [steps in cm]
-        `angRes`: how many interpolating points should be used in [steps in (10*deg)]
+        `posRes`: finest resolution of the interpolating points in [steps in cm]
+        `angRes`: finest resolution of the interpolating points in [steps in (10*deg)]
         `vel`: how fast the robot should move [cm/s] (default is as fast as possible)
+        `tolerance`: motor angle in [rad] the motors may deviate from the line (default: `LIN_TOLERANCE`), see
+        `adaptive_lin_poses`
+        """
+        tolerance = self.LIN_TOLERANCE if tolerance is None else tolerance
+        poses, distance = self.adaptive_lin_poses(pose, pos_res, ang_res, tolerance)
+        if len(poses):
+            self.follow_path(poses, distance, vel, tolerance)
+
+    def adaptive_lin_poses(self, pose: list, pos_res: float = 10, ang_res: float = 3, tolerance: float = None):
+        """
+        Interpolates linearly from the current pose to `pose` with only as many poses as the kinematics need.
+        Between two poses the motors move in a straight line in joint space. A segment is halved (down to the
+        resolution of `lin_poses`) while the steps at its middle deviate from that straight line by more than
+        `tolerance`, or if one of its poses is unreachable. The middles are probes that are mostly thrown away, so
+        they are solved without the step cache (see `batch_steps`).
+        `returns`: array of poses (without the current pose) and distance in [mm], like `lin_poses`
+        """
+        fine, distance = self.lin_poses(pose, pos_res, ang_res)
+        last = len(fine)
+        if last <= 1:
+            return fine, distance
+
+        tolerance = self.LIN_TOLERANCE if tolerance is None else tolerance
+        max_dev = tolerance / self.stepAngle  # [steps]
+        grid = np.vstack((self._full_pose(self.currPose), fine))  # the current pose is index 0
+
+        # steps of the poses solved so far (None: unreachable)
+        steps = dict(zip((0, last), self.batch_steps(grid[[0, last]])))
+        segments = [(0, last)]
+        while segments:
+            segments = [(a, b) for a, b in segments if b - a > 1]
+            middles = [(a + b) // 2 for a, b in segments]
+            steps.update(zip(middles, self.batch_steps(grid[middles])))
+
+            split = []
+            for (a, b), c in zip(segments, middles):
+                if steps[a] is None or steps[b] is None or steps[c] is None:
+                    split += [(a, c), (c, b)]  # keep the full resolution up to the edge of the workspace
+                    continue
+                line = steps[a] + (steps[b] - steps[a]) * ((c - a) / (b - a))
+                if np.abs(steps[c] - line).max() > max_dev:
+                    split += [(a, c), (c, b)]
+                else:
+                    del steps[c]  # the straight line is good enough
+            segments = split
+
+        return grid[sorted(steps)[1:]], distance
+
+    def batch_steps(self, poses):
+        """
+        Solves the inverse kinematics of several poses one after the other, bypassing the step cache: probe poses
+        that are only visited once would push the poses out of the cache that are actually reused
+        `returns`: list with the steps of every pose (float64-array, not rounded) or None if it is unreachable
+        """
+        result = []
+        for pose in poses:
+            try:
+                result.append(np.asarray(self.inv_kinematic(pose[:self.dof]), dtype=np.float64) / self.stepAngle)
+            except WorkspaceViolation:
+                result.append(None)
+        return result
+
+    def lin_poses(self, pose: list, pos_res: float = 10, ang_res: float = 3):
+        """
+        Interpolates linearly from the current pose to `pose` (parameters as in `mov_lin`)
+        `returns`: array of poses (without the current pose, empty if the poses are identical) and distance in [mm]
         """
         pose = pose[:self.dof]
 
@@ -204,47 +451,276 @@ class Robot(metaclass=abc.ABCMeta):
         distance = m.sqrt(x_dir ** 2 + y_dir ** 2 + z_dir ** 2)  # distance to move [mm]
         steps_pos = distance * pos_res / 10  # Number of steps to move (calculated by distance)
 
-        # Calculate angle to move
-        angle_to_turn_val = angle_to_turn(self.currPose, pose)
+        # Calculate angle to move (robots with less than 6 dof have no further rotations)
+        curr_pose, pose_6 = self._full_pose(self.currPose), self._full_pose(pose)
+        angle_to_turn_val = angle_to_turn(curr_pose, pose_6)
         steps_rot = m.degrees(angle_to_turn_val) * ang_res / 10  # Number of steps to move (calculated by angle)
 
         # take the maximum steps needed to match resolution
         nr_of_steps = m.ceil(max([steps_pos, steps_rot]))
 
         if nr_of_steps <= 0:
-            return  # return if poses are already identical
+            return np.empty((0, 6)), 0.0  # poses are already identical
+
+        return slerp_pose(curr_pose, pose_6, nr_of_steps + 1), distance  # calculate poses in between
+
+    def mov_arc(self, center: list, angle: float, normal: list = (0, 0, 1), height: float = 0,
+                pos_res: float = 10, vel: float = None) -> None:
+        """
+        Move on a circular arc (or a helix if `height` is given) starting at the current pose.
+        The rotation of the platform is kept.
+        `center`: point [x, y, z] on the axis of the arc
+        `angle`: angle to turn around the axis in [rad] (positive: counterclockwise seen against `normal`,
+        several turns are possible)
+        `normal`: direction of the axis
+        `height`: distance to move along the axis during the whole arc in [mm] (helix)
+        `posRes`: how many interpolating points should be used in [steps in cm]
+        `vel`: how fast the robot should move on the path [cm/s] (default is as fast as possible)
+        """
+        normal = np.asarray(normal, dtype=float)
+        normal /= np.linalg.norm(normal)
+        center = np.asarray(center, dtype=float)
+
+        # split the current position into the part along the axis and the radius vector
+        d = self.currPose[:3] - center
+        axial = float(np.dot(d, normal))
+        radial = d - axial * normal
+        radius = float(np.linalg.norm(radial))
+
+        length = m.hypot(radius * angle, height)  # length of the path [mm]
+        nr_of_steps = m.ceil(length * pos_res / 10)
+
+        if nr_of_steps <= 0:
+            return  # nothing to move
+
+        # points on the arc (rotation of the radius vector around the axis, Rodrigues formula)
+        s = np.linspace(0, 1, nr_of_steps + 1)[1:, np.newaxis]
+        phi = s * angle
+        points = (center + (axial + s * height) * normal
+                  + np.cos(phi) * radial + np.sin(phi) * np.cross(normal, radial))
+
+        poses = np.empty((nr_of_steps, self.dof))
+        poses[:, :3] = points
+        poses[:, 3:] = self.currPose[3:]
+        self.follow_path(poses, length, vel, self.LIN_TOLERANCE)
+
+    def mov_spline(self, poses, vel: float = None) -> None:
+        """
+        Moves through `poses` on a smooth curve without stopping at them: the motors follow a spline in joint space
+        through the steps of the poses (see `follow_path`). Only the given poses are solved, so they can be sparse
+        where the curve is gentle.
+        `poses`: list of poses to move through, the last one is the end of the movement
+        `vel`: how fast the robot should move along the poses [cm/s] (default is as fast as possible)
+        """
+        poses = np.asarray(poses, dtype=np.float64)[:, :self.dof]
+        if len(poses) == 0:
+            return
+        length = float(np.linalg.norm(np.diff(np.vstack((self.currPose, poses))[:, :3], axis=0), axis=1).sum())
+        self.follow_path(poses, length, vel)
+
+    def mov_waypoint(self, pos) -> None:
+        """
+        Moves to a waypoint (as created by the demos, programs and G-code)
+        `pos`: [x, y, z, a, b, c] or [.., 'mov'] for PTP, [.., 'lin', vel] for linear moving (vel optional),
+        [.., 'arc', center, angle, height, vel] for an arc/helix around the z-axis through center (ends at the pose) or
+        [.., 'spline', poses, vel] for a smooth curve through the poses [[x, y, z, a, b, c], ..] to the pose
+        """
+        kind = pos[6] if len(pos) > 6 else 'mov'
+
+        if kind == 'mov':
+            self.mov(pos[:6])
+        elif kind == 'lin':
+            self.mov_lin(pos[:6], vel=pos[7] if len(pos) > 7 else None)
+        elif kind == 'arc':
+            center, angle, height, vel = pos[7:11]
+            self.mov_arc(center, angle, height=height, vel=vel)
+        elif kind == 'spline':
+            self.mov_spline([p[:6] for p in pos[7]] + [pos[:6]], vel=pos[8] if len(pos) > 8 else None)
+        else:
+            raise ValueError(f'Unknown waypoint type: {kind}')
+
+    def follow_path(self, poses, length: float, vel: float = None, tolerance: float = None) -> None:
+        """
+        Moves through a list of interpolated poses.
+        The steps of all poses are calculated before the motors start. The motors follow a spline through them in
+        joint space on the fastest timing that keeps every motor within its step rate and acceleration (see
+        `step_limits` and `trajectory.time_optimal`). The path ends at the last pose before the first unreachable one.
+        `poses`: array of poses to move through (without the current pose)
+        `length`: length of the path in [mm] (for the velocity management)
+        `vel`: how fast the robot should move [cm/s] (default is as fast as possible)
+        `tolerance`: motor angle in [rad] the spline may deviate from the path between the poses (see `_sample_path`,
+        default: no check, the spline is the path)
+        """
+        targets = self.path_steps(poses)
+        poses = np.asarray(poses, dtype=np.float64)[:len(targets), :self.dof]
+
+        if len(targets) == 0:
+            return
 
         # check if velocity was given
+        max_path_rate = None
         if vel is not None:
-            if vel > 0:
-                # Calculate the timing for velocity management
-                t_ges = (distance / 10) / vel  # calculate duration of whole movement
-                dt_ideal = t_ges / nr_of_steps  # calculate time it should take to execute one loop iteration
-            else:
+            if vel > 0 and length > 0:
+                # share of the length of every segment (the poses need not be evenly spaced)
+                chords = np.linalg.norm(np.diff(np.vstack((self.currPose, poses))[:, :3], axis=0), axis=1)
+                seg_length = chords * (length / max(chords.sum(), 1e-9))
+                with np.errstate(divide='ignore'):
+                    max_path_rate = (vel * 10) / seg_length  # segments per second at the given velocity
+            elif vel <= 0:
                 logging.warning('Given velocity is lower than 0 or 0! Using default!')
 
-        poses = slerp_pose(self.currPose, pose, nr_of_steps + 1)  # calculate poses in between
-        t_st = time.time()  # check the time
-
-        for i, poseBetw in enumerate(poses):
+        targets, poses, max_path_rate = self._sample_path(targets, poses, max_path_rate, tolerance)
+        nr_of_steps = len(targets)
+
+        durations = trajectory.time_optimal(self.currSteps, targets, *self.step_limits(), max_path_rate)
+        planned = float(durations.sum())
+        if max_path_rate is not None:
+            with np.errstate(divide='ignore'):
+                wanted = float(np.sum(1 / max_path_rate))
+            if planned > 1.01 * wanted:
+                logging.warning(f'Can not keep velocity! The motors need {planned:.2f} s instead of '
+                                f'{wanted:.2f} s for this path')
+
+        t_st = time.perf_counter()
+        t_seg = t_st
+        for i in range(nr_of_steps):
+            # go to next pose (also updates the current pose)
+            self.mov_steps(np.subtract(targets[i], self.currSteps, out=self._stepBuf), poses[i],
+                           start=t_seg, duration=float(durations[i]))
+            t_seg += durations[i]
+
+        # the timetable keeps every motor within its limits, being late means the steps could not be made in time
+        late = time.perf_counter() - (t_st + planned)
+        if late > max(0.05 * planned, 2 * self.stepDelay):
+            # a given velocity was promised, otherwise it is only the speed of the pulse loop
+            logging.log(logging.WARNING if max_path_rate is not None else logging.INFO,
+                        f'Path took {late * 1e3:.0f} ms longer than planned ({planned:.2f} s)')
+
+    def _sample_path(self, targets, poses, path_rates=None, tolerance: float = None):
+        """
+        Samples the spline through the steps of the poses (see `trajectory.spline_points`), so no motor makes more
+        than `SEGMENT_STEPS` steps between two samples. The poses are sampled at the same spline parameter.
+        If a `tolerance` [rad] is given, the steps of the sampled poses are solved: segments where the spline
+        deviates from them by more than the tolerance use the solved steps instead (straight lines in joint space
+        where a sampled pose is unreachable), so the motors stay within the tolerance `adaptive_lin_poses` promises.
+        `path_rates`: segments per second allowed for every segment (or None)
+        `returns`: targets, poses and path rates of the samples
+        """
+        prev_steps = np.vstack((self.currSteps, targets[:-1]))
+        parts = np.maximum(1, np.ceil(np.abs(targets - prev_steps).max(axis=1) / self.SEGMENT_STEPS)).astype(np.int64)
+        if (parts == 1).all():
+            return targets, poses, path_rates
+
+        seg = np.repeat(np.arange(len(targets)), parts)  # segment of every sample
+        frac = ((np.arange(len(seg)) - np.repeat(np.cumsum(parts) - parts, parts) + 1) / parts[seg])[:, np.newaxis]
+
+        points = np.vstack((self.currSteps, targets)).astype(np.float64)
+        spacing = np.linalg.norm(np.diff(points, axis=0), axis=1)
+        samples = trajectory.spline_points(points, parts)
+        sample_poses = trajectory.spline_points(np.vstack((self.currPose, poses)), parts, spacing)
+
+        if tolerance is not None:
+            inner = np.flatnonzero(frac[:, 0] < 1)  # the samples at the poses are exact
+            solved = samples.copy()
+            deviation = np.zeros(len(targets))
+            unreachable = np.zeros(len(targets), dtype=bool)
+            for i, steps in zip(inner, self.batch_steps(sample_poses[inner])):
+                if steps is None:
+                    unreachable[seg[i]] = True
+                    continue
+                solved[i] = steps
+                deviation[seg[i]] = max(deviation[seg[i]], np.abs(samples[i] - steps).max())
+
+            too_far = deviation > tolerance / self.stepAngle
+            if too_far.any():
+                samples[too_far[seg]] = solved[too_far[seg]]
+                logging.debug(f'Spline deviates too much in {np.count_nonzero(too_far)} of {len(targets)} segments, '
+                              'using the solved steps there')
+            if unreachable.any():
+                chord = unreachable[seg]
+                prev_poses = np.vstack((self.currPose, poses[:-1]))
+                samples[chord] = (prev_steps[seg] + (targets - prev_steps)[seg] * frac)[chord]
+                sample_poses[chord] = (prev_poses[seg] + (poses - prev_poses)[seg] * frac)[chord]
+
+        if path_rates is not None:
+            path_rates = path_rates[seg] * parts[seg]
+        return np.rint(samples).astype(np.int32), sample_poses, path_rates
+
+    def path_steps(self, poses):
+        """
+        Calculates the steps of all poses of a path
+        `returns`: int32-array with the steps of every pose, it ends before the first unreachable pose
+        """
+        targets = np.empty((len(poses), self.dof), dtype=np.int32)
+        nr_of_steps = 0
+        for pose in poses:
             try:
-                self.mov(poseBetw)  # go to next pose
+                targets[nr_of_steps] = self.pose2steps(pose[:self.dof])
             except WorkspaceViolation:
+                logging.debug(f'Path leaves the workspace at {list(pose)}')
                 break
-            self.currPose = poseBetw  # update Pose
+            nr_of_steps += 1
+
+        return targets[:nr_of_steps]
+
+    def follow_timed(self, targets, poses, start: float, duration: float) -> None:
+        """
+        Moves through the steps of a path on a fixed timetable: the path starts at `start` (`time.perf_counter`
+        clock) and ends after `duration` [s]. The fastest timing of the path (see `min_duration`) is stretched to the
+        duration. Needs a scheduler. Used for coordinated movements of several robots (see
+        `cell.RobotCell.move_coordinated`)
+        `targets`: steps of the poses (see `path_steps`)
+        `poses`: poses of the path
+        """
+        durations = trajectory.time_optimal(self.currSteps, targets, *self.step_limits())
+        durations *= duration / max(float(durations.sum()), 1e-9)
+        t_seg = start
+        for i, target in enumerate(targets):
+            self.mov_steps(np.subtract(target, self.currSteps, out=self._stepBuf), poses[i],
+                           start=t_seg, duration=float(durations[i]))
+            t_seg += durations[i]
+
+    def min_duration(self, targets) -> float:
+        """
+        shortest duration in [s] to move through the steps of a path within the step rate and acceleration of every
+        motor (the same limits as `follow_path`, see `step_limits`)
+        `targets`: steps of the poses (see `path_steps`)
+        """
+        if len(targets) == 0:
+            return 0.0
+        return float(trajectory.time_optimal(self.currSteps, targets, *self.step_limits()).sum())
+
+    def _full_pose(self, pose):
+        """returns `pose` as [x, y, z, alpha, beta, gamma] (missing rotations are 0)"""
+        return list(pose[:self.dof]) + [0.0] * (6 - self.dof)
+
+    def solve_forward_kinematic(self, angles, x_0):
+        """Forward kinematics by numerically inverting `inv_kinematic` (fsolve).
+        `angles`: list of motor angles
+        `x_0`: initial guess of the pose
+
+        The initial guess is checked first: if it already matches the angles (as the homing pose does)
+        no numeric solve is needed and scipy does not have to be loaded at all.
+
+        `return`: list with the pose"""
+        angles = np.array(angles, dtype=float)  # convert to numpy array to subtract from another array
+
+        # create function to minimize
+        def func(x):
+            """This function returns the difference between the given angles and the angles of a guess (`x`)"""
+            return angles - np.array(self.inv_kinematic(x))
 
-            # Velocity management
-            if vel is not None:  # if velocity is given make calculations for velocity-management
-                t_ideal = t_st + (i + 1) * dt_ideal  # calculate ideal time (to compare to)
-                t_curr = time.time()  # get current time
-                dt = t_ideal - t_curr  # copmarison between ideal and real timing
+        try:
+            if np.allclose(func(x_0), 0, rtol=0, atol=1e-9):
+                return list(x_0)
+        except WorkspaceViolation:
+            pass
 
-                if dt > self.stepDelay:  # if ideal timing is in front of the real time
-                    time.sleep(dt)  # sleep until timings match again
+        # numeric fallback (lazy import, loading scipy takes several seconds on the Raspberry Pi)
+        from scipy.optimize import fsolve
+        curr_pose = fsolve(func, x_0)  # solve numerically with initial guess
 
-                elif dt < -2 * self.stepDelay:  # if real time is too much behind
-                    # TODO: Maybe turn on LED or something (just printing on console in this case)
-                    logging.warning('Can not keep velocity!')
+        return list(curr_pose)
 
     @abc.abstractmethod
     def inv_kinematic(self, pose: list):
@@ -1,27 +1,42 @@
-from math import sin, cos, sqrt
+from math import sin, cos, sqrt, pi
 
 import numpy as np
-from scipy.optimize import fsolve
 
-from Robot import Robot
+from Robot import Robot, WorkspaceViolation
 
 
 class SixRUS(Robot):
     """Class for the 6-RUS-robot"""
+    __slots__ = ()
 
-    def __init__(self, stepper_mode=1 / 32, steps_per_rev=200, step_delay=0.0208):
+    # Robot-Dimensions [mm]  (can be changed in the configuration, see config.py)
+    # [l1, l2, dx, dy, Dx, Dy]  (more Infos in documentation)
+    # GEOMETRY = [57.0, 92.0, 11.0, 9.5, 63.0, 12.0]  # small endeffector
+    GEOMETRY = [58.0, 200.0, 23.6, 12.5, 50.0, 12.5]  # big endeffector
+
+    # Sampling grid of the workspace map: (min, max, resolution) for [x, y, z] in [mm] and [α, β, γ] in [rad].
+    # The homing pose (z = -256.25) is the lowest pose, the cells start a bit above it, so its cell is reachable
+    WORKSPACE_BOUNDS = [(-60, 60, 10), (-60, 60, 10), (-252, -132, 10),
+                        (-0.3, 0.3, 0.15), (-0.3, 0.3, 0.15), (-0.3, 0.3, 0.15)]
+
+    # arms as (rotation of the arm pair around z [rad], side of the pair): the base joint of an arm lies at
+    # Rz(rotation) * [Dx, side * Dy, 0], its joint on the platform at Rz(rotation) * [dx, side * dy, 0] and the arm
+    # turns in the plane spanned by Rz(rotation) * x and z
+    ARMS = [(0, 1), (0, -1), (-2 * pi / 3, 1), (-2 * pi / 3, -1), (2 * pi / 3, 1), (2 * pi / 3, -1)]
+
+    def __init__(self, stepper_mode=1 / 32, steps_per_rev=200, step_delay=0.0208, pins=None, scheduler=None):
         """Initialise the Robot
         `stepperMode`: float  Microstepmode e.g. 1/32, 1/16, 1/8; 1/4, 1/2 or 1
         `stepsPerRev`: int  How many Full-steps the motors have
         `stepDelay`: in [s]   SleepDelay between steps lower time allows for faster rotation but is
         more susceptible of missing steps
+        `pins`, `scheduler`: see `Robot`
         """
-        super().__init__(dof=6, stepper_mode=stepper_mode, steps_per_rev=steps_per_rev, step_delay=step_delay, rot_comp=np.array([1, -1] * 3))
+        super().__init__(dof=6, stepper_mode=stepper_mode, steps_per_rev=steps_per_rev, step_delay=step_delay,
+                         rot_comp=np.array([1, -1] * 3), pins=pins, scheduler=scheduler)
 
-        # Robot-Dimensions [mm]  (Hardcoded but can be changed via a function)
-        # [l1, l2, dx, dy, Dx, Dy]  (more Infos in documentation)
-        # self.geometricParams = [57.0, 92.0, 11.0, 9.5, 63.0, 12.0]  # small endeffector
-        self.geometricParams = [58.0, 200.0, 23.6, 12.5, 50.0, 12.5]  # big endeffector
+        self.geometricParams = list(self.GEOMETRY)
+        self.workspaceBounds = list(self.WORKSPACE_BOUNDS)
 
     # KINEMATICS
     def inv_kinematic(self, pose: list):
@@ -31,6 +46,9 @@ class SixRUS(Robot):
 
         `return`: list with all six motor-angles"""
         pose = pose[:self.dof]
+        # the formulas below use complex numbers and return angles for unreachable poses as well
+        if not self.reachable(pose):
+            raise WorkspaceViolation
 
         # convert all inputs to floats to be able to work with complex numbers
         x = float(pose[0])
@@ -81,10 +99,36 @@ class SixRUS(Robot):
         theta_5 = np.angle((2*((((2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 - (((c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - z + (s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 - c_bg*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + ((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2))**2)**2/l1**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 + sqrt(3)*((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2)*(2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2)/4)**(1/2) - ((((c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - z + (s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + ((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2))**2)*(Dx/2 + x + (sqrt(3)*Dy)/2 + sqrt(3)*((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2)))/l1)/((2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 + sqrt(3)*((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2) + ((2*((((2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 - (((c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - z + (s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + ((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2))**2)**2/l1**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 + sqrt(3)*((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2)*(2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2)/4)**(1/2)*(Dx/2 + x + (sqrt(3)*Dy)/2 + sqrt(3)*((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2)) + ((2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2*(((c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - z + (s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 - c_bg*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + ((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2))**2))/l1)*j)/(((2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))**2 + (Dx/2 + x + (sqrt(3)*Dy)/2 + sqrt(3)*((sqrt(3)*Dx)/2 - y - Dy/2 + (c_a*s_g + c_g*s_ab)*(dx/2 + (sqrt(3)*dy)/2) + (c_ag - s_abg)*(dy/2 - (sqrt(3)*dx)/2)) - c_bg*(dx/2 + (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 - (sqrt(3)*dx)/2))**2)*(2*(c_g*s_a + c_a*s_bg)*(dy/2 - (sqrt(3)*dx)/2) - 2*z + 2*(s_ag - c_ag*s_b)*(dx/2 + (sqrt(3)*dy)/2))))
         theta_6 = np.angle((2*((((2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 - (((sqrt(3)*Dy)/2 - x - Dx/2 + c_bg*(dx/2 - (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + (z + (c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - (s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 + (Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2))**2)**2/l1**2 + (Dx/2 + x - (sqrt(3)*Dy)/2 + sqrt(3)*(Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) - c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2)*(2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2)/4)**(1/2) - ((((sqrt(3)*Dy)/2 - x - Dx/2 + c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + (z + (c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - (s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 + (Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2))**2)*(Dx/2 + x - (sqrt(3)*Dy)/2 + sqrt(3)*(Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) - c_b*s_g*(dy/2 + (sqrt(3)*dx)/2)))/l1)/((2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 + (Dx/2 + x - (sqrt(3)*Dy)/2 + sqrt(3)*(Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) - c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2) - ((2*((((2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 - (((sqrt(3)*Dy)/2 - x - Dx/2 + c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + (z + (c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - (s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 + (Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2))**2)**2/l1**2 + (Dx/2 + x - (sqrt(3)*Dy)/2 + sqrt(3)*(Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) - c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2)*(2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2)/4)**(1/2)*(Dx/2 + x - (sqrt(3)*Dy)/2 + sqrt(3)*(Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2)) - c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) - c_b*s_g*(dy/2 + (sqrt(3)*dx)/2)) + ((2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2*(((sqrt(3)*Dy)/2 - x - Dx/2 + c_b*c_g*(dx/2 - (sqrt(3)*dy)/2) + c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2 + l1**2 - l2**2 + (z + (c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - (s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 + (Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2))**2))/l1)*j)/(((2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))**2 + (Dx/2 + x - (sqrt(3)*Dy)/2 + sqrt(3)*(Dy/2 - y + (sqrt(3)*Dx)/2 + (c_a*s_g + c_g*s_ab)*(dx/2 - (sqrt(3)*dy)/2) - (c_ag - s_abg)*(dy/2 + (sqrt(3)*dx)/2)) - c_bg*(dx/2 - (sqrt(3)*dy)/2) - c_b*s_g*(dy/2 + (sqrt(3)*dx)/2))**2)*(2*z + 2*(c_g*s_a + c_a*s_bg)*(dy/2 + (sqrt(3)*dx)/2) - 2*(s_ag - c_ag*s_b)*(dx/2 - (sqrt(3)*dy)/2))))
 
-        # TODO: Arbeitsraumbeschränkung, sobald der 6 RUS aufgebaut ist.
-        
         return [theta_1, theta_2, theta_3, theta_4, theta_5, theta_6]
 
+    def reachable(self, pose) -> bool:
+        """Checks if every arm can reach its joint on the platform: the sphere with the length of the rod around the
+        joint has to cut the circle the arm turns on
+
+        `pose`: list in the form of [x, y, z, α, β, γ]"""
+        l1, l2, dx, dy, Dx, Dy = self.geometricParams
+        x, y, z, alpha, beta, gamma = (float(v) for v in pose[:6])
+
+        # rotation of the platform (x-y-z Euler angles, as in the inverse kinematics)
+        s_a, c_a, s_b, c_b, s_g, c_g = sin(alpha), cos(alpha), sin(beta), cos(beta), sin(gamma), cos(gamma)
+        rotation = np.array([[c_b * c_g, -c_b * s_g, s_b],
+                             [c_a * s_g + c_g * s_a * s_b, c_a * c_g - s_a * s_b * s_g, -c_b * s_a],
+                             [s_a * s_g - c_a * c_g * s_b, c_g * s_a + c_a * s_b * s_g, c_a * c_b]])
+
+        for phi, side in self.ARMS:
+            c_p, s_p = cos(phi), sin(phi)
+            base = np.array([c_p * Dx - s_p * side * Dy, s_p * Dx + c_p * side * Dy, 0.0])
+            joint = np.array([x, y, z]) + rotation @ [c_p * dx - s_p * side * dy, s_p * dx + c_p * side * dy, 0.0]
+            v = joint - base
+            d = v[0] * -s_p + v[1] * c_p  # distance from the plane of the arm
+            if abs(d) > l2:
+                return False
+            radius = sqrt(l2 ** 2 - d ** 2)  # the rod reaches this circle in the plane of the arm
+            distance = sqrt(max(v @ v - d ** 2, 0.0))
+            if not abs(l1 - radius) <= distance <= l1 + radius:
+                return False
+        return True
+
     def forward_kinematic(self, angles):
         """Forward kinematics of 6-RUS robot. This is done with a numeric solve (fsolve)
 
@@ -92,29 +136,13 @@ class SixRUS(Robot):
 
         `return`: list with pose in the form of [x, y, z, α, β, γ]"""
 
-        angles_as_np_array = np.array(angles)  # convert to numpy array to subtract from another array
-
-        # create function to minimize
-        def func(x, h1=angles_as_np_array):
-            """This function returns the difference between the current position (`H1`) and a guess (`X`).
-            It is used for the numeric fsolve."""
-
-            motor_angles = self.inv_kinematic(x)
-            h2 = np.array(motor_angles)
-
-            difference = h1 - h2  # calculate the difference between calulated and real angles
-
-            return difference
-
         # initial guess/startingvalue
         # (first arm is pointing downward, pythagoras for second arm and effector/base radii)
         l1, l2, dx, dy, Dx, Dy = self.geometricParams
         z = -l1 - sqrt(l2 ** 2 - (Dx - dx) ** 2)
         x_0 = np.array([0.0, 0.0, z, 0.0, 0.0, 0.0])
 
-        curr_pose = fsolve(func, x_0)  # solve numerically with initial guess
-
-        return list(curr_pose)
+        return self.solve_forward_kinematic(angles, x_0)
 
     def change_robot_dimensions(self, l1, l2, dx, dy, Dx, Dy, *_):
         """This changes the dimensions of the robot which are important for the kinematics.
@@ -0,0 +1,263 @@
+import logging
+import queue
+import threading
+import time
+
+import config
+import stepper
+import telemetry
+from display import LCD
+from referencing import EdgeMonitor
+from Robot import WorkspaceViolation
+from runtime import create_robot, configure_robot
+
+JOB_QUEUE_SIZE = 8  # movements that can wait per robot
+SYNC_MARGIN = 0.05  # time for the workers to pick up a coordinated movement before it starts [s]
+PLAN_TIMEOUT = 5.0  # time the robots have to plan a coordinated movement [s]
+
+# cell of the running program (set when it is created), used by the website
+_cell = None
+
+
+def current_cell():
+    """returns the running RobotCell or None if only a single robot is configured"""
+    return _cell
+
+
+class RobotCell:
+    """Several robots driven from one process.
+
+    Every robot has its own pins and a worker thread that plans its movements (inverse kinematics, interpolation).
+    The step pulses of all robots are made by one shared StepScheduler thread, so the robots move at the same time.
+    Movements are handed over as lists of waypoints (see `Robot.mov_waypoint`) and addressed by robot id.
+
+    The LED, microstep ('mode') and enable pins can be given per robot in the configuration. Robots without own ones
+    share them: the cell enables and disables the drivers of a shared enable pin together (never a single worker)
+    and robots with shared microstep pins need the same stepper mode."""
+
+    def __init__(self, robots: dict):
+        """
+        `robots`: robot id -> {'type': 'delta', 'quattro' or '6rus', 'pins': pins of the robot (see `Robot`)}
+        and optionally further settings of the robot (see config.py)
+        """
+        global _cell
+
+        self.scheduler = stepper.StepScheduler()
+        self.program_stopped = threading.Event()
+        self.lcd = LCD()
+
+        self.robots = {}
+        self.types = {}
+        self.monitors = {}  # lost-step detection at the light barriers
+        self._jobs = {}
+        self._cancel = {}
+        self._busy = {}
+        self._reconfigure = set()  # robots whose configuration changed (applied by their workers)
+        for robot_id, robot_config in robots.items():
+            robot_type = robot_config['type'].strip().lower()
+            self.robots[robot_id] = create_robot(robot_type, scheduler=self.scheduler,
+                                                 settings=self._settings(robot_id, robot_config))
+            self.types[robot_id] = robot_type
+            self.monitors[robot_id] = EdgeMonitor(self.robots[robot_id])
+            self._jobs[robot_id] = queue.Queue(maxsize=JOB_QUEUE_SIZE)
+            self._cancel[robot_id] = threading.Event()
+            self._busy[robot_id] = False
+        self._check_shared_pins()
+
+        self.lcd.print_status(f'Started {len(self.robots)} robots')
+        telemetry.hub.set_source(self.telemetry)
+        config.add_listener(self.on_config)
+        _cell = self
+
+    def _check_shared_pins(self):
+        """logs the pins several robots share and raises ValueError if robots with the same microstep pins need
+        different stepper modes"""
+        for name, pins in (('LED', lambda r: tuple(r.ledpins)), ('microstep', lambda r: (r.M0, r.M1, r.M2)),
+                           ('enable', lambda r: r.enablePin)):
+            groups = {}
+            for robot_id, robot in self.robots.items():
+                groups.setdefault(pins(robot), []).append(robot_id)
+            for pin, robot_ids in groups.items():
+                if len(robot_ids) < 2:
+                    continue
+                logging.info(f'Robots {", ".join(map(str, robot_ids))} share the {name} pins {pin}')
+                if name == 'microstep' and len({self.robots[r].stepperMode for r in robot_ids}) > 1:
+                    raise ValueError(f'Robots {", ".join(map(str, robot_ids))} share the microstep pins {pin} '
+                                     f'but use different stepper modes')
+
+    def _enable_groups(self):
+        """one robot for every enable pin (several robots may share one)"""
+        return {robot.enablePin: robot for robot in self.robots.values()}.values()
+
+    def _settings(self, robot_id, robot_config=None):
+        """settings of robot `robot_id`: the ones of its type, replaced by the ones of the robot in the cell"""
+        if robot_config is None:
+            robot_config = config.current()['cell'].get(robot_id, {'type': self.types[robot_id]})
+        return config.robot_config(robot_config['type'], robot_config)
+
+    def on_config(self, new_config):
+        """called whenever the configuration changed, every worker applies it before its next movement"""
+        self._reconfigure.update(self.robots)
+
+    def submit(self, robot_id, waypoints):
+        """queues a movement of robot `robot_id` (raises KeyError for unknown ids and queue.Full if too many
+        movements are waiting)"""
+        self._jobs[robot_id].put_nowait(list(waypoints))
+
+    def move_coordinated(self, targets: dict, duration: float = None) -> float:
+        """
+        Moves several robots linearly to their targets, so that all of them arrive at the same time.
+        Every robot plans its path on its own worker (so the planning does not interfere with a running movement),
+        then all paths are scaled to a common duration (the one of the slowest robot or `duration`, whichever is
+        longer) and run on the clock of the shared StepScheduler. The workers stay reserved in between.
+        `targets`: robot id -> pose
+        `duration`: desired duration in [s] (default: as fast as the slowest robot can)
+        `returns`: duration of the movement in [s]
+
+        Raises KeyError for unknown robots, RuntimeError if a robot is still moving or does not plan in time and
+        WorkspaceViolation if a target can not be reached on a straight line
+        """
+        for robot_id in targets:
+            self.robots[robot_id]  # unknown robots raise KeyError before any robot is reserved
+            if self._busy[robot_id] or not self._jobs[robot_id].empty():
+                raise RuntimeError(f'Robot {robot_id} is still moving')
+
+        planned = queue.Queue()  # (robot id, shortest duration or the error of the planning)
+        timing = {robot_id: queue.Queue(maxsize=1) for robot_id in targets}  # (start, duration) or None to abort
+        for robot_id, pose in targets.items():
+            self._jobs[robot_id].put_nowait(lambda robot_id=robot_id, pose=pose:
+                                            self._plan_coordinated(robot_id, pose, planned, timing[robot_id]))
+
+        durations = []
+        error = None
+        try:
+            for _ in targets:
+                robot_id, result = planned.get(timeout=PLAN_TIMEOUT)
+                if isinstance(result, Exception):
+                    error = error or result
+                else:
+                    durations.append(result)
+        except queue.Empty:
+            error = RuntimeError('The robots did not plan the movement in time')
+
+        if error is not None:
+            for schedule in timing.values():
+                schedule.put_nowait(None)
+            raise error
+
+        duration = max([duration or 0.0] + durations)
+        start = time.perf_counter() + SYNC_MARGIN  # common start on the clock of the scheduler
+        for schedule in timing.values():
+            schedule.put_nowait((start, duration))
+
+        logging.info(f'Coordinated movement of {", ".join(map(str, targets))} in {duration:.2f} s')
+        return duration
+
+    def _plan_coordinated(self, robot_id, pose, planned, schedule):
+        """plans the path of robot `robot_id` for `move_coordinated` and follows it on the timing it gets back"""
+        robot = self.robots[robot_id]
+        try:
+            poses, _ = robot.lin_poses(pose)
+            steps = robot.path_steps(poses)
+            if len(steps) < len(poses):
+                raise WorkspaceViolation(f'Robot {robot_id} can not reach {list(pose)}')
+        except (ValueError, IndexError) as e:  # also WorkspaceViolation
+            planned.put((robot_id, e))
+            return
+        planned.put((robot_id, robot.min_duration(steps)))
+
+        timing = schedule.get()  # the other robots are planning
+        if timing is not None and len(steps):
+            robot.follow_timed(steps, poses, *timing)
+
+    def cancel(self, robot_id):
+        """stops the current movement of robot `robot_id` after the running segment and drops all waiting ones"""
+        jobs = self._jobs[robot_id]
+        self._cancel[robot_id].set()
+        try:
+            while True:
+                jobs.get_nowait()
+                jobs.task_done()
+        except queue.Empty:
+            pass
+
+    def status(self, robot_id):
+        robot = self.robots[robot_id]
+        return {
+            'id': robot_id,
+            'type': self.types[robot_id],
+            'pose': robot.currPose.tolist(),
+            'busy': self._busy[robot_id],
+            'queued': self._jobs[robot_id].qsize(),
+        }
+
+    def telemetry(self):
+        """snapshot of all robots for the telemetry stream"""
+        return {'robots': [dict(self.status(robot_id), steps=self.robots[robot_id].currSteps.tolist(),
+                                drift=self.monitors[robot_id].drift)
+                           for robot_id in self.robots]}
+
+    def stop(self):
+        """terminates all worker threads"""
+        self.program_stopped.set()
+        for cancel in self._cancel.values():
+            cancel.set()
+
+    def loop(self):
+        """homes all robots, starts their workers and blocks until the program is stopped"""
+        for robot_id, robot in self.robots.items():
+            robot.homing('90')
+            self.monitors[robot_id].start()
+        for robot in self._enable_groups():
+            robot.enable_steppers()  # shared enable pins are switched once for all of their robots
+        for robot_id in self.robots:
+            threading.Thread(target=self._work, args=(robot_id,), name=f'Robot-{robot_id}', daemon=True).start()
+
+        logging.info(f'Robot cell ready: {", ".join(str(robot_id) for robot_id in self.robots)}')
+        self.lcd.print_status('Status: ready')
+        self.program_stopped.wait()
+
+        for robot in self._enable_groups():
+            robot.disable_steppers()
+
+    def _work(self, robot_id):
+        robot = self.robots[robot_id]
+        jobs = self._jobs[robot_id]
+        cancel = self._cancel[robot_id]
+
+        while not self.program_stopped.is_set():
+            if robot_id in self._reconfigure:
+                self._reconfigure.discard(robot_id)
+                if configure_robot(robot, self._settings(robot_id)):
+                    logging.info(f'Geometry of robot {robot_id} changed, recalculating its pose')
+                    robot.update_pose()
+                self.monitors[robot_id].reference()
+
+            try:
+                job = jobs.get(timeout=1.0)
+            except queue.Empty:
+                continue
+
+            cancel.clear()
+            self._busy[robot_id] = True
+            try:
+                if callable(job):
+                    job()  # planned movement (e.g. coordinated with other robots)
+                    continue
+
+                for pos in job:
+                    if cancel.is_set():
+                        logging.info(f'Movement of robot {robot_id} cancelled')
+                        break
+
+                    if len(pos) > 6 and pos[6] == 'wait':
+                        cancel.wait(pos[7])  # dwell, ends early if cancelled
+                    else:
+                        robot.mov_waypoint(pos)
+            except (WorkspaceViolation, ValueError, IndexError) as e:
+                logging.error(f'Movement of robot {robot_id} stopped: {e}')
+            except Exception as e:  # a broken job must not end the worker
+                logging.exception(f'Movement of robot {robot_id} failed: {e}')
+            finally:
+                self._busy[robot_id] = False
+                jobs.task_done()
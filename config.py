@@ -0,0 +1,289 @@
+"""Persistent configuration of the robots, stored as JSON next to the program (config.json).
+
+The file only contains the settings that differ from the defaults, e.g.:
+
+{
+    "robot": "quattro",                         type of the robot: 'delta', 'quattro' or '6rus'
+    "cell": {},                                 several robots in one process (see cell.py): robot id -> {"type": ..,
+                                                and the settings of a robot below, e.g. "pins"}
+    "robots": {                                 settings per robot type, all optional:
+        "quattro": {
+            "geometry": [55.6, 39.3, 75.8, 166.8],      dimensions of the robot [mm] (see the robot classes)
+            "step_delay": 0.004,                        delay between two full steps [s]
+            "stepper_mode": 0.03125,                    microstep mode (1, 1/2, 1/4, 1/8, 1/16 or 1/32)
+            "steps_per_rev": 200,                       full steps of the motors per revolution
+            "pins": {"dir": [..], "step": [..], "lightbarrier": [..], "led": [..], "mode": [..], "enable": 0},
+            "workspace_bounds": [[min, max, resolution], ..],   sampling grid of the workspace map (one per dof)
+            "workspace_limits": [[min, max], ..],               jog limits for x, y, z [mm] and a, b, c [rad]
+            "axis_step_delays": [..],                   step delay every motor follows (found by tuning.py) [s]
+            "axis_accelerations": [..]                  acceleration every motor follows [full steps/s²]
+        }
+    }
+}
+
+The configuration is loaded once at startup. Changes (via `update` or `reload`, e.g. from the web API) are validated
+first and then delivered to the listeners, which apply them between two movements.
+"""
+
+import copy
+import json
+import logging
+import numbers
+import os
+import threading
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+ROBOT_TYPES = ('delta', 'quattro', '6rus')
+DOF = {'delta': 3, 'quattro': 4, '6rus': 6}
+GEOMETRY_SIZE = {'delta': 4, 'quattro': 4, '6rus': 6}
+STEPPER_MODES = (1, 1 / 2, 1 / 4, 1 / 8, 1 / 16, 1 / 32)
+GPIO_RANGE = range(28)  # BCM numbers of the Raspberry Pi
+
+DEFAULTS = {
+    'robot': 'quattro',
+    'cell': {},
+    'robots': {
+        #TODO: Step Delay prüfen (delta, 6rus)
+        'delta': {'step_delay': 0.002, 'stepper_mode': 1 / 32, 'steps_per_rev': 200},
+        'quattro': {'step_delay': 0.004, 'stepper_mode': 1 / 32, 'steps_per_rev': 200},
+        '6rus': {'step_delay': 0.002, 'stepper_mode': 1 / 32, 'steps_per_rev': 200},
+    },
+}
+
+
+class ConfigError(ValueError):
+    """The configuration is invalid"""
+
+
+_lock = threading.RLock()
+_stored = None  # content of the file (only the changed settings)
+_config = None  # validated configuration (defaults merged with the file)
+_listeners = []
+
+
+def current() -> dict:
+    """returns the configuration (loaded from the file on the first call)"""
+    with _lock:
+        if _config is None:
+            _load()
+        return _config
+
+
+def robot_config(robot_type: str, overrides: dict = None) -> dict:
+    """
+    settings of a robot: defaults of the type, the settings of the type in the file and `overrides`
+    (e.g. the entry of the robot in the cell)
+    """
+    robot_type = robot_type.strip().lower()
+    settings = dict(current()['robots'].get(robot_type, {}))
+    settings.update({key: value for key, value in (overrides or {}).items() if key != 'type'})
+    return settings
+
+
+def add_listener(callback):
+    """registers `callback(config)` to be called whenever the configuration changed"""
+    _listeners.append(callback)
+
+
+def reload(path: str = CONFIG_PATH) -> dict:
+    """reads the file again (e.g. after it was edited) and delivers the new configuration to the listeners"""
+    with _lock:
+        config = _load(path)
+    _notify(config)
+    return config
+
+
+def update(changes: dict, path: str = CONFIG_PATH) -> dict:
+    """
+    Changes settings and stores them in the file. Nested dicts are merged, `None` resets a setting to its default.
+    Raises ConfigError (and keeps the old configuration) if the result is invalid.
+    """
+    with _lock:
+        current()
+        stored = _merge(copy.deepcopy(_stored), changes)
+        config = _set(stored)
+
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(stored, f, indent=4)
+        os.replace(tmp, path)  # the file is never half written
+
+    logging.info(f'Configuration changed: {changes}')
+    _notify(config)
+    return config
+
+
+def validate(config: dict) -> dict:
+    """checks the types and values of all settings, raises ConfigError for the first invalid one"""
+    if not isinstance(config, dict):
+        raise ConfigError('the configuration must be an object')
+    for key in config:
+        if key not in DEFAULTS:
+            raise ConfigError(f'{key}: unknown setting')
+
+    if config.get('robot') not in ROBOT_TYPES:
+        raise ConfigError(f'robot: must be one of {", ".join(ROBOT_TYPES)}')
+
+    cell = config.get('cell', {})
+    if not isinstance(cell, dict):
+        raise ConfigError('cell: must be an object (robot id -> robot)')
+    for robot_id, entry in cell.items():
+        if not isinstance(entry, dict) or entry.get('type') not in ROBOT_TYPES:
+            raise ConfigError(f'cell.{robot_id}.type: must be one of {", ".join(ROBOT_TYPES)}')
+        _validate_robot(f'cell.{robot_id}', entry['type'], {k: v for k, v in entry.items() if k != 'type'})
+
+    robots = config.get('robots', {})
+    if not isinstance(robots, dict):
+        raise ConfigError('robots: must be an object (robot type -> settings)')
+    for robot_type, settings in robots.items():
+        if robot_type not in ROBOT_TYPES:
+            raise ConfigError(f'robots.{robot_type}: unknown robot type')
+        if not isinstance(settings, dict):
+            raise ConfigError(f'robots.{robot_type}: must be an object')
+        _validate_robot(f'robots.{robot_type}', robot_type, settings)
+
+    return config
+
+
+def _validate_robot(where, robot_type, settings):
+    dof = DOF[robot_type]
+    for key, value in settings.items():
+        if key not in ROBOT_SETTINGS:
+            raise ConfigError(f'{where}.{key}: unknown setting')
+        try:
+            ROBOT_SETTINGS[key](value, robot_type, dof)
+        except ConfigError as e:
+            raise ConfigError(f'{where}.{key}: {e}') from None
+
+
+def _number(value, positive=False):
+    if isinstance(value, bool) or not isinstance(value, numbers.Real):
+        raise ConfigError(f'{value!r} is not a number')
+    if positive and value <= 0:
+        raise ConfigError(f'{value!r} must be positive')
+
+
+def _numbers(value, size, positive=False):
+    if not isinstance(value, (list, tuple)) or len(value) != size:
+        raise ConfigError(f'must be a list of {size} numbers')
+    for v in value:
+        _number(v, positive)
+
+
+def _pin(value):
+    if isinstance(value, bool) or not isinstance(value, int) or value not in GPIO_RANGE:
+        raise ConfigError(f'{value!r} is no GPIO number (BCM)')
+
+
+def _check_geometry(value, robot_type, dof):
+    _numbers(value, GEOMETRY_SIZE[robot_type], positive=True)
+
+
+def _check_step_delay(value, robot_type, dof):
+    _number(value, positive=True)
+
+
+def _check_stepper_mode(value, robot_type, dof):
+    if value not in STEPPER_MODES:
+        raise ConfigError('must be 1, 1/2, 1/4, 1/8, 1/16 or 1/32')
+
+
+def _check_steps_per_rev(value, robot_type, dof):
+    if isinstance(value, bool) or not isinstance(value, int) or value <= 0:
+        raise ConfigError('must be a positive integer')
+
+
+def _check_pins(value, robot_type, dof):
+    if not isinstance(value, dict):
+        raise ConfigError('must be an object')
+    sizes = {'dir': dof, 'step': dof, 'lightbarrier': dof, 'led': 3, 'mode': 3}
+    for key, pins in value.items():
+        if key == 'enable':
+            _pin(pins)
+        elif key in sizes:
+            if not isinstance(pins, (list, tuple)) or len(pins) < sizes[key]:
+                raise ConfigError(f'{key} needs {sizes[key]} pins')
+            for pin in pins:
+                _pin(pin)
+        else:
+            raise ConfigError(f'unknown pins {key}')
+
+
+def _check_workspace_bounds(value, robot_type, dof):
+    if not isinstance(value, (list, tuple)) or len(value) != dof:
+        raise ConfigError(f'must be a list of {dof} [min, max, resolution]')
+    for bound in value:
+        _numbers(bound, 3)
+        if bound[0] >= bound[1] or bound[2] <= 0:
+            raise ConfigError(f'{bound} needs min < max and a positive resolution')
+
+
+def _check_axes(value, robot_type, dof):
+    _numbers(value, dof, positive=True)
+
+
+def _check_workspace_limits(value, robot_type, dof):
+    if not isinstance(value, (list, tuple)) or len(value) != 6:
+        raise ConfigError('must be a list of 6 [min, max] (x, y, z, a, b, c)')
+    for limit in value:
+        _numbers(limit, 2)
+        if limit[0] > limit[1]:
+            raise ConfigError(f'{limit} needs min <= max')
+
+
+# setting of a robot -> check(value, robot type, degrees of freedom)
+ROBOT_SETTINGS = {
+    'geometry': _check_geometry,
+    'step_delay': _check_step_delay,
+    'stepper_mode': _check_stepper_mode,
+    'steps_per_rev': _check_steps_per_rev,
+    'pins': _check_pins,
+    'workspace_bounds': _check_workspace_bounds,
+    'workspace_limits': _check_workspace_limits,
+    'axis_step_delays': _check_axes,
+    'axis_accelerations': _check_axes,
+}
+
+
+def _merge(base, changes):
+    """merges `changes` into `base` (nested dicts are merged, None removes a key)"""
+    if not isinstance(changes, dict):
+        raise ConfigError('changes must be an object')
+    for key, value in changes.items():
+        if value is None:
+            base.pop(key, None)
+        elif isinstance(value, dict) and isinstance(base.get(key), dict):
+            _merge(base[key], value)
+        else:
+            base[key] = copy.deepcopy(value)
+    return base
+
+
+def _set(stored):
+    global _stored, _config
+    config = validate(_merge(copy.deepcopy(DEFAULTS), stored))
+    _stored, _config = stored, config
+    return config
+
+
+def _load(path=CONFIG_PATH):
+    try:
+        with open(path) as f:
+            stored = json.load(f)
+    except FileNotFoundError:
+        stored = {}
+    except ValueError as e:
+        raise ConfigError(f'{path}: {e}') from e
+
+    config = _set(stored)
+    logging.info(f'Loaded configuration from {path}' if stored else 'Using the default configuration')
+    return config
+
+
+def _notify(config):
+    for callback in list(_listeners):
+        try:
+            callback(config)
+        except Exception as e:
+            logging.exception(e)
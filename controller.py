@@ -6,18 +6,24 @@ from subprocess import check_call, DEVNULL, CalledProcessError
 from threading import RLock
 from typing import Dict
 from Robot import WorkspaceViolation
-from startWebsite import websiteInformation
-
-import pygame
+from webstate import websiteInformation, jog_inputs
 
 from ps5_mapping import *
 
 mutex = RLock()
 
+
+class ControllerError(Exception):
+    """The controller could not be read (e.g. because it was disconnected)"""
+
+
 # Controller things
 def init_controller():
     """Inits controller to use it and returns joystick class.
     `returns` `None` if controller is not connected"""
+    # pygame is only loaded once a controller is actually used (slow import on the Raspberry Pi)
+    import pygame
+
     pygame.joystick.quit()
     pygame.init()
     pygame.joystick.init()
@@ -43,21 +49,25 @@ def still_connected():
         logging.debug('Checking connection to controller: Connected')
         return True
     
-def get_movement_from_cont(controls, pose):
+def get_movement_from_cont(controls, pose, workspace=None, limits=None, robot=None):
     """Calculates new pose from controller-input ans returns it as a list
     `controls`:dict  inputs from controller
-    `currentPose`:list  poselist of current pose"""
+    `currentPose`:list  poselist of current pose
+    `workspace`:WorkspaceMap  reachable workspace to keep the pose in (hardcoded limits if not given)
+    `limits`:list  [min, max] for x, y, z, a, b, c from the configuration (optional, applied additionally)
+    `robot`:Robot  checks the new pose exactly with its inverse kinematics (see `WorkspaceMap.limit`)"""
     # 0Z---> y
     # |
     # V x 
 
+    # Create a copy so we do not save state here
+    current = list(pose) + [0] * (6 - len(pose))
+    pose = list(pose)
+
     dof = len(pose)
     if dof < 6:
         pose += [0] * (6 - dof)
 
-    # Create a copy so we do not save state here
-    pose = list(pose)
-
     # speedfactors
     rot_fac = 0.25
     trans_fac = 1
@@ -75,13 +85,19 @@ def get_movement_from_cont(controls, pose):
     pose[4] = rad(pose[4])
     pose[5] = rad(pose[5])
 
-    if dof == 3:
+    if limits is not None:
+        pose = check_max_val(pose, *limits)
+
+    if workspace is not None:
+        # an axis that would leave the workspace stops, the current pose is kept if nothing can move
+        pose = workspace.limit(current, pose, robot)
+
+    elif dof == 3:
         #TODO: Workspace begrenzung anpassen
         pose = check_max_val(pose, [-60, 60], [-60, 60], [-290,0], [0.3, 0.9], [0, 0], [0, 0])
 
     elif dof == 4:
         pose = check_max_val(pose, [-60, 60], [-60, 60], [-290,0], [0.4, 1], [0, 0], [0, 0])
-        print(pose)
 
     else:
         #TODO: Workspace begrenzung anpassen 
@@ -91,7 +107,19 @@ def get_movement_from_cont(controls, pose):
 
 
 def get_controller_inputs(joystick):
-    """Gets all inputs from controller and returns them as a dict"""
+    """Gets all inputs from controller and returns them as a dict.
+    Raises `ControllerError` if the controller can not be read"""
+    import pygame
+
+    try:
+        return _read_controller_inputs(joystick)
+    except pygame.error as e:
+        raise ControllerError(e) from e
+
+
+def _read_controller_inputs(joystick):
+    import pygame
+
     with mutex:
         pygame.event.get()  # get event
         pygame.event.clear()  # clear events in queue (only one event needed)
@@ -168,20 +196,24 @@ def mode_from_controller_inputs(inputs: Dict[str, float]):
     return None
 
 # website things
-def get_movement_from_ws(controls, pose):
+def get_movement_from_ws(controls, pose, workspace=None, limits=None, robot=None):
     """Calculates new pose from controller-input ans returns it as a list
     `controls`:dict  inputs from controller
-    `currentPose`:list  poselist of current pose"""
+    `currentPose`:list  poselist of current pose
+    `workspace`:WorkspaceMap  reachable workspace to keep the pose in (hardcoded limits if not given)
+    `limits`:list  [min, max] for x, y, z, a, b, c from the configuration (optional, applied additionally)
+    `robot`:Robot  checks the new pose exactly with its inverse kinematics (see `WorkspaceMap.limit`)"""
     # 0Z---> y
     # |
     # V x 
     #print(controls)
+    # Create a copy so we do not save state here
+    current = list(pose) + [0] * (6 - len(pose))
+    pose = list(pose)
+
     dof = len(pose)
     if dof < 6:
         pose += [0] * (6 - dof)
-
-    # Create a copy so we do not save state here
-    pose = list(pose)
     # speedfactors
     rot_fac = 0.25
     trans_fac = 1
@@ -202,14 +234,19 @@ def get_movement_from_ws(controls, pose):
     pose[4] = rad(pose[4])
     pose[5] = rad(pose[5])
 
-    print(dof)
-    if dof == 3:
+    if limits is not None:
+        pose = check_max_val(pose, *limits)
+
+    if workspace is not None:
+        # an axis that would leave the workspace stops, the current pose is kept if nothing can move
+        pose = workspace.limit(current, pose, robot)
+
+    elif dof == 3:
         #TODO: Workspace begrenzung anpassen
         pose = check_max_val(pose, [-60, 60], [-60, 60], [-290,0], [0.3, 0.9], [0, 0], [0, 0])
 
     elif dof == 4:
         pose = check_max_val(pose, [-60, 60], [-60, 60], [-290,0], [0.4, 1], [0, 0], [0, 0])
-        print(pose)
 
     else:
         #TODO: Workspace begrenzung anpassen 
@@ -219,7 +256,7 @@ def get_movement_from_ws(controls, pose):
 
 
 def get_ws_inputs():
-    input_values = websiteInformation
+    input_values = jog_inputs.apply(websiteInformation)
     return input_values
 
 
@@ -39,74 +39,55 @@ class Quattro:
         return pos_square
 
     
-    def circle(radius=40, resolution=50, n=2, dirCirc=1, minHeight = -240.2, level = 60, endLevel = 30):
+    def circle(radius=40, n=2, dirCirc=1, minHeight = -240.2, level = 60, endLevel = 30):
         """Calculates coordinates for a 2D-circle
             `radius`: Radius of the circle
-            `resolution`: Number of circlepoints
             `n`: Number of rotations
             `dirCirc`: Direction of the circle
             `minHeight`: lowest posible z-Coordinate 
             `level`: Distance between minHeight and robotHeight
             `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-            linear moving
+            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+            linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
             """
 
         robotHeight = minHeight + level
         endHeight = minHeight + endLevel
 
-        t = np.linspace(0, n * 2 * m.pi, resolution * n)
+        angle = n * 2 * m.pi if dirCirc == 0 else -n * 2 * m.pi  # counterclockwise for dirCirc == 0
         circle_pos = []
         circle_pos.append([0, 0, robotHeight, 0.78, 0, 0, 'mov'])
         
         circle_pos.append([0, 0, robotHeight, 0.78, 0, 0, 'mov'])
         circle_pos.append([radius, 0, robotHeight, 0.78, 0, 0, 'lin'])
-
-        for num in t:
-            if dirCirc == 0:
-                x = m.cos(num) * radius
-                y = m.sin(num) * radius
-            else:
-                x = m.cos(num) * radius
-                y = m.sin(num - m.pi) * radius
-
-            circle_pos.append([x, y, robotHeight, 0.78, 0, 0, 'mov'])
+        circle_pos.append([radius, 0, robotHeight, 0.78, 0, 0, 'arc', [0, 0, robotHeight], angle, 0, None])
 
         circle_pos.append([0, 0, robotHeight, 0.78, 0, 0, 'lin'])
         circle_pos.append([0, 0, endHeight, 0.78, 0, 0, 'mov'])
 
         return circle_pos
 
-    def eight(radius=20, resolution=30, n=1, minHeight = -240.2, level = 60, endLevel = 30):
+    def eight(radius=20, n=1, minHeight = -240.2, level = 60, endLevel = 30):
         """Calculates coordinates for a 2D-eight
             `radius`: Radius of one of the two circles
-            `resolution`: Number of circlepoints
             `n`: Number of rotations
             `minHeight`: lowest posible z-Coordinate 
             `level`: Distance between minHeight and robotHeight
             `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-            linear moving
+            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+            linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
             """
 
         robotHeight = minHeight + level
         endHeight = minHeight + endLevel
 
         n = max(1, n)
-        t = np.linspace(0, n * 2 * m.pi, resolution * n)
         eight_pos = []
         eight_pos.append([0, 0, robotHeight, 0.78, 0, 0, 'mov'])
-        for num in t:
-            x = -m.sin(num) * radius
-            y = m.cos(num) * radius - radius
-            eight_pos.append([x, y, robotHeight, 0.78, 0, 0, 'mov'])
-
-        eight_pos.append([x, y, robotHeight, 0.78, 0, 0, 'mov'])
 
-        for num in t:
-            x = -m.sin(num) * radius
-            y = -m.cos(num) * radius + radius
-            eight_pos.append([x, y, robotHeight, 0.78, 0, 0, 'mov'])
+        # two circles touching in the middle: first counterclockwise, then clockwise
+        eight_pos.append([0, 0, robotHeight, 0.78, 0, 0, 'arc', [0, -radius, robotHeight], n * 2 * m.pi, 0, None])
+        eight_pos.append([0, 0, robotHeight, 0.78, 0, 0, 'arc', [0, radius, robotHeight], -n * 2 * m.pi, 0, None])
 
         eight_pos.append([0, 0, endHeight, 0.78, 0, 0, 'mov'])
         return eight_pos
@@ -158,36 +139,28 @@ class Quattro:
         return pick_place_pos
 
 
-    def cylinder(radius=32, resolution=40, minHeight = -240.2, lowerLevel= 40, upperLevel = 65,  endLevel = 30):
+    def cylinder(radius=32, minHeight = -240.2, lowerLevel= 40, upperLevel = 65,  endLevel = 30):
         """Calculates coordinates for a cylinder
         `radius`: Radius of the cylinder
-        `resolution`: Number of circlepoints
          `minHeight`: lowest posible z-Coordinate
         `lowerLevel`: height of lower area of the cylinder
         `upperLevel`: height of upper area of the cylinder
         `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-        `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-        linear moving
+        `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+        linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
         """
 
         down_circ = minHeight + lowerLevel
         up_circ = minHeight + upperLevel
         endHeight = minHeight + endLevel
 
-        t = np.linspace(0, 2 * m.pi, resolution)
         cylinder_pos = []
         cylinder_pos.append([0, 0, down_circ, 0.78, 0, 0, 'mov'])
-        for num in t:
-            x = -m.cos(num) * radius
-            y = m.sin(num) * radius
-
-            cylinder_pos.append([x, y, down_circ, 0.78, 0, 0, 'mov'])
-
-        for num in t:
-            x = -m.cos(num) * radius
-            y = m.sin(num) * radius
+        cylinder_pos.append([-radius, 0, down_circ, 0.78, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, down_circ, 0.78, 0, 0, 'arc', [0, 0, down_circ], -2 * m.pi, 0, None])
 
-            cylinder_pos.append([x, y, up_circ, 0.78, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, up_circ, 0.78, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, up_circ, 0.78, 0, 0, 'arc', [0, 0, up_circ], -2 * m.pi, 0, None])
 
         cylinder_pos.append([0, 0, endHeight, 0.78, 0, 0, 'mov'])
         return cylinder_pos
@@ -345,72 +318,54 @@ class Delta:
         pos_triangle.append([0, 0, endHeight, 0, 0, 0, 'mov'])
         return pos_triangle
 
-    def circle(radius=40, resolution=50, n=2, dirCirc=1, minHeight = -214.8, level= 50, endLevel = 30):
+    def circle(radius=40, n=2, dirCirc=1, minHeight = -214.8, level= 50, endLevel = 30):
         """Calculates coordinates for a 2D-circle
             `radius`: Radius of the circle
-            `resolution`: Number of circlepoints
             `n`: Number of rotations
             `dirCirc`: Direction of the circle
             `minHeight`: lowest posible z-Coordinate 
             `level`: Distance between minHeight and robotHeight
             `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-            linear moving
+            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+            linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
             """
 
         robotHeight = minHeight + level
         endHeight = minHeight + endLevel
 
-        t = np.linspace(0, n * 2 * m.pi, resolution * n)
+        angle = n * 2 * m.pi if dirCirc == 0 else -n * 2 * m.pi  # counterclockwise for dirCirc == 0
         circle_pos = []
         
         circle_pos.append([0, 0, robotHeight, 0, 0, 0, 'mov'])
         circle_pos.append([radius, 0, robotHeight, 0, 0, 0, 'lin'])
-
-        for num in t:
-            if dirCirc == 0:
-                x = m.cos(num) * radius
-                y = m.sin(num) * radius
-            else:
-                x = m.cos(num) * radius
-                y = m.sin(num - m.pi) * radius
-
-            circle_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
+        circle_pos.append([radius, 0, robotHeight, 0, 0, 0, 'arc', [0, 0, robotHeight], angle, 0, None])
 
         circle_pos.append([0, 0, robotHeight, 0, 0, 0, 'lin'])
         circle_pos.append([0, 0, endHeight, 0, 0, 0, 'mov'])
 
         return circle_pos
 
-    def eight(radius=15, resolution=30, n=1, minHeight = -214.8, level= 50, endLevel = 30):
+    def eight(radius=15, n=1, minHeight = -214.8, level= 50, endLevel = 30):
         """Calculates coordinates for a 2D-eight
             `radius`: Radius of one of the two circles
-            `resolution`: Number of circlepoints
             `n`: Number of rotations
             `minHeight`: lowest posible z-Coordinate 
             `level`: Distance between minHeight and robotHeight
             `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-            linear moving
+            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+            linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
             """
 
         robotHeight = minHeight + level
         endHeight = minHeight + endLevel
 
         n = max(1, n)
-        t = np.linspace(0, n * 2 * m.pi, resolution * n)
         eight_pos = []
-        for num in t:
-            x = -m.sin(num) * radius
-            y = m.cos(num) * radius - radius
-            eight_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
+        eight_pos.append([0, 0, robotHeight, 0, 0, 0, 'mov'])
 
-        eight_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
-
-        for num in t:
-            x = -m.sin(num) * radius
-            y = -m.cos(num) * radius + radius
-            eight_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
+        # two circles touching in the middle: first counterclockwise, then clockwise
+        eight_pos.append([0, 0, robotHeight, 0, 0, 0, 'arc', [0, -radius, robotHeight], n * 2 * m.pi, 0, None])
+        eight_pos.append([0, 0, robotHeight, 0, 0, 0, 'arc', [0, radius, robotHeight], -n * 2 * m.pi, 0, None])
 
         eight_pos.append([0, 0, endHeight, 0, 0, 0, 'mov'])
         return eight_pos
@@ -523,35 +478,27 @@ class Delta:
 
         return rectangle_pos
 
-    def cylinder(radius=25, resolution=30, minHeight = -214.8, lowerLevel= 40, upperLevel = 60,  endLevel = 30):
+    def cylinder(radius=25, minHeight = -214.8, lowerLevel= 40, upperLevel = 60,  endLevel = 30):
         """Calculates coordinates for a cylinder
         `radius`: Radius of the cylinder
-        `resolution`: Number of circlepoints
          `minHeight`: lowest posible z-Coordinate
         `lowerLevel`: height of lower area of the cylinder
         `upperLevel`: height of upper area of the cylinder
         `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-        `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-        linear moving
+        `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+        linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
         """
 
         down_circ = minHeight + lowerLevel
         up_circ = minHeight + upperLevel
         endHeight = minHeight + endLevel
 
-        t = np.linspace(0, 2 * m.pi, resolution)
         cylinder_pos = []
-        for num in t:
-            x = -m.cos(num) * radius
-            y = m.sin(num) * radius
-
-            cylinder_pos.append([x, y, down_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, down_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, down_circ, 0, 0, 0, 'arc', [0, 0, down_circ], -2 * m.pi, 0, None])
 
-        for num in t:
-            x = -m.cos(num) * radius
-            y = m.sin(num) * radius
-
-            cylinder_pos.append([x, y, up_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, up_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, up_circ, 0, 0, 0, 'arc', [0, 0, up_circ], -2 * m.pi, 0, None])
 
         cylinder_pos.append([0, 0, endHeight, 0, 0, 0, 'mov'])
         return cylinder_pos
@@ -709,72 +656,54 @@ class sixRUS:
         pos_triangle.append([0, 0, endHeight, 0, 0, 0, 'mov'])
         return pos_triangle
 
-    def circle(radius=40, resolution=50, n=2, dirCirc=1, minHeight = -256.2, level= 50, endLevel = 30):
+    def circle(radius=40, n=2, dirCirc=1, minHeight = -256.2, level= 50, endLevel = 30):
         """Calculates coordinates for a 2D-circle
             `radius`: Radius of the circle
-            `resolution`: Number of circlepoints
             `n`: Number of rotations
             `dirCirc`: Direction of the circle
             `minHeight`: lowest posible z-Coordinate 
             `level`: Distance between minHeight and robotHeight
             `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-            linear moving
+            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+            linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
             """
 
         robotHeight = minHeight + level
         endHeight = minHeight + endLevel
 
-        t = np.linspace(0, n * 2 * m.pi, resolution * n)
+        angle = n * 2 * m.pi if dirCirc == 0 else -n * 2 * m.pi  # counterclockwise for dirCirc == 0
         circle_pos = []
         
         circle_pos.append([0, 0, robotHeight, 0, 0, 0, 'mov'])
         circle_pos.append([radius, 0, robotHeight, 0, 0, 0, 'lin'])
-
-        for num in t:
-            if dirCirc == 0:
-                x = m.cos(num) * radius
-                y = m.sin(num) * radius
-            else:
-                x = m.cos(num) * radius
-                y = m.sin(num - m.pi) * radius
-
-            circle_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
+        circle_pos.append([radius, 0, robotHeight, 0, 0, 0, 'arc', [0, 0, robotHeight], angle, 0, None])
 
         circle_pos.append([0, 0, robotHeight, 0, 0, 0, 'lin'])
         circle_pos.append([0, 0, endHeight, 0, 0, 0, 'mov'])
 
         return circle_pos
 
-    def eight(radius=15, resolution=30, n=1, minHeight = -256.2, level= 50, endLevel = 30):
+    def eight(radius=15, n=1, minHeight = -256.2, level= 50, endLevel = 30):
         """Calculates coordinates for a 2D-eight
             `radius`: Radius of one of the two circles
-            `resolution`: Number of circlepoints
             `n`: Number of rotations
             `minHeight`: lowest posible z-Coordinate 
             `level`: Distance between minHeight and robotHeight
             `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-            linear moving
+            `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+            linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
             """
 
         robotHeight = minHeight + level
         endHeight = minHeight + endLevel
 
         n = max(1, n)
-        t = np.linspace(0, n * 2 * m.pi, resolution * n)
         eight_pos = []
-        for num in t:
-            x = -m.sin(num) * radius
-            y = m.cos(num) * radius - radius
-            eight_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
+        eight_pos.append([0, 0, robotHeight, 0, 0, 0, 'mov'])
 
-        eight_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
-
-        for num in t:
-            x = -m.sin(num) * radius
-            y = -m.cos(num) * radius + radius
-            eight_pos.append([x, y, robotHeight, 0, 0, 0, 'mov'])
+        # two circles touching in the middle: first counterclockwise, then clockwise
+        eight_pos.append([0, 0, robotHeight, 0, 0, 0, 'arc', [0, -radius, robotHeight], n * 2 * m.pi, 0, None])
+        eight_pos.append([0, 0, robotHeight, 0, 0, 0, 'arc', [0, radius, robotHeight], -n * 2 * m.pi, 0, None])
 
         eight_pos.append([0, 0, endHeight, 0, 0, 0, 'mov'])
         return eight_pos
@@ -887,35 +816,27 @@ class sixRUS:
 
         return rectangle_pos
 
-    def cylinder(radius=25, resolution=30, minHeight = -256.2, lowerLevel= 40, upperLevel = 60,  endLevel = 30):
+    def cylinder(radius=25, minHeight = -256.2, lowerLevel= 40, upperLevel = 60,  endLevel = 30):
         """Calculates coordinates for a cylinder
         `radius`: Radius of the cylinder
-        `resolution`: Number of circlepoints
          `minHeight`: lowest posible z-Coordinate
         `lowerLevel`: height of lower area of the cylinder
         `upperLevel`: height of upper area of the cylinder
         `endLevel`: Distance betwenn minHeight and endHeight at the end of programm
-        `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP or [x,y,z,a,b,c,'lin'] for
-        linear moving
+        `return`: List of positions and driving mode. Exmaple: [x,y,z,a,b,c,'mov'] for PTP, [x,y,z,a,b,c,'lin'] for
+        linear moving or [x,y,z,a,b,c,'arc',center,angle,height,vel] for moving on an arc
         """
 
         down_circ = minHeight + lowerLevel
         up_circ = minHeight + upperLevel
         endHeight = minHeight + endLevel
 
-        t = np.linspace(0, 2 * m.pi, resolution)
         cylinder_pos = []
-        for num in t:
-            x = -m.cos(num) * radius
-            y = m.sin(num) * radius
-
-            cylinder_pos.append([x, y, down_circ, 0, 0, 0, 'mov'])
-
-        for num in t:
-            x = -m.cos(num) * radius
-            y = m.sin(num) * radius
+        cylinder_pos.append([-radius, 0, down_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, down_circ, 0, 0, 0, 'arc', [0, 0, down_circ], -2 * m.pi, 0, None])
 
-            cylinder_pos.append([x, y, up_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, up_circ, 0, 0, 0, 'mov'])
+        cylinder_pos.append([-radius, 0, up_circ, 0, 0, 0, 'arc', [0, 0, up_circ], -2 * m.pi, 0, None])
 
         cylinder_pos.append([0, 0, endHeight, 0, 0, 0, 'mov'])
         return cylinder_pos
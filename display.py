@@ -1,5 +1,6 @@
 import math
-from threading import Lock
+import time
+from threading import Condition, Lock, Thread
 from typing import List
 
 from RPLCD.i2c import CharLCD
@@ -45,6 +46,10 @@ class LCD:
         0b11111,
     )
 
+    ROWS = 4
+    COLS = 20
+    MAX_REFRESH_RATE = 10  # maximum number of display updates per second
+
     def __init__(self):
         # Adress and port expander type are fixed
         # Hide the specific implementation used
@@ -57,9 +62,74 @@ class LCD:
             self._lcd.create_char(self.CONNECTED_CHAR, self.CONNECTED_SYMBOL)
             self._lcd.create_char(self.DISCONNECTED_CHAR, self.DISCONNECTED_SYMBOL)
 
+        # Frame buffer with the wanted content and the content that is currently on the display.
+        # The print-methods only change the frame buffer, the render thread writes it to the display.
+        self._frame = [[' '] * self.COLS for _ in range(self.ROWS)]
+        self._shown = [[None] * self.COLS for _ in range(self.ROWS)]  # unknown content -> write everything
+        self._dirty = False
+        self._running = True
+        self._cond = Condition()
+
+        if self.connected:
+            self._thread = Thread(target=self._render_loop, name='LCD', daemon=True)
+            self._thread.start()
+
+    def _set_cells(self, row: int, col: int, text: str):
+        """Writes `text` into the frame buffer (cut at the end of the row) and wakes up the render thread"""
+        with self._cond:
+            for i, char in enumerate(text[:self.COLS - col]):
+                self._frame[row][col + i] = char
+            self._dirty = True
+            self._cond.notify()
+
+    def _render_loop(self):
+        """Writes the frame buffer to the display. Updates that arrive faster than `MAX_REFRESH_RATE` get
+        coalesced and only the character cells that changed are sent over I²C"""
+        t_last = 0.0
+
+        while True:
+            with self._cond:
+                while not self._dirty and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+
+            # limit the refresh rate, updates in the meantime end up in the same frame
+            dt = t_last + 1 / self.MAX_REFRESH_RATE - time.time()
+            if dt > 0:
+                time.sleep(dt)
+
+            with self._cond:
+                frame = [list(row) for row in self._frame]
+                self._dirty = False
+
+            t_last = time.time()
+            self._write_changes(frame)
+
+    def _write_changes(self, frame):
+        """Sends all runs of changed characters of `frame` to the display"""
+        for row in range(self.ROWS):
+            col = 0
+            while col < self.COLS:
+                if frame[row][col] == self._shown[row][col]:
+                    col += 1
+                    continue
+
+                # collect the run of changed cells
+                start = col
+                while col < self.COLS and frame[row][col] != self._shown[row][col]:
+                    col += 1
+
+                # Critical section
+                with self.LOCK:
+                    self._lcd.cursor_pos = (row, start)
+                    self._lcd.write_string(''.join(frame[row][start:col]))
+
+                self._shown[row][start:col] = frame[row][start:col]
+
     def print_pose(self, pose: List[float]):
         """
-        Prints a pose on the lower three rows of the display
+        Prints a pose on the lower three rows of the display (does not wait for the display)
         """
         if self.connected:
             rows = 3 * ['']
@@ -75,43 +145,29 @@ class LCD:
 
                 rows[i % 3] += f'{ax}{val:+0{self.WIDTH}.{self.POST_DECIMAL_PLACE}f}{unit}{space}'
 
-            display_str = '\r\n'.join(rows)
-
-            # Critical section
-            with self.LOCK:
-                # Set cursor to start of second row and write positions
-                self._lcd.cursor_pos = (1, 0)
-                self._lcd.write_string(display_str)
+            # Set rows two to four of the frame (clear the rest of the rows)
+            for i, row in enumerate(rows):
+                self._set_cells(i + 1, 0, row.ljust(self.COLS))
 
     def print_connection(self, is_connected: bool):
         if self.connected:
-            # Critical section
-            with self.LOCK:
-                # Move cursor to upper right corner
-                self._lcd.cursor_pos = (0, self.STATUS_LEN + 1)
-
-                if is_connected:
-                    self._lcd.write_string(chr(self.CONNECTED_CHAR))
-                else:
-                    self._lcd.write_string(chr(self.DISCONNECTED_CHAR))
+            # upper right corner
+            if is_connected:
+                self._set_cells(0, self.STATUS_LEN + 1, chr(self.CONNECTED_CHAR))
+            else:
+                self._set_cells(0, self.STATUS_LEN + 1, chr(self.DISCONNECTED_CHAR))
 
     def print_status(self, status: str):
         if self.connected:
-            # Critical section
-            with self.LOCK:
-                self._lcd.home()
-
-            if len(status) > self.STATUS_LEN:
-                status = status[:self.STATUS_LEN + 1]
-            else:
-                status += ' ' * (self.STATUS_LEN - len(status))
-
-            # Critical section
-            with self.LOCK:
-                self._lcd.write_string(status)
+            # start of the first row
+            self._set_cells(0, 0, status[:self.STATUS_LEN].ljust(self.STATUS_LEN))
 
     def __del__(self):
         if self.connected:
+            with self._cond:
+                self._running = False
+                self._cond.notify()
+
             # Critical section
             with self.LOCK:
                 self._lcd.close()
@@ -0,0 +1,189 @@
+"""G-code interpreter for a subset of G-code (as written by CAM and pick-and-place tools):
+
+G0 rapid (PTP) movement        G1 linear movement            G2/G3 arc or helix clockwise/counterclockwise (I J or R)
+G4 dwell (P [ms] or S [s])     G17 xy-plane (only plane)     G20/G21 inch/mm
+G90/G91 absolute/relative      F feed [unit/min]             X Y Z position, A B C rotation [deg]
+
+Z is measured from the lowest height of the robot (z of the homing pose), like the levels of the demo programs.
+The 6-RUS uses A, B and C, the Quattro C (rotation around the z-axis). M-codes, tool numbers and line numbers
+are ignored. Programs are read line by line, so files of any length run in constant memory.
+"""
+
+import logging
+import math as m
+import os
+import re
+import time
+from collections import deque
+
+from Robot import WorkspaceViolation
+
+# Directory for uploaded G-code files
+GCODE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gcode')
+
+LOOKAHEAD = 16  # number of waypoints checked against the workspace before the robot moves
+ARC_TOLERANCE = 0.1  # allowed difference between start and end radius of an arc in [mm]
+
+# index of the rotation words in the pose, depending on the degrees of freedom
+ROTATION_AXES = {3: {}, 4: {'C': 3}, 6: {'A': 3, 'B': 4, 'C': 5}}
+
+_WORD = re.compile(r'([A-Z])\s*([-+]?(?:\d+\.?\d*|\.\d+))')
+_COMMENT = re.compile(r'\(.*?\)|;.*')
+
+
+def parse_line(line: str) -> dict:
+    """splits one line into its words
+    `returns`: dict letter -> list of values (G and M can appear several times in one line)"""
+    words = {}
+    for letter, value in _WORD.findall(_COMMENT.sub('', line).upper()):
+        words.setdefault(letter, []).append(float(value))
+    return words
+
+
+def waypoints(lines, robot):
+    """
+    Interprets G-code lines and yields the waypoints one after another
+    (nothing is read in advance, `lines` can be an open file)
+
+    `lines`: iterable of G-code lines
+    `robot`: robot to move, the program starts at its current pose
+
+    `yields`: waypoints as used by `Runtime.run_waypoints`: [x, y, z, a, b, c, 'mov'], [.., 'lin', vel],
+    [.., 'arc', center, angle, height, vel] or [.., 'wait', seconds]
+    """
+    min_height = float(robot.homePose[2])
+    axes = ROTATION_AXES[robot.dof]
+    pose = [float(v) for v in robot.currPose] + [0.0] * (6 - robot.dof)
+
+    motion = 0  # modal motion mode (G0, G1, G2 or G3)
+    absolute = True
+    scale = 1.0  # [mm] per unit
+    vel = None  # feed in [cm/s]
+
+    for nr, line in enumerate(lines, 1):
+        words = parse_line(line)
+        if not words:
+            continue
+
+        move = False
+        for g in words.get('G', []):
+            if g in (0, 1, 2, 3):
+                motion = int(g)
+                move = True
+            elif g == 4:
+                yield pose + ['wait', words['P'][0] / 1000 if 'P' in words else words.get('S', [0])[0]]
+            elif g == 17:
+                pass
+            elif g in (20, 21):
+                scale = 25.4 if g == 20 else 1.0
+            elif g in (90, 91):
+                absolute = g == 90
+            else:
+                raise ValueError(f'line {nr}: G{g:g} is not supported')
+
+        if 'F' in words:
+            vel = words['F'][0] * scale / 600  # [unit/min] -> [cm/s]
+
+        for letter in 'ABC':
+            if letter in words and letter not in axes:
+                raise ValueError(f'line {nr}: the robot has no {letter}-axis')
+
+        if not (move or any(k in words for k in 'XYZ') or any(k in words for k in axes)):
+            continue  # no movement in this line
+
+        # new pose from the words (modal motion mode)
+        new_pose = list(pose)
+        for i, letter in enumerate('XYZ'):
+            if letter in words:
+                val = words[letter][0] * scale
+                new_pose[i] = new_pose[i] + val if not absolute else val + (min_height if letter == 'Z' else 0)
+        for letter, i in axes.items():
+            if letter in words:
+                val = m.radians(words[letter][0])
+                new_pose[i] = new_pose[i] + val if not absolute else val
+
+        if motion == 0:
+            yield new_pose + ['mov']
+        elif motion == 1:
+            yield new_pose + ['lin', vel]
+        else:
+            if new_pose[3:] != pose[3:]:
+                raise ValueError(f'line {nr}: the rotation can not change during an arc')
+            center, angle = _arc(pose, new_pose, words, scale, motion == 2, nr)
+            yield new_pose + ['arc', center, angle, new_pose[2] - pose[2], vel]
+
+        pose = new_pose
+
+
+def _arc(start, end, words, scale, clockwise, nr):
+    """center and angle of an arc in the xy-plane, given by the center offset (I, J) or the radius (R)"""
+    dx, dy = end[0] - start[0], end[1] - start[1]
+
+    if 'R' in words:
+        r = words['R'][0] * scale
+        chord = m.hypot(dx, dy)
+        if chord == 0 or chord > 2 * abs(r) + ARC_TOLERANCE:
+            raise ValueError(f'line {nr}: no arc with radius {abs(r):g} through these points')
+        # center lies on the perpendicular bisector of the chord (negative radius: arc longer than 180 deg)
+        h = m.sqrt(max(r ** 2 - (chord / 2) ** 2, 0))
+        if clockwise == (r > 0):
+            h = -h
+        cx = start[0] + dx / 2 - h * dy / chord
+        cy = start[1] + dy / 2 + h * dx / chord
+    else:
+        cx = start[0] + words.get('I', [0])[0] * scale
+        cy = start[1] + words.get('J', [0])[0] * scale
+
+    r_start = m.hypot(start[0] - cx, start[1] - cy)
+    r_end = m.hypot(end[0] - cx, end[1] - cy)
+    if abs(r_start - r_end) > ARC_TOLERANCE:
+        raise ValueError(f'line {nr}: start and end of the arc have different radii')
+
+    a0 = m.atan2(start[1] - cy, start[0] - cx)
+    a1 = m.atan2(end[1] - cy, end[0] - cx)
+    if clockwise:
+        angle = -((a0 - a1) % (2 * m.pi)) or -2 * m.pi  # identical points: full circle
+    else:
+        angle = ((a1 - a0) % (2 * m.pi)) or 2 * m.pi
+
+    return [cx, cy, start[2]], angle
+
+
+def lookahead(waypoints, robot, size: int = LOOKAHEAD):
+    """
+    Checks up to `size` waypoints ahead of the robot with the inverse kinematics, so a program stops before the
+    first unreachable pose instead of running into it. The calculated steps stay in the step cache of the robot.
+    Raises WorkspaceViolation when an unreachable waypoint is found.
+    """
+    buffer = deque()
+    for pos in waypoints:
+        if pos[6] != 'wait':
+            try:
+                robot.pose2steps(pos[:robot.dof])
+            except WorkspaceViolation:
+                raise WorkspaceViolation(f'Pose {pos[:robot.dof]} is not reachable') from None
+
+        buffer.append(pos)
+        if len(buffer) > size:
+            yield buffer.popleft()
+
+    yield from buffer
+
+
+def save_upload(stream, name: str = None, directory: str = GCODE_DIR, chunk_size: int = 64 * 1024):
+    """stores an uploaded program chunk by chunk in `directory`
+    `stream`: file-like object with the program
+    `returns`: path of the file"""
+    name = ''.join(c if c.isalnum() or c in '-_.' else '_' for c in (name or f'upload_{int(time.time())}'))
+    path = os.path.join(directory, os.path.basename(name))
+
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'wb') as f:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            f.write(chunk)
+
+    logging.info(f'Stored G-code program {path}')
+    return path
@@ -1,15 +1,26 @@
-from Quattro import Quattro
 import RPi.GPIO as GPIO
 import logging
-import stepper
+import time
+from math import ceil, sqrt, pi
+from threading import Event
 from Robot import Robot
 from time import sleep
 
+HOME_STEPS = 200    # steps from the light barriers to the ready position (homing pose of the robot)
+HOME_MODE = 1 / 4   # microstep mode of these steps
+STEP_PULSE = 2e-6   # shortest high time of a step pulse in [s] (DRV8825: 1.9 µs)
+HOMING_TURNS = 0.6  # turns of an arm towards its lightbarrier before the homing fails (a bit more than its travel)
 
-def set_steppermode(stepper_mode):
-    """ This function sets the microstep pins to the desired resolution for homing """
 
-    mode = (21,20,16)
+class HomingError(RuntimeError):
+    """ An arm did not reach its lightbarrier """
+
+
+def set_steppermode(stepper_mode, mode_pins=Robot.MODE_PINS):
+    """ This function sets the microstep pins to the desired resolution for homing
+        `mode_pins`: microstep pins M0, M1, M2 """
+
+    mode = tuple(mode_pins)
     resolution = {
             1: (0, 0, 0),
             1 / 2: (1, 0, 0),
@@ -24,67 +35,171 @@ def set_steppermode(stepper_mode):
     GPIO.output(mode, resolution[stepper_mode])  # set Mode-Pins to desired values
 
 
-def homing_fast_new(steppermode,dof):
-    """ This function handles the automatic calibration for the Robot.
-        For a time efficient process it is run with 1/2 step mode followed by 1/32 step mode for precise positioning"""
-
-    print('in homing')
-    go_step = [1,1,1,1,1,1]
-    test =[0,0,0,0,0,0]
-    direction = [1,1,1,1,1,1] 
-    
-    set_steppermode(steppermode)
-
-    # Check if ligthbarrier is blocked
-    while go_step[:dof] != test[:dof]:
-        
-        for j in range(0,dof,1):
-            sensor=GPIO.input(Robot.Lightbarrier_Pins[j])
-            
-            if sensor == 1:
-                go_step[j] = 1 
-            elif sensor == 0:
-                go_step[j] = 0
-
-        # rotation compensation for 6RUS    
-        if dof == 6:
-            direction = [1,-1,1,-1,1,-1]
-
-        # do steps on every arm where lightbarrier is not blocked
-        stepper.do_multi_step(go_step[:dof],Robot.STEP_PINS[:dof],Robot.DIR_PINS[:dof],direction[:dof])
-
-    go_step= [1,1,1,1,1,1]
-    direction = [-1,-1,-1,-1,-1,-1]
-
-    # compensate for positioning of the motors
-    if dof == 6:
-        direction = [-1,1,-1,1,-1,1]
-
-    for i in range(0,8,1):
-        if steppermode == 1/32:
-            # Dont move out of Position while in precise positioning
-            break
+def move_home(dof, robot=None):
+    """ Moves the Robot to a ready Position
+        `robot`: robot whose pins are used (default: pins of the Robot class) """
+
+    step_pins, dir_pins, _, mode_pins = _pins(dof, robot)
+    set_steppermode(HOME_MODE, mode_pins)
+    direction = [-d for d in towards_barrier(dof)]
+
+    # all arms move the same distance, accelerated instead of with a fixed delay
+    step_axes(step_pins, dir_pins, direction, [HOME_STEPS] * dof)
+
+    set_steppermode(_run_mode(robot), mode_pins)
+
+
+def towards_barrier(dof):
+    """ direction of the light barriers for every arm (compensates for positioning of the motors of the 6RUS) """
+
+    return ([1, -1] * 3)[:dof] if dof == 6 else [1] * dof
+
+
+def edge_steps(robot):
+    """ step counts of `robot` at the edges of its light barriers. The ready position after `move_home` is the
+        homing pose (90°) of the robot, the edges are `HOME_STEPS` towards the light barriers from there """
+
+    home = robot.angles2steps([pi / 2] * robot.dof)
+    distance = HOME_STEPS * HOME_MODE / robot.stepperMode  # in steps of the robot
+    # the robot counts its steps with the rotation compensation, the directions of the pins are without it
+    return [int(h + t * c * distance)
+            for h, t, c in zip(home.tolist(), towards_barrier(robot.dof), robot.rotation_compensation.tolist())]
+
+
+def _pins(dof, robot=None):
+    """ step, direction, lightbarrier and microstep pins of `robot` (or of the Robot class) """
+
+    if robot is None:
+        return Robot.STEP_PINS[:dof], Robot.DIR_PINS[:dof], Robot.Lightbarrier_Pins[:dof], Robot.MODE_PINS
+    return robot.stepPins, robot.dirPins, robot.lightbarrierpins, (robot.M0, robot.M1, robot.M2)
+
+
+def travel_steps(stepper_mode, robot=None, turns=HOMING_TURNS):
+    """ number of steps in `stepper_mode` for `turns` turns of an arm of `robot` (or of a 200 steps motor) """
+
+    steps_per_rev = 200 if robot is None else robot.stepsPerRev
+    return ceil(turns * steps_per_rev / stepper_mode)
+
+
+def _run_mode(robot=None):
+    """ microstep mode the robot moves in (restored after the homing) """
+
+    return 1 / 32 if robot is None else robot.stepperMode
+
+
+def ramp_delay(n, start_delay, min_delay):
+    """ Delay before step `n` (starting at 0) for a constant acceleration from standstill.
+        The first step takes `start_delay`, the delay never gets shorter than `min_delay` """
+
+    return max(min_delay, start_delay * (sqrt(n + 1) - sqrt(n)))
+
+
+def step_axes(step_pins, dir_pins, directions, counts=None, stop_flags=None,
+              start_delay=0.02, min_delay=0.004, max_steps=None):
+    """ Drives every axis on its own step schedule with acceleration. An axis stops independently
+        as soon as it made its number of steps or its stop flag is set, the other axes keep going.
+
+        `step_pins`, `dir_pins`: GPIO pins of the axes
+        `directions`: direction of every axis (> 0 -> positive)
+        `counts`: number of steps per axis (`None`: step until the stop flag is set)
+        `stop_flags`: list of threading.Event, one per axis (e.g. set by a lightbarrier interrupt)
+        `start_delay`: delay of the first step in [s]
+        `min_delay`: shortest delay between two steps in [s] (top speed)
+        `max_steps`: safety limit if an axis never gets stopped (needed without `counts`, see `travel_steps`)
+
+        `returns`: list with the number of steps made by every axis
+        raises HomingError if an axis without a number of steps made `max_steps` without being stopped """
+
+    axes = range(len(step_pins))
+    until_stopped = counts is None
+    if until_stopped:
+        if max_steps is None:
+            raise ValueError('Stepping until the stop flags are set needs max_steps')
+        counts = [max_steps] * len(step_pins)
+
+    # set all direction pins once
+    for i in axes:
+        GPIO.output(dir_pins[i], int(directions[i] > 0))
+
+    made = [0] * len(step_pins)
+    t_st = time.perf_counter()
+    next_step = [t_st] * len(step_pins)  # point in time of the next step for each axis
+    active = [i for i in axes if counts[i] > 0]
+
+    while active:
+        # serve the axis whose step is due first
+        i = min(active, key=next_step.__getitem__)
+
+        dt = next_step[i] - time.perf_counter()
+        if dt > 0:
+            sleep(dt)
+
+        if stop_flags is not None and stop_flags[i].is_set():
+            active.remove(i)
+            continue
+
+        GPIO.output(step_pins[i], GPIO.HIGH)
+        sleep(STEP_PULSE)
+        GPIO.output(step_pins[i], GPIO.LOW)
+        made[i] += 1
+
+        if made[i] >= counts[i]:
+            if until_stopped:
+                raise HomingError(f'Axis {i} did not reach its lightbarrier within {max_steps} steps')
+            active.remove(i)
         else:
-            # Move out of Top Position for precise positioning
-            stepper.do_multi_step(go_step[:dof],Robot.STEP_PINS[:dof],Robot.DIR_PINS[:dof],direction[:dof])
-            
-    set_steppermode(1 / 32)
-
-
-def move_home(dof):
-    """ Moves the Robot to a ready Position """
-
-    set_steppermode(1/4)
-    go_step= [1,1,1,1,1,1]
-    direction = [-1,-1,-1,-1,-1,-1]
-
-    # compensate for positioning of the motors
-    if dof == 6:
-        direction = [-1,1,-1,1,-1,1]
-    
-    for i in range(0,200,1):
-       
-       stepper.do_multi_step(go_step[:dof],Robot.STEP_PINS[:dof],Robot.DIR_PINS[:dof],direction[:dof])
-            
-    set_steppermode(1 / 32)
+            next_step[i] += ramp_delay(made[i], start_delay, min_delay)
+
+    return made
+
+
+def homing_parallel(dof, fast_mode=1 / 2, fine_mode=1 / 32, back_off=8, fine_delay=0.0005, robot=None):
+    """ Calibrates all arms at once: every arm runs with its own accelerated step schedule towards its
+        lightbarrier and gets stopped by a GPIO interrupt the moment the barrier trips. Afterwards all
+        arms move back a few steps and do the precise approach in `fine_mode` only near the switch.
+
+        `dof`: number of arms
+        `fast_mode`: microstep mode of the fast approach
+        `fine_mode`: microstep mode of the precise approach
+        `back_off`: steps (in `fast_mode`) to move out of the lightbarrier before the precise approach
+        `fine_delay`: delay between the steps of the precise approach in [s]
+        `robot`: robot whose pins are used (default: pins of the Robot class)
+
+        raises HomingError if an arm did not reach its lightbarrier """
+
+    t_st = time.time()
+    step_pins, dir_pins, barrier_pins, mode_pins = _pins(dof, robot)
+
+    towards = towards_barrier(dof)
+    away = [-d for d in towards]
+
+    tripped = [Event() for _ in range(dof)]
+
+    def approach(**kwargs):
+        # a lightbarrier is blocked if its input is low
+        for i, pin in enumerate(barrier_pins):
+            tripped[i].clear()
+            if GPIO.input(pin) == 0:
+                tripped[i].set()
+        return step_axes(step_pins, dir_pins, towards, stop_flags=tripped, **kwargs)
+
+    for i, pin in enumerate(barrier_pins):
+        GPIO.add_event_detect(pin, GPIO.FALLING, callback=lambda _, i=i: tripped[i].set())
+
+    try:
+        set_steppermode(fast_mode, mode_pins)
+        fast_steps = approach(max_steps=travel_steps(fast_mode, robot))
+
+        # Move out of Top Position for precise positioning
+        step_axes(step_pins, dir_pins, away, [back_off] * dof)
+
+        set_steppermode(fine_mode, mode_pins)
+        fine_steps = approach(start_delay=fine_delay, min_delay=fine_delay,
+                              max_steps=4 * int(back_off * fast_mode / fine_mode))
+    finally:
+        for pin in barrier_pins:
+            GPIO.remove_event_detect(pin)
+        set_steppermode(_run_mode(robot), mode_pins)
+
+    logging.info(f'Homing done in {time.time() - t_st:.1f} s (fast steps: {fast_steps}, fine steps: {fine_steps})')
     
\ No newline at end of file
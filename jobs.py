@@ -0,0 +1,209 @@
+import itertools
+import math
+import queue
+import threading
+import time
+from collections import OrderedDict
+
+MAX_QUEUED = 32  # jobs that can wait for the robot
+MAX_HISTORY = 256  # finished jobs that can still be queried
+
+# parameters every type of job needs
+KINDS = {
+    'move': ('pose',),
+    'lin': ('pose',),
+    'arc': ('center', 'angle'),
+    'waypoints': ('waypoints',),
+    'program': ('name',),
+}
+
+
+def _number(value, name: str, positive: bool = False, optional: bool = False):
+    """raises ValueError if `value` is not a finite number (or not > 0 if `positive`, None is allowed if `optional`)"""
+    if value is None and optional:
+        return
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise ValueError(f'{name} must be a finite number, not {value!r}')
+    if positive and value <= 0:
+        raise ValueError(f'{name} must be positive, not {value!r}')
+
+
+def _pose(value, name: str = 'pose', min_len: int = 1, max_len: int = 6):
+    """raises ValueError if `value` is not a list of `min_len` to `max_len` finite numbers"""
+    if not isinstance(value, (list, tuple)) or not min_len <= len(value) <= max_len:
+        count = min_len if min_len == max_len else f'{min_len} to {max_len}'
+        raise ValueError(f'{name} must be a list of {count} numbers')
+    for v in value:
+        _number(v, name)
+
+
+def check_waypoint(pos):
+    """raises ValueError if `pos` is not a valid waypoint (see `Robot.mov_waypoint` and `Runtime.run_waypoints`)"""
+    if not isinstance(pos, (list, tuple)) or len(pos) < 6:
+        raise ValueError(f'A waypoint needs [x, y, z, a, b, c] and optionally its type and parameters, not {pos!r}')
+    _pose(pos[:6], 'waypoint pose', 6)
+    kind = pos[6] if len(pos) > 6 else 'mov'
+    params = list(pos[7:])
+    if kind == 'mov':
+        return
+    if kind == 'lin':
+        _number(params[0] if params else None, 'vel', positive=True, optional=True)
+    elif kind == 'arc':
+        if len(params) != 4:
+            raise ValueError('An arc waypoint needs center, angle, height and vel')
+        _pose(params[0], 'center', 3, 3)
+        _number(params[1], 'angle')
+        _number(params[2], 'height')
+        _number(params[3], 'vel', positive=True, optional=True)
+    elif kind == 'spline':
+        if not params or not isinstance(params[0], (list, tuple)):
+            raise ValueError('A spline waypoint needs a list of poses')
+        for p in params[0]:
+            _pose(p, 'spline pose', 6)
+        _number(params[1] if len(params) > 1 else None, 'vel', positive=True, optional=True)
+    elif kind == 'wait':
+        _number(params[0] if params else None, 'wait time')
+        if params[0] < 0:
+            raise ValueError('wait time must not be negative')
+    else:
+        raise ValueError(f'Unknown waypoint type: {kind}')
+
+
+class Job:
+    """A movement requested via the JSON API, executed by the runtime in mode 'api'"""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, kind: str, params: dict):
+        """
+        `kind`: 'move' (PTP to params['pose']), 'lin' (linear to params['pose'] with params['vel']),
+        'arc' (params['center'], params['angle'], params['height'], params['vel']), 'waypoints'
+        (params['waypoints']) or 'program' (demo program params['name'])
+
+        Raises ValueError if the type is unknown or a parameter is missing or invalid
+        """
+        if not isinstance(kind, str) or kind not in KINDS:
+            raise ValueError(f'Unknown job type {kind}, use one of {", ".join(KINDS)}')
+        missing = [key for key in KINDS[kind] if key not in params]
+        if missing:
+            raise ValueError(f'A {kind}-job needs {", ".join(missing)}')
+        self._check(kind, params)
+
+        self.id = next(self._ids)
+        self.kind = kind
+        self.params = params
+        self.status = 'queued'  # queued -> planning -> running -> done, failed or cancelled
+        self.created = time.time()
+        self.planning_time = None
+        self.execution_time = None
+        self.result = None
+        self.error = None
+        self.cancelled = threading.Event()
+
+    @staticmethod
+    def _check(kind: str, params: dict):
+        """raises ValueError if a parameter of a `kind`-job has the wrong type or length"""
+        if kind in ('move', 'lin'):
+            _pose(params['pose'], min_len=3)
+        if kind in ('lin', 'arc'):
+            _number(params.get('vel'), 'vel', positive=True, optional=True)
+        if kind == 'arc':
+            _pose(params['center'], 'center', 3, 3)
+            _number(params['angle'], 'angle')
+            _number(params.get('height', 0), 'height')
+        if kind == 'waypoints':
+            if not isinstance(params['waypoints'], list) or not params['waypoints']:
+                raise ValueError('waypoints must be a non-empty list')
+            for pos in params['waypoints']:
+                check_waypoint(pos)
+        if kind == 'program' and not isinstance(params['name'], str):
+            raise ValueError('name must be a string')
+
+    def waypoints(self, robot, robot_type):
+        """returns the waypoints of this job (see `Runtime.run_waypoints`)"""
+        p = self.params
+        if self.kind == 'move':
+            return [list(p['pose']) + [0.0] * (6 - len(p['pose'])) + ['mov']]
+        if self.kind == 'lin':
+            return [list(p['pose']) + [0.0] * (6 - len(p['pose'])) + ['lin', p.get('vel')]]
+        if self.kind == 'arc':
+            return [list(robot.currPose) + [0.0] * (6 - robot.dof) +
+                    ['arc', p['center'], p['angle'], p.get('height', 0), p.get('vel')]]
+        if self.kind == 'waypoints':
+            return p['waypoints']
+
+        import program  # only needed for demo programs
+        found = [prog for prog in program.programs_for(robot_type) if prog['name'] == p['name']]
+        if not found:
+            raise ValueError(f"Unknown program {p['name']}")
+        return list(program.waypoints(found[0], robot.homePose))
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'type': self.kind,
+            'status': self.status,
+            'created': self.created,
+            'planning_time': self.planning_time,
+            'execution_time': self.execution_time,
+            'result': self.result,
+            'error': self.error,
+        }
+
+
+class JobQueue:
+    """Bounded queue of API jobs. Finished jobs are kept for a while so their result can be queried."""
+
+    def __init__(self, maxsize: int = MAX_QUEUED, history: int = MAX_HISTORY):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._jobs = OrderedDict()  # id -> job (queued, running and recently finished)
+        self._history = history
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def add_listener(self, callback):
+        """registers `callback()` to be called whenever a job was submitted"""
+        self._listeners.append(callback)
+
+    def submit(self, job: Job) -> Job:
+        """queues `job` (raises queue.Full if too many jobs are waiting)"""
+        self._queue.put_nowait(job)
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > self._history:
+                self._jobs.popitem(last=False)
+
+        for callback in list(self._listeners):
+            callback()
+        return job
+
+    def next(self):
+        """returns the next job that was not cancelled or None if no job is waiting"""
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                return None
+            if not job.cancelled.is_set():
+                return job
+
+    def get(self, job_id: int):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: int):
+        """cancels a job: waiting jobs are dropped, a running job stops after the current movement
+        `returns`: the job or None if it is unknown"""
+        job = self.get(job_id)
+        if job is not None and job.status in ('queued', 'planning', 'running'):
+            job.cancelled.set()
+            if job.status == 'queued':
+                job.status = 'cancelled'
+        return job
+
+    def pending(self):
+        return self._queue.qsize()
+
+
+# jobs of the website, executed by the runtime
+job_queue = JobQueue()
@@ -1,13 +1,24 @@
-stop_blink = 1
-robotType = 'quattro' # Models: 'delta', 'quattro' or '6rus'
+import config
+
+# The robot is set in config.json (see config.py), e.g. {"robot": "quattro"}. Models: 'delta', 'quattro' or '6rus'
+robotType = config.current()['robot']
+
+# Several robots in one process (replaces `robotType` if not empty). Every robot needs its own pins, e.g.:
+# "cell": {"left": {"type": "delta", "pins": {"dir": [13, 5, 9], "step": [6, 11, 10], "lightbarrier": [14, 15, 23]}},
+#          "right": {"type": "delta", "pins": {"dir": [22, 17, 3], "step": [27, 4, 2], "lightbarrier": [24, 25, 8]}}}
+robotCell = config.current()['cell']
 import threading
+import time
 
 if __name__ == '__main__':
-    import startWebsite # imports are here to avoid circular calling of imports
-    import startRobot
+    bootTime = time.time()  # reference for the startup-time report
+
+    import startRobot # imports are here to avoid circular calling of imports
 
-    monitoring_thread = threading.Thread(target = startRobot.startRobot)
+    # start the robot before loading flask, so the website does not delay homing
+    monitoring_thread = threading.Thread(target = startRobot.startRobot, args=(bootTime,))
     monitoring_thread.start()
 
-    startWebsite.app.run(debug=False, port=5000, host='0.0.0.0')
+    import startWebsite
+    startWebsite.serve(host='0.0.0.0', port=5000)
 
@@ -0,0 +1,227 @@
+"""Declarative program format (JSON):
+
+{
+    "name": "square",
+    "robots": ["quattro", "delta", "6rus"],         (optional, default: all robots)
+    "rotation": [0, 0, 0],                          (optional, default: rotation of the homing pose)
+    "steps": [
+        {"op": "move", "to": [x, y, level]},        PTP-movement
+        {"op": "line", "to": [x, y, level]},        linear movement
+        {"op": "circle", "center": [x, y], "radius": r, "level": l, "turns": 1, "dir": 1},
+        {"op": "arc", "center": [x, y], "radius": r, "level": l, "start": 0, "angle": 90},
+        {"op": "helix", "center": [x, y], "radius": r, "radius_end": r2, "level": l, "level_end": l2,
+         "turns": 3, "resolution": 30, "dir": 1},
+        {"op": "repeat", "count": n, "steps": [...]},
+        {"op": "set_speed", "vel": v}               speed of the linear movements in [cm/s] (null: fastest)
+    ]
+}
+
+Heights are given as `level` above the lowest height of the robot (z of the homing pose), so one program fits
+all robots. Every step may have an own "rotation" [alpha, beta, gamma] in [rad]. Angles of arcs are in [deg].
+Circles, arcs and helices are driven as native arc movements; "resolution" is only used for spirals
+(radius_end differs from radius), which are driven as one smooth spline movement through their points.
+"""
+
+import json
+import math as m
+import os
+
+# Directory with the declarative programs (every *.json file is one program)
+PROGRAM_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'programs')
+
+OPS = ('move', 'line', 'circle', 'arc', 'helix', 'repeat', 'set_speed')
+
+
+def validate(program):
+    """Checks the structure of a program and raises ValueError with a description of the first problem found"""
+    if not isinstance(program, dict):
+        raise ValueError('A program has to be a JSON object')
+    if not isinstance(program.get('name'), str) or not program['name']:
+        raise ValueError('A program needs a name')
+    if 'rotation' in program:
+        _require_numbers(program, 'rotation', 3, 'rotation')
+    _validate_steps(program.get('steps'), 'steps')
+
+
+def _validate_steps(steps, path):
+    if not isinstance(steps, list):
+        raise ValueError(f'{path}: has to be a list of steps')
+
+    for i, step in enumerate(steps):
+        where = f'{path}[{i}]'
+        if not isinstance(step, dict) or step.get('op') not in OPS:
+            raise ValueError(f'{where}: unknown operation, use one of {", ".join(OPS)}')
+
+        op = step['op']
+        if op in ('move', 'line'):
+            _require_numbers(step, 'to', 3, where)
+        elif op in ('circle', 'arc', 'helix'):
+            _require_numbers(step, 'center', 2, where)
+            _require_number(step, 'radius', where, positive=True)
+            _require_number(step, 'radius_end', where, optional=True, minimum=0)
+            for key in ('level', 'level_end', 'start', 'dir'):
+                _require_number(step, key, where, optional=True)
+            _require_number(step, 'turns', where, optional=True, positive=True)
+            _require_number(step, 'angle', where, optional=op != 'arc')
+            resolution = step.get('resolution', 1)
+            if isinstance(resolution, bool) or not isinstance(resolution, int) or resolution <= 0:
+                raise ValueError(f'{where}: resolution has to be a positive integer')
+        elif op == 'repeat':
+            count = step.get('count')
+            if isinstance(count, bool) or not isinstance(count, int) or count < 1:
+                raise ValueError(f'{where}: count has to be a positive integer')
+            _validate_steps(step.get('steps'), f'{where}.steps')
+        elif op == 'set_speed':
+            if step.get('vel') is not None:  # null: fastest
+                _require_number(step, 'vel', where, positive=True)
+
+        if 'rotation' in step:
+            _require_numbers(step, 'rotation', 3, where)
+
+
+def _is_number(val):
+    return not isinstance(val, bool) and isinstance(val, (int, float)) and m.isfinite(val)
+
+
+def _require_number(step, key, where, optional=False, positive=False, minimum=None):
+    """raises ValueError if `step[key]` is not a finite number (it may be missing if `optional`)"""
+    if optional and key not in step:
+        return
+    val = step.get(key)
+    if not _is_number(val):
+        raise ValueError(f'{where}: {key} has to be a number')
+    if positive and val <= 0:
+        raise ValueError(f'{where}: {key} has to be a positive number')
+    if minimum is not None and val < minimum:
+        raise ValueError(f'{where}: {key} has to be at least {minimum}')
+
+
+def _require_numbers(step, key, n, where):
+    val = step.get(key)
+    if not isinstance(val, list) or len(val) != n or not all(_is_number(v) for v in val):
+        raise ValueError(f'{where}: {key} has to be a list of {n} numbers')
+
+
+def load(path):
+    """loads and validates a program file"""
+    with open(path) as f:
+        program = json.load(f)
+    validate(program)
+    return program
+
+
+def save(program, directory=PROGRAM_DIR):
+    """validates a program and stores it in `directory` (an existing program with the same name is replaced)
+    `returns`: path of the file"""
+    validate(program)
+    filename = ''.join(c if c.isalnum() or c in '-_' else '_' for c in program['name']) + '.json'
+    path = os.path.join(directory, filename)
+
+    os.makedirs(directory, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(program, f, indent=4)
+    return path
+
+
+def programs_for(robot_type, directory=PROGRAM_DIR):
+    """returns all programs in `directory` that can run on `robot_type` (invalid files are skipped)"""
+    try:
+        files = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return []
+
+    programs = []
+    for filename in files:
+        if not filename.endswith('.json'):
+            continue
+        try:
+            program = load(os.path.join(directory, filename))
+        except (OSError, ValueError):
+            continue
+        if robot_type in program.get('robots', [robot_type]):
+            programs.append(program)
+    return programs
+
+
+def waypoints(program, home_pose):
+    """
+    Interprets a program and yields its waypoints one after another (nothing is calculated in advance, so
+    programs of any length run in constant memory).
+
+    `program`: validated program (dict)
+    `home_pose`: homing pose of the robot, gives the lowest height and the default rotation
+
+    `yields`: [x, y, z, a, b, c, 'mov'] for PTP, [x, y, z, a, b, c, 'lin', vel] for linear moving,
+    [x, y, z, a, b, c, 'arc', center, angle, height, vel] for arcs and helices or
+    [x, y, z, a, b, c, 'spline', poses, vel] for spirals (see `Runtime.run_waypoints`)
+    """
+    home_pose = list(home_pose) + [0.0] * (6 - len(home_pose))
+    state = {
+        'min_height': home_pose[2],
+        'rotation': list(program.get('rotation', home_pose[3:6])),
+        'vel': None,
+        'pos': [0.0, 0.0, home_pose[2]],  # last commanded position
+    }
+    yield from _run_steps(program['steps'], state)
+
+
+def _run_steps(steps, state):
+    for step in steps:
+        op = step['op']
+
+        if op == 'repeat':
+            for _ in range(step['count']):
+                yield from _run_steps(step['steps'], state)
+        elif op == 'set_speed':
+            state['vel'] = step.get('vel')
+        elif op in ('move', 'line'):
+            x, y, level = step['to']
+            yield _waypoint(state, step, x, y, state['min_height'] + level, 'mov' if op == 'move' else 'lin')
+        else:
+            yield from _curve(step, state)
+
+
+def _curve(step, state):
+    """circles, arcs and helices: a linear movement to the first point followed by one arc movement.
+    Spirals (radius_end differs from radius): a linear movement to the first point followed by a spline through
+    the other points"""
+    cx, cy = step['center']
+    r0 = step['radius']
+    r1 = step.get('radius_end', r0)
+    z0 = state['min_height'] + step.get('level', state['pos'][2] - state['min_height'])
+    z1 = state['min_height'] + step['level_end'] if 'level_end' in step else z0
+    start = m.radians(step.get('start', 0))
+
+    if step['op'] == 'arc':
+        sweep = m.radians(step['angle'])
+    else:
+        sweep = step.get('dir', 1) * 2 * m.pi * step.get('turns', 1)
+
+    if r1 == r0:
+        yield _waypoint(state, step, cx + r0 * m.cos(start), cy + r0 * m.sin(start), z0, 'lin')
+        end = start + sweep
+        point = _waypoint(state, step, cx + r0 * m.cos(end), cy + r0 * m.sin(end), z1, 'mov')
+        yield point[:6] + ['arc', [cx, cy, z0], sweep, z1 - z0, state['vel']]
+        return
+
+    resolution = step.get('resolution', 50)  # points per full turn
+    n = max(1, m.ceil(abs(sweep) / (2 * m.pi) * resolution))
+
+    points = []
+    for k in range(n + 1):
+        s = k / n
+        t = start + s * sweep
+        r = r0 + s * (r1 - r0)
+        points.append(_waypoint(state, step, cx + r * m.cos(t), cy + r * m.sin(t), z0 + s * (z1 - z0),
+                                'lin' if k == 0 else 'mov'))
+
+    yield points[0]
+    yield points[-1][:6] + ['spline', [point[:6] for point in points[1:-1]], state['vel']]
+
+
+def _waypoint(state, step, x, y, z, mode):
+    state['pos'] = [x, y, z]
+    a, b, c = step.get('rotation', state['rotation'])
+    if mode == 'lin':
+        return [x, y, z, a, b, c, 'lin', state['vel']]
+    return [x, y, z, a, b, c, 'mov']
@@ -0,0 +1,140 @@
+import logging
+import os
+import struct
+import time
+
+import numpy as np
+
+# Directory for recorded jog sessions
+RECORDING_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+# Binary log: header (magic, dof), then one record per pose change: time [s] (float64) and the pose (float32)
+MAGIC = b'JOG1'
+HEADER = struct.Struct('<4sB')
+
+ROT_WEIGHT = 50  # [mm] per [rad]: weight of the rotations against the position when simplifying a path
+
+
+class PoseRecorder:
+    """Records the poses of a jog session into a compact binary log. Only changes of the pose are written."""
+
+    def __init__(self, name: str, dof: int, directory: str = RECORDING_DIR):
+        """
+        `name`: name of the recording (file name without extension)
+        `dof`: degrees of freedom of the robot (length of the poses)
+        """
+        self.name = name
+        self.dof = dof
+        self.path = recording_path(name, directory)
+        self._record = struct.Struct(f'<d{dof}f')
+        self._last = None
+        self._t_st = time.monotonic()
+        self.count = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, 'wb')
+        self._file.write(HEADER.pack(MAGIC, dof))
+        logging.info(f'Recording jog session {self.path}')
+
+    def record(self, pose):
+        """writes `pose` with the time since the start of the recording (skipped if the pose did not change)"""
+        pose = tuple(float(v) for v in pose[:self.dof])
+        if pose == self._last:
+            return
+        self._last = pose
+        self._file.write(self._record.pack(time.monotonic() - self._t_st, *pose))
+        self.count += 1
+
+    def close(self):
+        self._file.close()
+        logging.info(f'Recorded {self.count} poses to {self.path}')
+
+
+def recording_path(name: str, directory: str = RECORDING_DIR):
+    name = ''.join(c if c.isalnum() or c in '-_' else '_' for c in name)
+    return os.path.join(directory, name + '.jog')
+
+
+def recordings(directory: str = RECORDING_DIR):
+    """returns the names of all recordings in `directory`"""
+    try:
+        return sorted(f[:-4] for f in os.listdir(directory) if f.endswith('.jog'))
+    except FileNotFoundError:
+        return []
+
+
+def read_log(path):
+    """reads a recorded jog session
+    `returns`: array of times [s] and array of poses (one row per pose)"""
+    with open(path, 'rb') as f:
+        magic, dof = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a jog recording')
+        data = np.fromfile(f, dtype=np.dtype([('t', '<f8'), ('pose', '<f4', (dof,))]))
+
+    return data['t'], data['pose'].astype(np.float64)
+
+
+def simplify(poses, tolerance: float, rot_weight: float = ROT_WEIGHT):
+    """
+    Douglas-Peucker simplification of a path in pose space
+    `poses`: array of poses (one row per pose)
+    `tolerance`: maximum distance of a removed pose to the simplified path in [mm]
+    `returns`: indices of the poses that are kept (first and last pose are always kept)
+    """
+    pts = np.array(poses, dtype=np.float64)
+    pts[:, 3:] *= rot_weight  # rotations get compared as distances
+
+    keep = np.zeros(len(pts), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(pts) - 1)]
+
+    while stack:
+        i, j = stack.pop()
+        if j <= i + 1:
+            continue
+
+        # distance of all poses in between to the segment from pose i to pose j
+        seg = pts[j] - pts[i]
+        rel = pts[i + 1:j] - pts[i]
+        seg_len = seg @ seg
+        if seg_len > 0:
+            t = np.clip(rel @ seg / seg_len, 0, 1)
+            dist = np.linalg.norm(rel - t[:, np.newaxis] * seg, axis=1)
+        else:
+            dist = np.linalg.norm(rel, axis=1)
+
+        k = int(np.argmax(dist))
+        if dist[k] > tolerance:
+            k += i + 1
+            keep[k] = True
+            stack.append((i, k))
+            stack.append((k, j))
+
+    return np.flatnonzero(keep)
+
+
+def replay_waypoints(name: str, tolerance: float = 0.5, vel: float = None, speedup: float = None,
+                     directory: str = RECORDING_DIR):
+    """
+    Simplified path of a recording as linear waypoints (see `Runtime.run_waypoints`)
+    `tolerance`: tolerance of the simplification in [mm]
+    `vel`: constant velocity in [cm/s] (default is as fast as possible)
+    `speedup`: replay the recorded timing this many times faster (instead of a constant velocity)
+    """
+    times, poses = read_log(recording_path(name, directory))
+    if len(poses) == 0:
+        return []
+
+    idx = simplify(poses, tolerance)
+    logging.info(f'Replaying {name}: {len(idx)} of {len(poses)} poses')
+
+    waypoints = []
+    for prev, i in zip(np.concatenate(([idx[0]], idx[:-1])), idx):
+        if speedup:
+            dt = (times[i] - times[prev]) / speedup
+            dist = np.linalg.norm(poses[i, :3] - poses[prev, :3])
+            vel = float(dist / 10 / dt) if dt > 0 and dist > 0 else None
+        waypoints.append(poses[i].tolist() + [0.0] * (6 - poses.shape[1]) + ['lin', vel])
+
+    return waypoints
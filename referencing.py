@@ -0,0 +1,76 @@
+"""Lost-step detection while the robot moves.
+
+The step count of the robot is open-loop bookkeeping, a lost step stays unnoticed until the next homing. Whenever
+an arm passes the edge of its light barrier during a normal movement, its position is known exactly: the edge lies
+`homing.HOME_STEPS` from the homing pose. The monitor compares the step count at that moment with the expected one
+and corrects the count, the next movement then makes up for the lost steps. The robot does not stop for it.
+"""
+
+import logging
+
+import RPi.GPIO as GPIO
+
+from homing import edge_steps, towards_barrier
+
+TOLERANCE = 4  # steps the edge may differ from its expected position (hysteresis, one step of delay)
+
+
+class EdgeMonitor:
+    """Watches the light barriers of a robot with GPIO interrupts while it moves"""
+
+    def __init__(self, robot, tolerance: int = TOLERANCE, correct: bool = True):
+        """
+        `tolerance`: larger differences count as lost steps
+        `correct`: correct the step count (otherwise the drift is only logged)
+        """
+        self.robot = robot
+        self.tolerance = tolerance
+        self.correct = correct
+        self.expected = None  # step counts at the edges
+        self.drift = [0] * robot.dof  # difference at the last pass of every arm [steps]
+        self.corrections = 0
+        self._running = False
+
+        # direction of the step count of every arm when it moves towards its light barrier
+        self._towards = [t * c for t, c in zip(towards_barrier(robot.dof), robot.rotation_compensation.tolist())]
+
+    def reference(self):
+        """takes the expected edges from the homing pose (after homing or a change of the step size)"""
+        self.expected = edge_steps(self.robot)
+
+    def start(self):
+        """starts watching the light barriers (the robot has to be homed, homing itself needs them unwatched)"""
+        if self._running:
+            return
+        self.reference()
+        for axis, pin in enumerate(self.robot.lightbarrierpins):
+            # a light barrier is blocked if its input is low
+            GPIO.add_event_detect(pin, GPIO.FALLING, callback=lambda _, axis=axis: self._edge(axis))
+        self._running = True
+
+    def stop(self):
+        if not self._running:
+            return
+        for pin in self.robot.lightbarrierpins:
+            GPIO.remove_event_detect(pin)
+        self._running = False
+
+    def _edge(self, axis):
+        # called in the thread of the GPIO library
+        live = self.robot.live_steps(axis)
+        if live is None:
+            return  # standstill, e.g. vibrations at the edge
+        steps, direction = live
+        if direction != self._towards[axis]:
+            return  # only the edge passed towards the light barrier is the reference of the homing
+
+        drift = self.expected[axis] - steps
+        self.drift[axis] = drift
+        if abs(drift) <= self.tolerance:
+            return
+
+        if self.correct:
+            self.robot.correct_steps(axis, drift)
+            self.corrections += 1
+        logging.warning(f'Axis {axis} is {drift} steps off at its light barrier'
+                        + (', corrected' if self.correct else ''))
@@ -1,25 +1,90 @@
+import copy
 import logging
 import random
 import time
 import types
 from threading import Event, Timer, RLock, Thread, activeCount
 import threading
-import pygame
 import LED
+import config
 import controller
-import demo
-from Delta import Delta
-from Quattro import Quattro
+import jobs
+import telemetry
+import webstate
 from Robot import WorkspaceViolation
-from SixRUS import SixRUS
 from display import LCD
-from homing import homing_fast_new, move_home
-import Robot
+from workspace import WorkspaceMap
+from homing import HomingError, homing_parallel, move_home, set_steppermode
+from referencing import EdgeMonitor
 import RPi.GPIO as GPIO
 
 
+def create_robot(robot: str, pins=None, scheduler=None, settings=None):
+    """
+    Creates the robot of type `robot` ('delta', 'quattro' or '6rus') with its settings from the configuration
+    `pins`, `scheduler`: see `Robot` (`pins` replace the pins of the configuration)
+    `settings`: settings of the robot (default: `config.robot_config(robot)`)
+    """
+    # Preprocess string
+    robot_str = robot.strip().lower()
+    if robot_str not in config.ROBOT_TYPES:
+        raise ValueError(f"Unknown robot type: {robot}")
+
+    if settings is None:
+        settings = config.robot_config(robot_str)
+    kwargs = dict(stepper_mode=settings['stepper_mode'], steps_per_rev=settings['steps_per_rev'],
+                  step_delay=settings['step_delay'], pins=pins or settings.get('pins'), scheduler=scheduler)
+
+    # only the configured robot class (and its kinematics) gets imported
+    if robot_str == '6rus':
+        from SixRUS import SixRUS
+        robot = SixRUS(**kwargs)
+    elif robot_str == 'quattro':
+        from Quattro import Quattro
+        robot = Quattro(**kwargs)
+    else:
+        from Delta import Delta
+        robot = Delta(**kwargs)
+
+    configure_robot(robot, settings)
+    return robot
+
+
+def configure_robot(robot, settings: dict) -> bool:
+    """
+    Applies the settings of the configuration that can change while the program runs (pins need a restart).
+    Changed dimensions or step sizes clear the step cache of the robot, a changed stepper mode is also written to the
+    microstep pins.
+    `returns`: True if the geometry changed (the pose of the robot has to be recalculated, see `Robot.update_pose`)
+    """
+    geometry = list(settings.get('geometry', robot.GEOMETRY))
+    changed = geometry != list(robot.geometricParams)
+    if changed:
+        robot.geometricParams = geometry
+    robot.workspaceBounds = [tuple(b) for b in settings.get('workspace_bounds', robot.WORKSPACE_BOUNDS)]
+
+    if (settings['step_delay'], settings['steps_per_rev']) != (robot.baseStepDelay, robot.stepsPerRev):
+        robot.baseStepDelay = settings['step_delay']
+        robot.stepsPerRev = settings['steps_per_rev']
+        robot.stepperMode = robot.stepperMode  # recalculates step angle and delay
+    if settings['stepper_mode'] != robot.stepperMode:
+        robot.stepperMode = settings['stepper_mode']
+        # the drivers have to make the same steps the robot counts
+        set_steppermode(robot.stepperMode, (robot.M0, robot.M1, robot.M2))
+    # limits of the motors for the path timing (see `Robot.step_limits`)
+    robot.axisStepDelays = settings.get('axis_step_delays')
+    robot.axisAccelerations = settings.get('axis_accelerations')
+    return changed
+
+
 class Runtime:
-    def __init__(self, robot: str):
+    def __init__(self, robot: str, boot_time: float = None):
+        """
+        `robot`: robot type ('delta', 'quattro' or '6rus')
+        `boot_time`: time of the program start (for the startup-time report)
+        """
+        self.boot_time = time.time() if boot_time is None else boot_time
+
         # Thread-safe event flags
         self.program_stopped = Event()
         self.ignore_controller = Event()
@@ -29,24 +94,41 @@ class Runtime:
         self.controller_poll_rate = 5
         self.mode_poll_rate = 0.1
         self.mode_lock = RLock()
+        # notified on every mode change (and by `wake`), idle states block on it
+        self.mode_changed = threading.Condition(self.mode_lock)
+        self._woken = False
+        self._mode_polling = False
+        self.idle_timeout = 1.0  # idle states recheck for a program stop after this time [s]
+        self.recorder = None  # recorder of the current jog session (if recording)
+        self._new_config = None  # configuration that changed, applied by the loop between two movements
+        # (iterations, duration of the last iteration [s]) of the main loop, replaced as a whole for the telemetry
+        self.loop_metrics = (0, 0.0)
         self.lcd = LCD()
 
-        # Preprocess string
-        robot_str = robot.strip().lower()
-
-        if robot_str == '6rus':
-            #TODO: Step Delay prüfen
-            self.robot = SixRUS(stepper_mode=1 / 32, step_delay=0.002)
-        elif robot_str == 'quattro':
-            self.robot = Quattro(stepper_mode=1 / 32, step_delay=0.004)
-        elif robot_str == 'delta':
-            #TODO: Step Delay prüfen
-            self.robot = Delta(stepper_mode=1 / 32, step_delay=0.002)
-        else:
-            raise ValueError(f"Unknown robot type: {robot}")
+        self.robot = create_robot(robot)
+        self.robot_type = robot.strip().lower()
+        self._pins = config.robot_config(self.robot_type).get('pins')  # pins in use (changes need a restart)
+
+        # lost steps are found (and corrected) whenever an arm passes its light barrier
+        self.edge_monitor = EdgeMonitor(self.robot)
+
+        # reachable workspace for clamping the manual movement (see `load_workspace`)
+        self.workspace = None
+        self._workspace_key = None
+        self.load_workspace()
+        self.workspace_limits = config.robot_config(self.robot_type).get('workspace_limits')
 
         self.lcd.print_status(f'Started {robot}')
 
+        # mode changes on the website are delivered as events
+        webstate.add_mode_listener(self.on_website_mode)
+        # new jobs of the JSON API wake up the idle loop
+        jobs.job_queue.add_listener(self.wake)
+        # state of the robot for the telemetry stream of the website
+        telemetry.hub.set_source(self.telemetry)
+        # changes of the configuration (e.g. via the website)
+        config.add_listener(self.on_config)
+
     @property
     def current_mode(self):
         with self.mode_lock:
@@ -55,14 +137,101 @@ class Runtime:
     @current_mode.setter
     def current_mode(self, val):
         with self.mode_lock:
-            self._current_mode = val
+            if self._current_mode != val:
+                self._current_mode = val
+                self.mode_changed.notify_all()
+
+    def wake(self):
+        """wakes up the main loop if it is waiting in an idle state (e.g. because a command arrived)"""
+        with self.mode_lock:
+            self._woken = True
+            self.mode_changed.notify_all()
+
+    def stop(self):
+        """terminates the program loop and all polling threads"""
+        self.program_stopped.set()
+        self.wake()
+
+    def telemetry(self):
+        """snapshot of the robot state for the telemetry stream (called in its thread, reads without locking)"""
+        loops, loop_time = self.loop_metrics
+        return {
+            'mode': self._current_mode,
+            'pose': self.robot.currPose.tolist(),
+            'steps': self.robot.currSteps.tolist(),
+            'loops': loops,
+            'loop_time': loop_time,
+            'step_cache': self.robot.cache_info(),
+            'queued_jobs': jobs.job_queue.pending(),
+            'drift': self.edge_monitor.drift,
+        }
+
+    def on_config(self, new_config):
+        """called (in the thread that changed it) whenever the configuration changed"""
+        self._new_config = new_config
+        self.wake()
+
+    def apply_config(self):
+        """applies a changed configuration to the robot, the caches and tables that depend on it"""
+        new_config, self._new_config = self._new_config, None
+        if new_config['robot'] != self.robot_type:
+            logging.warning(f"The robot type changed to {new_config['robot']}, restart the program to apply it")
+
+        settings = config.robot_config(self.robot_type)
+        if settings.get('pins') != self._pins:
+            logging.warning('Changed pins are applied after a restart')
+
+        if configure_robot(self.robot, settings):
+            logging.info('Geometry changed, recalculating the pose')
+            self.robot.update_pose()
+        self.edge_monitor.reference()  # the step counts depend on the step size
+        self.load_workspace()  # only if the geometry or the bounds changed
+        self.workspace_limits = settings.get('workspace_limits')
+        logging.info('Configuration applied')
+
+    def load_workspace(self):
+        """
+        Loads the workspace map of the current geometry in a background thread, the first time it has to be sampled
+        which takes a while. Until it is ready the manual movement is clamped to fixed limits (see `controller`).
+        Nothing happens if the map of the geometry and workspace bounds is already in use.
+        """
+        key = (list(self.robot.geometricParams), list(self.robot.workspaceBounds))
+        if key == self._workspace_key:
+            return
+        self._workspace_key = key
+        self.workspace = None
+        robot = copy.copy(self.robot)  # the configuration may change the robot while the map is sampled
+
+        def load():
+            try:
+                ws_map = WorkspaceMap.for_robot(robot)
+            except WorkspaceViolation as e:
+                logging.error(f'No workspace map: {e}')
+                return
+            if self._workspace_key == key:  # not replaced by a newer geometry in the meantime
+                self.workspace = ws_map
+
+        Thread(target=load, name='Workspace', daemon=True).start()
+
+    def wait_idle(self, mode):
+        """Blocks as long as the robot stays in `mode`, until `wake` is called or the program is stopped"""
+        with self.mode_lock:
+            while self._current_mode == mode and not self._woken and not self.program_stopped.is_set():
+                self.mode_changed.wait(self.idle_timeout)
+            self._woken = False
+
+    def on_website_mode(self, mode):
+        """called by the website (in the request thread) whenever a mode was selected"""
+        # same rules as when polling: without a controller the website chooses the mode
+        if not self.already_connected and not self.ignore_controller.is_set():
+            self.eval_controller_response(mode)
 
     def eval_controller_response(self, response):
         """
         evaluates the answer from the mode_from_input-function
         """
         if isinstance(response, str):
-            if response in ['stop', 'demo', 'manual', 'calibrate', 'off']:
+            if response in ['stop', 'demo', 'manual', 'calibrate', 'tune', 'off', 'gcode', 'replay', 'api']:
                 pass
             elif response == 'homing':
                 self.ignore_controller.set()
@@ -91,9 +260,7 @@ class Runtime:
         else:
             if self.already_connected:
                 # no new initialisation required here
-                GPIO.setmode(GPIO.BCM)  # use GPIO numbers (NOT pin numbers)
-                GPIO.setup(12, GPIO.OUT)
-                GPIO.output(12, GPIO.HIGH)
+                LED.change_led(LED.BLUE, 1)
                 logging.info('Controller still connected.')
                 
                 
@@ -106,31 +273,38 @@ class Runtime:
                 self.already_connected = True
                 logging.info('Controller connected.')
                 self.lcd.print_connection(True)
+                # the controller has to be polled for mode changes
+                self.start_mode_polling()
 
         # call program again after 5 seconds
         Timer(self.controller_poll_rate, self.poll_controller_status).start()
 
+    def start_mode_polling(self):
+        """starts polling the controller for mode changes (if it is not running already)"""
+        with self.mode_lock:
+            if self._mode_polling:
+                return
+            self._mode_polling = True
+        self.poll_program_mode()
+
     def poll_program_mode(self):
-        if self.program_stopped.is_set():
-            # Finish thread if program is terminated
+        if self.program_stopped.is_set() or not self.already_connected:
+            # Finish thread if program is terminated or the controller is gone
+            # (the website delivers its mode changes as events, no polling needed)
+            with self.mode_lock:
+                self._mode_polling = False
             return
 
         # Handle controller inputs all the time to keep button states up to date
         try:
-            if self.already_connected:
-                controls = controller.get_controller_inputs(self.controller)
-            else:
-                controls = controller.get_ws_inputs()
+            controls = controller.get_controller_inputs(self.controller)
 
             if not self.ignore_controller.is_set():
                 # evaluate the answer from controller
-                if self.already_connected:
-                    self.eval_controller_response(controller.mode_from_controller_inputs(controls))
-                else:
-                    self.eval_controller_response(controller.mode_from_ws_inputs(controls))
+                self.eval_controller_response(controller.mode_from_controller_inputs(controls))
         except AttributeError:
             pass
-        except pygame.error as e:
+        except controller.ControllerError as e:
             logging.exception(e)
         finally:
             # call program again after 0.1 seconds
@@ -162,9 +336,11 @@ class Runtime:
             return
         
         if self.already_connected:
-            new_pose = controller.get_movement_from_cont(inputs, self.robot.currPose)
+            new_pose = controller.get_movement_from_cont(inputs, self.robot.currPose, self.workspace,
+                                                         self.workspace_limits, self.robot)
         else: 
-            new_pose = controller.get_movement_from_ws(inputs, self.robot.currPose)
+            new_pose = controller.get_movement_from_ws(inputs, self.robot.currPose, self.workspace,
+                                                       self.workspace_limits, self.robot)
         
         # check if mode was changed
         if self.already_connected:
@@ -179,11 +355,36 @@ class Runtime:
 
 
         self.move(new_pose)
+        self.record_jog()
+
+    def record_jog(self):
+        """
+        Writes the current pose into the jog recording selected on the website.
+        The recording gets started and stopped as the selection changes
+        """
+        name = webstate.websiteInformation['recording']
+
+        if self.recorder is not None and self.recorder.name != name:
+            self.stop_recording()
+
+        if name is not None:
+            if self.recorder is None:
+                import recorder  # only needed if a session is recorded
+                self.recorder = recorder.PoseRecorder(name, self.robot.dof)
+            self.recorder.record(self.robot.currPose)
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
 
     def move_demo(self):
         """
-        Selects a random demo programm and executes it
+        Selects a random demo programm (python demo or declarative program) and executes it
         """
+        import demo  # only needed once a demo is started
+        import program
+
         modules = []
         if self.robot.dof == 6:
             for a in dir(demo.sixRUS):
@@ -200,24 +401,121 @@ class Runtime:
                 if isinstance(getattr(demo.Quattro, a), types.FunctionType):
                     modules.append(getattr(demo.Quattro, a))
 
+        # declarative programs from the program directory are streamed by the interpreter
+        for p in program.programs_for(self.robot_type):
+            modules.append(lambda p=p: program.waypoints(p, self.robot.homePose))
+
         prog = random.choice(modules)  # choose a random demo
-        demo_pos_list = prog()  # execute chosen demo programm
+        self.run_waypoints(prog(), 'demo')  # execute chosen demo programm
 
-        for pos in demo_pos_list:
-            try:
-                if pos[6] == 'lin':
-                    coord = pos[:6]  # extract only pose
-                    self.robot.mov_lin(coord)  # move linear
-                elif pos[6] == 'mov':
-                    coord = pos[:6]  # extract only pose
-                    self.move(coord)  # move with PTP-interplation
-            except IndexError:
-                self.move(pos)  # if 'lin' or 'mov' wasent given, use mov/PTP
-
-            if not self.current_mode == 'demo':  # break if the mode was changed
+    def run_waypoints(self, waypoints, mode, cancel=None):
+        """
+        Moves along waypoints until they are exhausted or the mode changes
+        `waypoints`: iterable of waypoints (see `Robot.mov_waypoint`) or [.., 'wait', seconds] (dwell)
+        `mode`: mode the waypoints belong to, a change of the mode stops the movement and moves home
+        `cancel`: optional threading.Event, stops the movement where it is if set
+        """
+        for pos in waypoints:
+            if cancel is not None and cancel.is_set():
+                break
+
+            kind = pos[6] if len(pos) > 6 else 'mov'  # if 'lin' or 'mov' wasent given, use mov/PTP
+
+            if kind == 'mov':
+                self.move(pos[:6])  # move with PTP-interplation (shown on the LCD)
+            elif kind == 'wait':
+                with self.mode_lock:  # wait, but wake up if the mode changes
+                    self.mode_changed.wait_for(lambda: self._current_mode != mode, timeout=pos[7])
+            else:
+                self.robot.mov_waypoint(pos)  # linear, arc or spline movement
+
+            if not self.current_mode == mode:  # break if the mode was changed
                 LED.change_led(1,0)
                 self.move(self.robot.homePose)
                 break
+
+        logging.debug(f'Step cache: {self.robot.cache_info()}')
+    
+    def run_job(self, job):
+        """
+        Plans and executes one job of the JSON API and stores its timing and result in the job
+        """
+        job.status = 'planning'
+        t_st = time.perf_counter()
+        try:
+            waypoints = job.waypoints(self.robot, self.robot_type)
+            # inverse kinematics of all targets in advance: unreachable jobs fail before the robot moves
+            # and the steps are in the step cache for the movement
+            for pos in waypoints:
+                if len(pos) <= 6 or pos[6] != 'wait':
+                    self.robot.pose2steps(pos[:self.robot.dof])
+        except (KeyError, TypeError, IndexError, ValueError) as e:  # also WorkspaceViolation
+            job.planning_time = time.perf_counter() - t_st
+            job.status, job.error = 'failed', str(e) or type(e).__name__
+            logging.info(f'Job {job.id} failed: {job.error}')
+            return
+
+        t_plan = time.perf_counter()
+        job.planning_time = t_plan - t_st
+        job.status = 'running'
+        try:
+            self.run_waypoints(waypoints, 'api', cancel=job.cancelled)
+        except (IndexError, TypeError, ValueError) as e:
+            job.status, job.error = 'failed', str(e)
+        else:
+            if job.cancelled.is_set():
+                job.status = 'cancelled'
+            elif self.current_mode != 'api':
+                job.status, job.error = 'cancelled', f'Mode changed to {self.current_mode}'
+            else:
+                job.status = 'done'
+        job.execution_time = time.perf_counter() - t_plan
+        job.result = {'pose': self.robot.currPose.tolist()}
+        logging.debug(f'Job {job.id} {job.status} (planning {job.planning_time * 1000:.1f} ms, '
+                      f'execution {job.execution_time:.2f} s)')
+
+    def run_gcode(self):
+        """
+        Executes the G-code program chosen on the website (streamed line by line) and stops afterwards
+        """
+        import gcode  # only needed if a G-code program is started
+
+        path = webstate.websiteInformation.get('gcodeFile')
+        logging.info(f'Starting G-code program {path}')
+        try:
+            with open(path) as f:
+                self.run_waypoints(gcode.lookahead(gcode.waypoints(f, self.robot), self.robot), 'gcode')
+        except (OSError, TypeError, ValueError) as e:  # also WorkspaceViolation
+            logging.error(f'G-code program stopped: {e}')
+            self.lcd.print_status('G-code error')
+        else:
+            logging.info('G-code program finished')
+
+        self.finish_job('gcode')
+
+    def replay(self):
+        """
+        Replays the jog recording chosen on the website (simplified and at the chosen speed) and stops afterwards
+        """
+        import recorder  # only needed if a recording is replayed
+
+        job = webstate.websiteInformation.get('replay') or {}
+        try:
+            waypoints = recorder.replay_waypoints(job['name'], tolerance=job.get('tolerance', 0.5),
+                                                  vel=job.get('vel'), speedup=job.get('speedup'))
+            self.run_waypoints(waypoints, 'replay')
+        except (KeyError, OSError, TypeError, ValueError) as e:
+            logging.error(f'Replay stopped: {e}')
+            self.lcd.print_status('Replay error')
+
+        self.finish_job('replay')
+
+    def finish_job(self, mode):
+        """switches to 'stop' after a job of `mode` ended (if the mode was not changed in the meantime)"""
+        if self.current_mode == mode:
+            self.lcd.print_status(f'Status: stop')
+            self.current_mode = 'stop'
+            webstate.websiteInformation['mode'] = 'stop'
     
     """
     def conquerWorld(self):
@@ -231,33 +529,74 @@ class Runtime:
         """
         automatically homes the Robot. First in a fast mode and then in a more precise mode.
         After that the Robot move to a ready Position
-
+        `returns`: False if an arm did not reach its light barrier (the robot stays where it stopped)
+        """
+        try:
+            homing_parallel(self.robot.dof, robot=self.robot)
+        except HomingError as e:
+            logging.error(f'Homing failed: {e}')
+            self.lcd.print_status('Homing failed')
+            return False
+        move_home(self.robot.dof, robot=self.robot)
+        return True
+
+    def tune_process(self):
+        """
+        finds the fastest step delay and acceleration of every motor (see tuning.py) and stores them in the
+        configuration. The arms start at their light barriers and end in the ready position
         """
-        homing_fast_new(1 / 2, self.robot.dof)
-        homing_fast_new(1 / 32, self.robot.dof)
-        move_home(self.robot.dof)
+        import tuning  # only needed for tuning
+
+        self.edge_monitor.stop()  # the light barriers are used by the homing and tuning
+        try:
+            homing_parallel(self.robot.dof, robot=self.robot)
+            settings = tuning.tune(self.robot)
+        except RuntimeError as e:  # also HomingError
+            logging.error(f'Tuning failed: {e}')
+            self.lcd.print_status('Tuning failed')
+        else:
+            config.update({'robots': {self.robot_type: settings}})  # applied by the loop
+            self.lcd.print_status(f"Step delay: {settings['step_delay'] * 1e3:.2f} ms")
+        finally:
+            move_home(self.robot.dof, robot=self.robot)
+            self.robot.homing('90')
+            self.edge_monitor.start()
 
     def loop(self):
         self.robot.homing('90')  # home robot
-        self.controller = controller.init_controller()
+        self.edge_monitor.start()
+
+        # only initialise (and import) pygame if a controller is plugged in
+        if controller.still_connected():
+            self.controller = controller.init_controller()
 
         if self.controller is None:
             self.already_connected = False
 
+        logging.info(f'Ready to jog {time.time() - self.boot_time:.2f} s after program start')
+
         # call subroutine every 5-seconds to check for controller
         self.poll_controller_status()
         # start listening to controller
         self.ignore_controller.clear()
-        self.poll_program_mode()
-        
+        self.start_mode_polling()
         
-
+        t_loop = time.perf_counter()
         while not self.program_stopped.is_set():
+            t_last, t_loop = t_loop, time.perf_counter()
+            self.loop_metrics = (self.loop_metrics[0] + 1, t_loop - t_last)
+
+            if self._new_config is not None:
+                self.apply_config()  # between two movements
+
+            if self.recorder is not None and self.current_mode != 'manual':
+                self.stop_recording()  # a recording ends with the manual mode
+
             # State Machine
             if self.current_mode == 'off':
                 self.robot.disable_steppers()
                 LED.change_led(0,2)
-                time.sleep(0.0001)  # limit loop time
+                self.wait_idle('off')  # block until something happens
             else:
                 self.robot.enable_steppers()
                 
@@ -267,6 +606,26 @@ class Runtime:
                     self.move_demo()
                     time.sleep(2)
 
+                elif self.current_mode == 'gcode':
+                    LED.change_led(0,0)
+                    LED.change_led(1,1)
+                    self.run_gcode()
+
+                elif self.current_mode == 'api':
+                    # jobs of the JSON API, one after another
+                    LED.change_led(0,0)
+                    LED.change_led(1,1)
+                    job = jobs.job_queue.next()
+                    if job is None:
+                        self.wait_idle('api')  # block until a job arrives
+                    else:
+                        self.run_job(job)
+
+                elif self.current_mode == 'replay':
+                    LED.change_led(0,0)
+                    LED.change_led(1,1)
+                    self.replay()
+
                 elif self.current_mode == 'manual':
                     # control the robot with the controller
                     LED.change_led(0,0)
@@ -279,29 +638,43 @@ class Runtime:
                     # stop listening to controller (bc. we listen all the time in here)
                     self.ignore_controller.set()
                     time.sleep(0.5)
-                    self.calibrate_process()
+                    self.edge_monitor.stop()  # the light barriers are used by the homing
+                    homed = self.calibrate_process()
                     time.sleep(0.5)
                     # home robot afterwards
                     
                     # stop listening to controller to prevent program change while homing
                     time.sleep(0.5)  # wait a bit to reduce multiple homing attempts
-                    self.robot.homing('90')  # use homing method '90'
+                    if homed:
+                        self.robot.homing('90')  # use homing method '90'
+                        self.edge_monitor.start()
                     # exit homing and switch to state that stopped calibration
                     logging.info('Switching to stop')
-                    self.lcd.print_status(f'Status: stop')
                     self.current_mode = 'stop'
-                    # move a bit upwards
-                    startPose = self.robot.homePose
-                    startPose[2] = startPose[2] * 0.8;
-                    self.move(startPose)
+                    if homed:
+                        self.lcd.print_status(f'Status: stop')
+                        # move a bit upwards
+                        startPose = list(self.robot.homePose)
+                        startPose[2] = startPose[2] * 0.8;
+                        self.move(startPose)
                     # change the mode
-                    from startWebsite import websiteInformation
-                    websiteInformation['mode'] = 'stop'
+                    webstate.websiteInformation['mode'] = 'stop'
                     #
                     self.ignore_controller.clear()
 
+                elif self.current_mode == 'tune':
+                    LED.change_led(0,0)
+                    LED.change_led(1,2)
+                    self.ignore_controller.set()  # no mode changes while the arms move on their own
+                    self.tune_process()
+                    logging.info('Switching to stop')
+                    self.lcd.print_status(f'Status: stop')
+                    self.current_mode = 'stop'
+                    webstate.websiteInformation['mode'] = 'stop'
+                    self.ignore_controller.clear()
+
                 elif self.current_mode == 'stop':
                     # stop robot after next movement and do nothing
-                    time.sleep(0.0001)  # limit loop time
                     LED.change_led(1,0)
                     LED.change_led(0,1)
+                    self.wait_idle('stop')  # block until something happens
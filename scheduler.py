@@ -0,0 +1,94 @@
+import logging
+import math
+import time
+from threading import Condition, Lock, Thread
+
+
+class TimerWheel:
+    """Hashed timer wheel: runs many cheap, periodic callbacks (like LED patterns) from a single thread.
+
+    Callbacks are sorted into `slots` buckets of `tick` seconds each, so scheduling and expiring a timer is O(1).
+    The thread blocks while no timer is pending. Callbacks run in the wheel thread and should return quickly."""
+
+    def __init__(self, tick: float = 0.05, slots: int = 64):
+        """
+        `tick`: resolution of the wheel in [s]
+        `slots`: number of buckets (timers further away than one turn wait for several turns)
+        """
+        self.tick = tick
+        self._slots = [[] for _ in range(slots)]
+        self._cursor = 0
+        self._pending = 0
+        self._cond = Condition()
+        self._thread = None
+
+    def schedule(self, delay: float, callback, *args):
+        """Calls `callback(*args)` after `delay` seconds (rounded up to full ticks)
+        `returns`: timer that can be passed to `cancel`"""
+        ticks = max(1, math.ceil(delay / self.tick - 1e-9))
+        n = len(self._slots)
+
+        with self._cond:
+            # entries: [remaining turns of the wheel, callback, args]
+            timer = [(ticks - 1) // n, callback, args]
+            self._slots[(self._cursor + ticks) % n].append(timer)
+            self._pending += 1
+
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='TimerWheel', daemon=True)
+                self._thread.start()
+
+            self._cond.notify()
+
+        return timer
+
+    def cancel(self, timer):
+        """Stops a timer returned by `schedule` (nothing happens if it already expired)"""
+        with self._cond:
+            timer[1] = None
+
+    def _run(self):
+        t_next = time.monotonic()
+
+        while True:
+            with self._cond:
+                while self._pending == 0:
+                    self._cond.wait()
+                    t_next = time.monotonic()  # the wheel was idle, restart the clock
+
+            t_next += self.tick
+            dt = t_next - time.monotonic()
+            if dt > 0:
+                time.sleep(dt)
+
+            with self._cond:
+                self._cursor = (self._cursor + 1) % len(self._slots)
+                slot = self._slots[self._cursor]
+
+                due = [timer for timer in slot if timer[0] == 0]
+                slot[:] = [timer for timer in slot if timer[0] > 0]
+                for timer in slot:
+                    timer[0] -= 1
+                self._pending -= len(due)
+
+            for _, callback, args in due:
+                if callback is None:
+                    continue  # cancelled
+                try:
+                    callback(*args)
+                except Exception as e:
+                    logging.exception(e)
+
+
+# Wheel shared by all periodic helpers of the program
+_wheel = None
+_wheel_lock = Lock()
+
+
+def shared_wheel() -> TimerWheel:
+    """returns the timer wheel shared by the whole program (created on first use)"""
+    global _wheel
+    with _wheel_lock:
+        if _wheel is None:
+            _wheel = TimerWheel()
+        return _wheel
@@ -1,6 +1,37 @@
 import numpy as np
-import pyquaternion as pyq
-from scipy.spatial.transform import Rotation, Slerp
+
+
+def euler_to_quat(euler):
+    """
+    Converts extrinsic xyz-euler angles [alpha, beta, gamma] to a unit quaternion [w, x, y, z]
+    (same convention as `Rotation.from_euler('xyz', ...)` of scipy)
+    """
+    ha, hb, hc = np.asarray(euler, dtype=float) / 2
+    ca, sa = np.cos(ha), np.sin(ha)
+    cb, sb = np.cos(hb), np.sin(hb)
+    cc, sc = np.cos(hc), np.sin(hc)
+
+    # q = q_z(gamma) * q_y(beta) * q_x(alpha)
+    return np.array([
+        cc * cb * ca + sc * sb * sa,
+        cc * cb * sa - sc * sb * ca,
+        cc * sb * ca + sc * cb * sa,
+        sc * cb * ca - cc * sb * sa,
+    ])
+
+
+def quat_to_euler(quats):
+    """
+    Converts unit quaternions [w, x, y, z] (array of shape (n, 4)) to extrinsic xyz-euler angles
+    `return`: array of shape (n, 3) with [alpha, beta, gamma]
+    """
+    w, x, y, z = np.asarray(quats, dtype=float).T
+
+    alpha = np.arctan2(2 * (w * x + y * z), 1 - 2 * (x ** 2 + y ** 2))
+    beta = np.arcsin(np.clip(2 * (w * y - x * z), -1, 1))
+    gamma = np.arctan2(2 * (w * z + x * y), 1 - 2 * (y ** 2 + z ** 2))
+
+    return np.column_stack((alpha, beta, gamma))
 
 
 def slerp_pose(pose0, pose1, steps: int = 2):
@@ -26,16 +57,26 @@ def slerp_pose(pose0, pose1, steps: int = 2):
     interp_points = np.column_stack((interp_x_pos, interp_y_pos, interp_z_pos))
 
     # extract rotations
-    r0 = [pose0[3], pose0[4], pose0[5]]
-    r1 = [pose1[3], pose1[4], pose1[5]]
-    rot = Rotation.from_euler('xyz', [r0, r1])  # define rotation
+    q0 = euler_to_quat([pose0[3], pose0[4], pose0[5]])
+    q1 = euler_to_quat([pose1[3], pose1[4], pose1[5]])
+
+    # take the short way around
+    dot = np.dot(q0, q1)
+    if dot < 0:
+        q1 = -q1
+        dot = -dot
 
-    # define start and end (nessescary for working with this library)
-    (start, end) = (0, 1)
-    rot_time = Slerp([start, end], rot)  # define rotation timing
-    interp_times = np.linspace(start, end, steps)  # define steps
-    interp_rots = rot_time(interp_times)  # create in between positions
-    interp_rots = interp_rots.as_euler('xyz')  # convert to euler angles
+    interp_times = np.linspace(0, 1, steps)[:, np.newaxis]  # define steps
+    theta = np.arccos(min(dot, 1.0))
+
+    if theta < 1e-9:
+        # (nearly) identical orientations, linear interpolation is exact enough
+        interp_quats = (1 - interp_times) * q0 + interp_times * q1
+        interp_quats /= np.linalg.norm(interp_quats, axis=1)[:, np.newaxis]
+    else:
+        interp_quats = (np.sin((1 - interp_times) * theta) * q0 + np.sin(interp_times * theta) * q1) / np.sin(theta)
+
+    interp_rots = quat_to_euler(interp_quats)  # convert to euler angles
 
     # combine poition and rotation arrays to one pose array
     interp_poses = np.column_stack((interp_points, interp_rots))
@@ -53,19 +94,11 @@ def angle_to_turn(pose0, pose1):
     """
 
     # extract rotations
-    r0 = [pose0[3], pose0[4], pose0[5]]
-    r1 = [pose1[3], pose1[4], pose1[5]]
-
-    rot = Rotation.from_euler('xyz', [r0, r1])  # define rotation
-    rotation_as_quat = rot.as_quat()  # convert to quaterions
-
-    # define quaternions in pyquaternion library format
-    quat1 = pyq.Quaternion(rotation_as_quat[1])
-    quat2 = pyq.Quaternion(rotation_as_quat[0])
+    q0 = euler_to_quat([pose0[3], pose0[4], pose0[5]])
+    q1 = euler_to_quat([pose1[3], pose1[4], pose1[5]])
 
     # Get the 3D difference between these two orientations
-    qd = quat1.conjugate * quat2
-    return qd.angle
+    return 2 * np.arccos(min(abs(np.dot(q0, q1)), 1.0))
 
 
 # Example-program
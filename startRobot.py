@@ -1,5 +1,6 @@
 import logging
 import os
+import time
 from sys import argv
 from threading import Thread
 
@@ -7,10 +8,10 @@ import LED
 import RPi.GPIO as GPIO
 from button import EXIT_SHUTDOWN
 from runtime import Runtime
-from main import robotType
+from main import robotType, robotCell
 
 # main program if this file get executed
-def startRobot():
+def startRobot(boot_time=None):
     logging.basicConfig(
         level=logging.DEBUG,
         format='%(asctime)-15s %(threadName)-15s %(levelname)-8s %(module)-15s:%(lineno)-8s %(message)s'
@@ -22,34 +23,38 @@ def startRobot():
         logging.exception("Need to supply robot type as command-line argument")
         raise
 
-    app = Runtime(robot_type)
+    t_init = time.time()
+    if robotCell:
+        from cell import RobotCell  # several robots, controlled via the web API only
+        app = RobotCell(robotCell)
+    else:
+        app = Runtime(robot_type, boot_time)
+    logging.info(f'Runtime initialised in {time.time() - t_init:.2f} s')
     exit_code = None
 
     try:
         
+        # blink patterns of the LEDs run on the shared timer wheel, no own thread needed
         LED.init_led()
-        # Run the blink LED in seperate thread so we can continue in the main programm
-        t2 = Thread(target=LED.blink_led)
-        t2.start()
         app_initialized = True
         app.loop()
            
     except KeyboardInterrupt:
         # shutdown python program gently
         logging.exception("Stopped with KeyboardInterrupt!")
-        app.program_stopped.set()
+        app.stop()
         # cleanup GPIOs (to avoid warning on next startup)
         GPIO.cleanup()
     except SystemExit as e:
         # shutdown via button
         logging.exception("Stopped via button press")
-        app.program_stopped.set()
+        app.stop()
         app.lcd.print_status('Shutting down...')
         exit_code = e.code
     except Exception as e:
         logging.exception(e)
     finally:
-        app.program_stopped.set()
+        app.stop()
         # cleanup GPIOs (to avoid warning on next startup)
         GPIO.cleanup()
 
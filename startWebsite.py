@@ -1,8 +1,14 @@
-from pickle import NONE
-from flask import Flask, render_template, redirect, url_for, request
+from flask import Flask, Response, render_template, redirect, url_for, request, jsonify, abort, g
 from flask_cors import CORS, cross_origin
-import numpy as np
+import math as m
+import gzip
 import logging
+import logging.handlers
+import os
+import queue
+import struct
+import time
+import telemetry
 from main import robotType
 
 # Do some definitions etc..
@@ -12,21 +18,92 @@ cors = CORS(app)            # needed for cross origin (to share data from websit
 
 app.config['CORS_HEADERS'] = 'Content-Type'
 
-global websiteInformation   # define global var as dict with important inputs from the website
-websiteInformation = {'mode': 'off','xCoord': 0, 'yCoord': 0, 'zCoord': 0,
-    'alphaPlus': 0, 'betaPlus': 0, 'gammaPlus': 0,
-    'alphaMinus': 0, 'betaMinus': 0, 'gammaMinus': 0 }
+from webstate import websiteInformation, set_mode, jog_inputs   # dict with important inputs from the website
 
 log = logging.getLogger('werkzeug') # keep back terminal output
 log.setLevel(logging.ERROR)         # keep back terminal output
 
+# serving
+SERVER_THREADS = 8                  # requests that are handled at the same time (without telemetry streams)
+STATIC_MAX_AGE = 12 * 3600          # browsers keep the static files (nipplejs, jQuery, ...) for this time [s]
+ACCESS_LOG = False                  # log every request (written by a background thread, not by the request)
+COMPRESSIBLE = ('text/', 'application/javascript', 'application/json', 'image/svg+xml')
+
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = STATIC_MAX_AGE
+
+_gzip_cache = {}                    # (path, modification time) -> compressed static file
+
+access_log = logging.getLogger('access')
+access_log.propagate = False
+_access_queue = queue.Queue()
+access_log.addHandler(logging.handlers.QueueHandler(_access_queue))
+_access_listener = logging.handlers.QueueListener(_access_queue, logging.StreamHandler())
+
+
+@app.before_request
+def start_timer():
+    g.t_st = time.perf_counter()
+
+@app.after_request
+def compress_static(response):
+    # static files are compressed once and then served from memory
+    if request.endpoint != 'static' or not response.mimetype.startswith(COMPRESSIBLE):
+        return response
+    response.vary.add('Accept-Encoding')    # also the uncompressed body must not be served to every client
+    if response.status_code != 200 or 'gzip' not in request.headers.get('Accept-Encoding', ''):
+        return response
+
+    path = os.path.join(app.static_folder, request.view_args['filename'].lstrip('/'))
+    try:
+        key = (path, os.path.getmtime(path))
+    except OSError:
+        return response
+
+    data = _gzip_cache.get(key)
+    if data is None:
+        with open(path, 'rb') as f:
+            data = gzip.compress(f.read())
+        _gzip_cache[key] = data
+
+    response.direct_passthrough = False
+    response.set_data(data)
+    response.headers['Content-Encoding'] = 'gzip'
+    etag, weak = response.get_etag()
+    if etag:
+        # the compressed body is another representation, a cache must not mix it up with the uncompressed one
+        response.set_etag(etag + '-gz', weak)
+        response.make_conditional(request)  # 304 if the client already has the compressed body
+    return response
+
+@app.after_request
+def log_request(response):
+    if ACCESS_LOG:
+        # only a record is queued here, formatting and writing happens in the listener thread
+        access_log.info('%s %s %s %.1f ms', request.method, request.path, response.status_code,
+                        (time.perf_counter() - g.t_st) * 1000)
+    return response
+
+
+def serve(host='0.0.0.0', port=5000):
+    """Serves the website with a production server (waitress: several threads, keep-alive). Falls back to the
+    threaded development server of flask if waitress is not installed"""
+    if ACCESS_LOG:
+        _access_listener.start()
+    try:
+        from waitress import serve as waitress_serve
+    except ImportError:
+        logging.warning('waitress is not installed, using the development server of flask')
+        app.run(debug=False, port=port, host=host, threaded=True)
+    else:
+        # every telemetry stream keeps a thread, the other requests get their own ones
+        waitress_serve(app, host=host, port=port, threads=SERVER_THREADS + telemetry.hub.max_clients)
+
 # start with defining websites
 
 # Home Website
 @app.route("/", methods=['GET', 'POST'])    # routing (set link, if directly called in html -> methods needed)
 def home():                                 # definde function for website
-    websiteInformation['mode'] = 'stop'     # set current mode
-    print(websiteInformation)
+    set_mode('stop')        # set current mode
     if request.method == 'POST':            # check post requests
    
         if request.form['btn'] == 'Demo Programme':         # In home.html are inputs defined as submit with 'name= "btn"'.
@@ -43,8 +120,7 @@ def home():                                 # definde function for website
 # Demo Website
 @app.route("/Demo")                             # routing (no direct call in html, so no methods)
 def demo():                                     # define function           
-    websiteInformation['mode'] = 'demo'         # set current mode to demo
-    print(websiteInformation)
+    set_mode('demo')            # set current mode to demo
     if request.method == 'POST':                # check if any button pressed
         if request.form['btn'] == 'Demo Programme':
             return redirect(url_for('demo'))
@@ -65,7 +141,7 @@ def demo():                                     # define function
 # Steuerung Website
 @app.route("/Steuerung", methods=['GET', 'POST'])       # routing -> Steuerung get called in html file -> methods needed
 def steuerung():                                        # define function 
-    websiteInformation['mode'] = 'manual'               # set current mode to steuerung
+    set_mode('manual')                  # set current mode to steuerung
 
     if request.method == 'POST':
         if request.form['btn'] == 'Demo Programme':
@@ -94,80 +170,112 @@ def steuerung():                                        # define function
 # the next functions are routed as "/Steuerung/inputs/...". There is no graphical website behind this
 # routes, but they exist for data exchange between website and flask app. The Structure is similar to 
 # graphical website, but there is no redirct to an HTML.
+# The inputs are only stored (latest wins, see webstate.JogInputs) and answered at once, the robot reads them
+# at its own rate. Optional timestamp of the client: {"t": ...} to drop updates that arrive out of order.
+# The control pages send everything at once to /Steuerung/inputs/jog, the single inputs are kept for other clients.
+
+JOG_VECTOR = struct.Struct('<d6f')  # binary jog vector: time of the client [ms], x, y, z, a, b, c
+
+def _jog_data():
+    data = request.get_json(force=True, silent=True)   # recive data from fetch
+    if data is None:
+        abort(400)
+    return data
+
+def _jog(name, values, data):
+    t = data.get('t') if isinstance(data, dict) else None
+    # NaN or inf would end up in the inverse kinematics of the main loop
+    try:
+        finite = all(m.isfinite(v) for v in values.values()) and (t is None or m.isfinite(t))
+    except TypeError:
+        finite = False
+    if not finite:
+        abort(400)
+    jog_inputs.update(request.remote_addr, name, values, t)
+    return '', 204
+
+@app.route("/Steuerung/inputs/jog", methods=['POST'])      # all axes in one request
+@cross_origin()
+def steuerungInputsJog():
+    # binary (application/octet-stream, see JOG_VECTOR) or JSON {"x", "y", "z", "a", "b", "c", "t"}
+    if request.mimetype == 'application/octet-stream':
+        body = request.get_data()
+        if len(body) != JOG_VECTOR.size:
+            abort(400)
+        t, x, y, z, a, b, c = JOG_VECTOR.unpack(body)
+    else:
+        data = _jog_data()
+        try:
+            x, y, z, a, b, c = (float(data.get(axis, 0)) for axis in 'xyzabc')
+            t = data.get('t')
+        except (AttributeError, TypeError, ValueError):
+            abort(400)
+
+    # rotations are split into the inputs of the plus and minus buttons
+    return _jog('jog', {'xCoord': x, 'yCoord': y, 'zCoord': z,
+                        'alphaPlus': max(a, 0), 'alphaMinus': max(-a, 0),
+                        'betaPlus': max(b, 0), 'betaMinus': max(-b, 0),
+                        'gammaPlus': max(c, 0), 'gammaMinus': max(-c, 0)}, {'t': t})
+
+def _button(name, key):
+    # the buttons send 1 (pressed) or 0 (released), either plain or as {"value": .., "t": ..}
+    data = _jog_data()
+    value = data.get('value', 0) if isinstance(data, dict) else data
+    return _jog(name, {key: value}, data)
 
 @app.route("/Steuerung/inputs/LJS", methods=['GET', 'POST'])    # Define route for Left JoyStick input
 @cross_origin()                                                 # allow data exchange via fetch methode
 def steuerungInputsLJS():                                       # define function
 
-    data = request.get_json(force=True)                          # recive data from fetch
-    websiteInformation['xCoord'] = (data['distance'] * np.cos(data['radian']))/100  # do some calculations
-    websiteInformation['yCoord'] = (data['distance'] * np.sin(data['radian']))/100  # and write to webSiteInformation
-    print(websiteInformation)
-    return NONE # there is no return so it is None
+    data = _jog_data()
+    try:
+        values = {'xCoord': data['distance'] * m.cos(data['radian']) / 100,   # do some calculations
+                  'yCoord': data['distance'] * m.sin(data['radian']) / 100}
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+    return _jog('LJS', values, data)
 
 @app.route("/Steuerung/inputs/RJS", methods=['GET', 'POST'])    # Right Joystick is similar to LJS
 @cross_origin()
 def steuerungInputsRJS():
 
-    data = request.get_json(force=True)
-    websiteInformation['zCoord'] = (data['distance'] * np.sin(data['radian']))/100 # only one calculation
-    print(websiteInformation)
-    return NONE
+    data = _jog_data()
+    try:
+        values = {'zCoord': data['distance'] * m.sin(data['radian']) / 100}  # only one calculation
+    except (KeyError, TypeError, ValueError):
+        abort(400)
+    return _jog('RJS', values, data)
 
 @app.route("/Steuerung/inputs/AP", methods=['GET', 'POST']) # now we have inputs from our rotation buttons if these
 @cross_origin()                                             # buttons existing. This is for positiv alpha rotation.
                                                             # Similar to joystick inputs, just without calcs
 def steuerungInputsAP():
-
-    data = request.get_json(force=True)
-    websiteInformation['alphaPlus'] = data
-    #print(websiteInformation)
-    return NONE
+    return _button('AP', 'alphaPlus')
 
 @app.route("/Steuerung/inputs/AM", methods=['GET', 'POST']) # negative alpha rotation
 @cross_origin()
 def steuerungInputsAM():
-
-    data = request.get_json(force=True)
-    websiteInformation['alphaMinus'] = data
-    #print(websiteInformation)
-    return NONE
+    return _button('AM', 'alphaMinus')
 
 @app.route("/Steuerung/inputs/BP", methods=['GET', 'POST']) # positiv beta rotation
 @cross_origin()
 def steuerungInputsBP():
-
-    data = request.get_json(force=True)
-    websiteInformation['betaPlus'] = data
-    #print(websiteInformation)
-    return NONE
+    return _button('BP', 'betaPlus')
 
 @app.route("/Steuerung/inputs/BM", methods=['GET', 'POST']) # negative beta rotation
 @cross_origin()
 def steuerungInputsBM():
-
-    data = request.get_json(force=True)
-    websiteInformation['betaMinus'] = data
-    #print(websiteInformation)
-    return NONE
+    return _button('BM', 'betaMinus')
 
 @app.route("/Steuerung/inputs/CP", methods=['GET', 'POST']) # positiv gamma rotation
 @cross_origin()
 def steuerungInputsCP():
-
-    data = request.get_json(force=True)
-    websiteInformation['gammaPlus'] = data
-    print(websiteInformation)
-    return NONE
+    return _button('CP', 'gammaPlus')
 
 @app.route("/Steuerung/inputs/CM", methods=['GET', 'POST']) # negativ gamma rotation
 @cross_origin()
 def steuerungInputsCM():
-
-    data = request.get_json(force=True)
-    websiteInformation['gammaMinus'] = data
-    #print(websiteInformation)
-    return NONE
+    return _button('CM', 'gammaMinus')
 
 # back to the normal websites, now we have options
 
@@ -182,6 +290,9 @@ def optionen():
 
         elif request.form['btn'] == 'Motoren stromlos':
             return redirect(url_for('off'))
+
+        elif request.form['btn'] == 'Geschwindigkeit einmessen':
+            return redirect(url_for('tuning'))
     
     else:
         return render_template('optionen.html')
@@ -189,15 +300,18 @@ def optionen():
 
 @app.route("/Homing") # if homing get called, there is an alert, the mode is set and the options site is called
 def homing():
-    websiteInformation['mode'] = 'calibrate'
-    print(websiteInformation)
+    set_mode('calibrate')
+    return redirect(url_for('optionen'))
+
+@app.route("/Tuning") # finds the fastest step delay of every motor (see tuning.py), similar to homing
+def tuning():
+    set_mode('tune')
     return redirect(url_for('optionen'))
     
 
 @app.route("/Off")  # turning motors off
 def off():
-    websiteInformation['mode'] = 'off'
-    print(websiteInformation)
+    set_mode('off')   
     if request.method == 'POST':
         if request.form['btn'] == 'Zurück':
             return redirect(url_for('home'))
@@ -212,6 +326,257 @@ def off():
         return render_template("offopt.html")
 
 
+# declarative demo programs (see program.py for the format)
+
+@app.route("/api/programs", methods=['GET', 'POST'])
+@cross_origin()
+def programs():
+    import program      # only needed if programs are managed
+
+    if request.method == 'POST':                        # upload of a new program as JSON
+        data = request.get_json(force=True)             # malformed JSON is answered with 400 by flask
+        try:
+            path = program.save(data)
+        except ValueError as e:                          # invalid program
+            return jsonify(error=str(e)), 400
+        logging.info(f'Stored demo program {path}')
+        return jsonify(name=data['name']), 201
+
+    return jsonify([p['name'] for p in program.programs_for(robotType)])   # programs that run on this robot
+
+
+# JSON API for movements: jobs are queued and executed by the robot in mode 'api' (see jobs.py)
+
+@app.route("/api/moves", methods=['POST'])
+@cross_origin()
+def moves():
+    import queue
+    from jobs import Job, job_queue
+
+    # {"type": "move" | "lin" | "arc" | "waypoints" | "program", parameters of the type}
+    data = request.get_json(force=True)
+    if not isinstance(data, dict):
+        return jsonify(error='Expected a JSON object with the type and parameters of the job'), 400
+    try:
+        job = job_queue.submit(Job(data.pop('type', 'move'), data))
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    except queue.Full:
+        return jsonify(error='Too many jobs waiting'), 503
+
+    set_mode('api')     # the robot executes the jobs in mode 'api'
+    return jsonify(job.to_dict()), 202, {'Location': url_for('job_status', job_id=job.id)}
+
+@app.route("/api/jobs/<int:job_id>", methods=['GET', 'DELETE'])
+@cross_origin()
+def job_status(job_id):
+    from jobs import job_queue
+
+    job = job_queue.cancel(job_id) if request.method == 'DELETE' else job_queue.get(job_id)
+    if job is None:
+        return jsonify(error=f'Unknown job {job_id}'), 404
+    return jsonify(job.to_dict())
+
+
+# several robots in one process, addressed by their id (see cell.py)
+
+def _robot_cell():
+    import cell
+    robot_cell = cell.current_cell()
+    if robot_cell is None:
+        abort(404, 'No robot cell configured')
+    return robot_cell
+
+@app.route("/api/robots")
+@cross_origin()
+def robots():
+    robot_cell = _robot_cell()
+    return jsonify([robot_cell.status(robot_id) for robot_id in robot_cell.robots])
+
+@app.route("/api/robots/<robot_id>", methods=['GET'])
+@cross_origin()
+def robot_status(robot_id):
+    robot_cell = _robot_cell()
+    if robot_id not in robot_cell.robots:
+        abort(404, f'Unknown robot {robot_id}')
+    return jsonify(robot_cell.status(robot_id))
+
+@app.route("/api/robots/<robot_id>/moves", methods=['POST', 'DELETE'])
+@cross_origin()
+def robot_moves(robot_id):
+    import queue
+    import program
+
+    robot_cell = _robot_cell()
+    if robot_id not in robot_cell.robots:
+        abort(404, f'Unknown robot {robot_id}')
+
+    if request.method == 'DELETE':                          # cancel the running and all waiting movements
+        robot_cell.cancel(robot_id)
+        return '', 204
+
+    # either a list of waypoints or the name of a demo program
+    data = request.get_json(force=True)
+    robot = robot_cell.robots[robot_id]
+    if not isinstance(data, dict):
+        return jsonify(error='Send "waypoints" or "program"'), 400
+    if isinstance(data.get('program'), str):
+        found = [p for p in program.programs_for(robot_cell.types[robot_id]) if p['name'] == data['program']]
+        if not found:
+            return jsonify(error=f"Unknown program {data['program']}"), 404
+        waypoints = program.waypoints(found[0], robot.homePose)
+    elif isinstance(data.get('waypoints'), list):
+        from jobs import check_waypoint
+        waypoints = data['waypoints']
+        if not all(isinstance(pos, list) and len(pos) >= robot.dof for pos in waypoints):
+            return jsonify(error=f'Every waypoint needs at least {robot.dof} values'), 400
+        try:
+            for pos in waypoints:
+                # poses of robots with less than 6 dof may be shorter (without a type)
+                check_waypoint(pos if len(pos) >= 6 else pos + [0.0] * (6 - len(pos)))
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+    else:
+        return jsonify(error='Send "waypoints" or "program"'), 400
+
+    try:
+        robot_cell.submit(robot_id, waypoints)
+    except queue.Full:
+        return jsonify(error='Too many movements waiting'), 503
+    return jsonify(robot_cell.status(robot_id)), 202
+
+
+@app.route("/api/robots/sync", methods=['POST'])
+@cross_origin()
+def robots_sync():
+    robot_cell = _robot_cell()
+
+    # {"targets": {robot id: pose}, "duration": [s] (optional)}: all robots arrive at the same time
+    data = request.get_json(force=True)
+    if not isinstance(data, dict) or not isinstance(data.get('targets'), dict) or not data['targets']:
+        return jsonify(error='Expected {"targets": {robot id: pose}, "duration": seconds (optional)}'), 400
+    for robot_id, pose in data['targets'].items():
+        if (not isinstance(pose, list) or not 3 <= len(pose) <= 6 or
+                not all(isinstance(v, (int, float)) and not isinstance(v, bool) and m.isfinite(v) for v in pose)):
+            return jsonify(error=f'The target of robot {robot_id} has to be a list of 3 to 6 numbers'), 400
+    duration = data.get('duration')
+    if duration is not None and (isinstance(duration, bool) or not isinstance(duration, (int, float))
+                                 or not m.isfinite(duration) or duration <= 0):
+        return jsonify(error='duration has to be a positive number'), 400
+    try:
+        duration = robot_cell.move_coordinated(data['targets'], duration)
+    except KeyError as e:
+        return jsonify(error=f'Unknown robot {e}'), 404
+    except RuntimeError as e:                               # a robot is still moving
+        return jsonify(error=str(e)), 409
+    except ValueError as e:                                 # also WorkspaceViolation
+        return jsonify(error=str(e)), 400
+    return jsonify(duration=duration), 202
+
+
+# G-code programs (see gcode.py for the supported commands)
+
+@app.route("/api/gcode", methods=['POST'])
+@cross_origin()
+def gcode_upload():
+    import gcode        # only needed if G-code is uploaded
+
+    # either as file of a form or as plain request body, both are stored without reading them into memory
+    upload = request.files.get('file')
+    if upload is not None:
+        path = gcode.save_upload(upload.stream, upload.filename)
+    else:
+        path = gcode.save_upload(request.stream, request.args.get('name'))
+
+    websiteInformation['gcodeFile'] = path
+    set_mode('gcode')   # the robot starts the program
+    return jsonify(file=path), 202
+
+
+# recording and replay of jog sessions (see recorder.py)
+
+@app.route("/api/recordings", methods=['GET', 'POST', 'DELETE'])
+@cross_origin()
+def recordings():
+    import recorder     # only needed if jog sessions are recorded
+
+    if request.method == 'POST':                            # start recording the manual movements
+        name = request.get_json(force=True).get('name')
+        if not name:
+            return jsonify(error='A recording needs a name'), 400
+        websiteInformation['recording'] = name
+        return jsonify(recording=name), 201
+
+    if request.method == 'DELETE':                          # stop recording
+        websiteInformation['recording'] = None
+        return '', 204
+
+    return jsonify(recordings=recorder.recordings(), recording=websiteInformation['recording'])
+
+@app.route("/api/recordings/<name>/replay", methods=['POST'])
+@cross_origin()
+def replay(name):
+    import recorder
+
+    if name not in recorder.recordings():
+        return jsonify(error=f'Unknown recording {name}'), 404
+
+    # optional: tolerance [mm] of the simplification, constant vel [cm/s] or speedup of the recorded timing
+    options = request.get_json(force=True, silent=True) or {}
+    if not isinstance(options, dict):
+        return jsonify(error='Expected a JSON object with the options of the replay'), 400
+    options = {key: options[key] for key in ('tolerance', 'vel', 'speedup') if options.get(key) is not None}
+    for key, value in options.items():
+        if isinstance(value, bool) or not isinstance(value, (int, float)) or not m.isfinite(value) or value <= 0:
+            return jsonify(error=f'{key} must be a positive number'), 400
+
+    websiteInformation['recording'] = None
+    websiteInformation['replay'] = dict(options, name=name)
+    set_mode('replay')
+    return jsonify(replay=name), 202
+
+
+# persistent configuration (see config.py): changes are validated, stored and applied between two movements
+
+@app.route("/api/config", methods=['GET', 'PATCH'])
+@cross_origin()
+def configuration():
+    import config       # only needed if the configuration is managed
+
+    if request.method == 'PATCH':                       # {"robots": {"quattro": {"step_delay": 0.003}}}
+        data = request.get_json(force=True)
+        try:
+            return jsonify(config.update(data))
+        except config.ConfigError as e:                 # the old configuration stays
+            return jsonify(error=str(e)), 400
+
+    return jsonify(config.current())
+
+@app.route("/api/config/reload", methods=['POST'])
+@cross_origin()
+def configuration_reload():
+    import config
+
+    try:
+        return jsonify(config.reload())             # after config.json was edited
+    except config.ConfigError as e:
+        return jsonify(error=str(e)), 400
+
+
+# server-sent events with the state of the robot (see telemetry.py)
+
+@app.route("/api/telemetry")
+@cross_origin()
+def telemetry_stream():
+    # optional: ?rate=<snapshots per second> to receive less than the rate of the robot
+    try:
+        events = telemetry.hub.stream(request.args.get('rate', type=float))
+    except RuntimeError as e:                               # too many clients
+        return jsonify(error=str(e)), 503
+    return Response(events, mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000, host='0.0.0.0')
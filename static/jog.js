@@ -0,0 +1,83 @@
+// Jog inputs of the control pages (Steuerung). The joysticks and rotation buttons only change the jog vector,
+// it is sent as one request on a fixed cadence: time [ms] (float64), then x, y, z, a, b, c (float32, little endian).
+// While an input is held the vector is repeated, the robot stops if it gets no update (dead-man on the server).
+
+var JOG_URL = '/Steuerung/inputs/jog';
+var JOG_INTERVAL = 50; // [ms] between two updates
+var JOG_AXES = ['x', 'y', 'z', 'a', 'b', 'c'];
+
+var jog = {x: 0, y: 0, z: 0, a: 0, b: 0, c: 0};
+var jogChanged = false;
+var pressed = {}; // rotation buttons that are held
+
+var jogSet = function(values) {
+    Object.assign(jog, values);
+    jogChanged = true;
+};
+
+var jogSend = function() {
+    var active = JOG_AXES.some(function (axis) { return jog[axis] != 0; });
+    if (!active && !jogChanged) {
+        return; // nothing to do
+    }
+    jogChanged = false;
+
+    var body = new DataView(new ArrayBuffer(8 + 4 * JOG_AXES.length));
+    body.setFloat64(0, Date.now(), true);
+    JOG_AXES.forEach(function (axis, i) {
+        body.setFloat32(8 + 4 * i, jog[axis], true);
+    });
+
+    fetch(JOG_URL, {
+        method: "POST",
+        headers: {'Content-Type': 'application/octet-stream'},
+        body: body.buffer
+    });
+};
+
+setInterval(jogSend, JOG_INTERVAL);
+
+// rotation buttons: 'AP' alpha +, 'AM' alpha -, 'BP', 'BM', 'CP', 'CM'
+var jogButtons = function() {
+    jogSet({
+        a: (pressed['AP'] || 0) - (pressed['AM'] || 0),
+        b: (pressed['BP'] || 0) - (pressed['BM'] || 0),
+        c: (pressed['CP'] || 0) - (pressed['CM'] || 0)
+    });
+};
+
+var startSend = function(val) {
+    const btn = document.getElementById(val);
+    btn.style.backgroundColor = "rgb(8, 11, 153)";
+    btn.style.color = 'white';
+    pressed[val] = 1;
+    jogButtons();
+};
+
+var stopSend = function(val) {
+    const btn = document.getElementById(val);
+    btn.style.backgroundColor = 'white';
+    btn.style.color = "rgb(8, 11, 153)";
+    delete pressed[val];
+    jogButtons();
+};
+
+// left joystick: x and y, right joystick: z
+var jogJoysticks = function(joystickL, joystickR) {
+    joystickL.on('move', function (evt, nipple) {
+        jogSet({
+            x: nipple.distance * Math.cos(nipple.angle.radian) / 100,
+            y: nipple.distance * Math.sin(nipple.angle.radian) / 100
+        });
+    });
+    joystickL.on('end', function (evt, nipple) {
+        jogSet({x: 0, y: 0});
+    });
+
+    joystickR.on('move', function (evt, nipple) {
+        jogSet({z: nipple.distance * Math.sin(nipple.angle.radian) / 100});
+    });
+    joystickR.on('end', function (evt, nipple) {
+        jogSet({z: 0});
+    });
+};
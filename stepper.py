@@ -1,4 +1,7 @@
-from time import sleep
+import heapq
+import itertools
+from threading import Condition, Event, Thread
+from time import perf_counter, sleep
 
 import RPi.GPIO as GPIO
 
@@ -64,3 +67,116 @@ def do_multi_step(pins2step: list, step_pins: list, dir_pins: list, directions=N
             #print(f'Multi Pin {i} low')
             GPIO.output(step_pins[i], GPIO.LOW)
     sleep(delay)
+
+
+class StepScheduler:
+    """Makes the step pulses of several robots in one thread.
+
+    Every robot hands over a movement as a sequence of ticks (which motors step in one step period). The thread
+    interleaves the pulses of all movements by their due time, so all robots of a cell move at the same time
+    without one pulse loop per robot."""
+
+    def __init__(self):
+        self._queue = []  # heap of (due time, number, movement)
+        self._count = itertools.count()  # keeps the order of movements with the same due time
+        self._cond = Condition()
+        self._thread = None
+
+    def run(self, ticks, step_pins: list, dir_pins: list, directions: list, delay: float = 0.02, timed=False):
+        """
+        Executes the ticks of one movement and blocks until all of its steps are done
+        `ticks`: iterable of lists with 0 or 1 for every motor (1: do a step in this step period)
+        `timed`: if True, `ticks` yields (time, list) and every step starts at its time (`time.perf_counter` clock)
+        instead of one step period after the last one. `delay` still is the shortest pulse and pause.
+        other parameters as in `do_multi_step`
+        """
+        # the direction pins belong to this robot only, they can be set right away
+        for i, direction in enumerate(directions):
+            GPIO.output(dir_pins[i], int(direction > 0))
+
+        movement = _Movement(iter(ticks), step_pins, delay, timed)
+        due = movement.next_due(perf_counter())
+        if due is None:
+            return  # no steps to make
+        self._push(due, movement)
+        movement.done.wait()
+
+        if movement.error is not None:
+            raise movement.error
+
+    def _push(self, due, movement):
+        with self._cond:
+            heapq.heappush(self._queue, (due, next(self._count), movement))
+
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name='StepScheduler', daemon=True)
+                self._thread.start()
+
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+
+                due, _, movement = self._queue[0]
+                dt = due - perf_counter()
+                if dt > 0:
+                    self._cond.wait(dt)  # wakes up early if another movement gets due sooner
+                    continue
+                heapq.heappop(self._queue)
+
+            try:
+                due = movement.pulse(due)
+            except Exception as e:
+                movement.error = e
+                due = None
+
+            if due is None:
+                movement.done.set()
+            else:
+                self._push(due, movement)
+
+
+class _Movement:
+    """state of one movement in the StepScheduler: alternates between rising and falling edges of the pulses"""
+    __slots__ = ('ticks', 'step_pins', 'delay', 'timed', 'step_motors', 'high', 'done', 'error')
+
+    def __init__(self, ticks, step_pins, delay, timed=False):
+        self.ticks = ticks
+        self.step_pins = step_pins
+        self.delay = delay
+        self.timed = timed
+        self.step_motors = None  # motors that step on the next rising edge
+        self.high = None  # pins that are high right now (None: next edge is a rising one)
+        self.done = Event()
+        self.error = None
+
+    def next_due(self, earliest):
+        """fetches the next tick
+        `returns`: due time of its rising edge (not before `earliest`) or None if there is no tick left"""
+        tick = next(self.ticks, None)
+        if tick is None:
+            return None
+        if self.timed:
+            t, self.step_motors = tick
+            return max(t, earliest)
+        self.step_motors = tick
+        return earliest
+
+    def pulse(self, due):
+        """makes the next edge of the pulses
+        `returns`: due time of the following edge or None if the movement is finished"""
+        if self.high is not None:
+            # set step-pins low again
+            for pin in self.high:
+                GPIO.output(pin, GPIO.LOW)
+            self.high = None
+            return self.next_due(due + self.delay)
+
+        # set step-pins high
+        self.high = [pin for pin, take_step in zip(self.step_pins, self.step_motors) if take_step > 0]
+        for pin in self.high:
+            GPIO.output(pin, GPIO.HIGH)
+        return due + self.delay
@@ -0,0 +1,97 @@
+import json
+import logging
+import threading
+import time
+
+RATE = 10  # snapshots per second
+MAX_CLIENTS = 8  # streams at the same time (every stream occupies a server thread)
+KEEPALIVE = 15  # a comment is sent after this time without data, so proxies keep the connection [s]
+
+
+class TelemetryHub:
+    """Publishes snapshots of the robot state as server-sent events to many clients.
+
+    One producer thread samples the source at a fixed rate and serializes every snapshot once. Clients only wait
+    for the next message, so dashboards do not add load to the robot. The source reads the motion state without
+    locks, it never blocks the motion thread. The producer only runs while clients are connected."""
+
+    def __init__(self, rate: float = RATE, max_clients: int = MAX_CLIENTS):
+        self.rate = rate
+        self.max_clients = max_clients
+        self._source = None
+        self._message = None  # last serialized snapshot
+        self._seq = 0  # number of the last snapshot
+        self._clients = 0
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def set_source(self, source):
+        """`source()` returns the current state as JSON serializable dict (called in the producer thread)"""
+        self._source = source
+
+    def stream(self, rate: float = None):
+        """
+        Subscribes a client (raises RuntimeError if too many clients are connected)
+        `rate`: maximum number of snapshots per second for this client (default: every snapshot)
+        `returns`: generator of server-sent events (bytes), the subscription ends when it gets closed
+        """
+        with self._cond:
+            if self._clients >= self.max_clients:
+                raise RuntimeError('Too many telemetry clients')
+            self._clients += 1
+
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='Telemetry', daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+
+        return self._events(1 / rate if rate else 0)
+
+    def _events(self, min_dt):
+        seq = self._seq
+        try:
+            while True:
+                with self._cond:
+                    new = self._cond.wait_for(lambda: self._seq != seq, timeout=KEEPALIVE)
+                    message, seq = self._message, self._seq
+
+                if not new:
+                    yield b': keep-alive\n\n'
+                    continue
+
+                yield message
+                if min_dt:
+                    time.sleep(min_dt)  # later snapshots are skipped, the client always gets the latest one
+        finally:
+            with self._cond:
+                self._clients -= 1
+
+    def _run(self):
+        t_next = time.monotonic()
+
+        while True:
+            with self._cond:
+                while self._clients == 0:
+                    self._cond.wait()
+                    t_next = time.monotonic()  # the producer was idle, restart the clock
+
+            source = self._source
+            if source is not None:
+                try:
+                    data = source()
+                    data['time'] = time.time()
+                    message = f'data: {json.dumps(data)}\n\n'.encode()
+                except Exception as e:  # a failing snapshot must not end the producer
+                    logging.exception(e)
+                else:
+                    with self._cond:
+                        self._message = message
+                        self._seq += 1
+                        self._cond.notify_all()
+
+            t_next = max(t_next + 1 / self.rate, time.monotonic())  # do not catch up on missed snapshots
+            time.sleep(max(0.0, t_next - time.monotonic()))  # a slow snapshot may have used up the period
+
+
+# hub of the program, the robot side sets the source and the website streams it
+hub = TelemetryHub()
@@ -0,0 +1,147 @@
+"""Time scaling and interpolation of a path in joint space.
+
+A path is the sequence of step targets of its closely interpolated poses (see `Robot.path_steps`). The time scaling
+decides how fast the robot moves along it: the path parameter s counts the segments, every segment of the path is
+one unit of s. The motor steps of segment i are D_i, so a motor makes |D_ij| * ds/dt steps per second and its
+acceleration is D_ij * d²s/dt² plus the change of D_ij between two segments times (ds/dt)².
+
+Like TOPP (time-optimal path parameterization), the fastest scaling is found with the squared path speed
+x = (ds/dt)² at the poses: its upper limits follow from the step rates and the change of direction at every pose,
+then a backward pass makes sure the robot can brake in time and a forward pass limits the acceleration from the
+start. The robot starts and stops at rest.
+
+Every segment is driven at a constant step rate, so the rates of the motors change at once at the poses. The
+durations are therefore stretched until no rate changes by more than the acceleration of its motor times the time
+between the middles of the two segments (`_limit_rate_changes`).
+
+Between the poses the motors follow a cubic spline in joint space (`spline_points`) instead of straight lines, so
+their velocity does not jump at the poses and fewer poses are needed on curved paths. The poses themselves can be
+interpolated on the same spline parameter (`spacing`), so they belong to the sampled steps.
+"""
+
+import numpy as np
+
+
+def time_optimal(start, targets, max_rates, max_accels=None, max_path_rate: float = None):
+    """
+    Fastest durations of the segments of a path that keep every motor within its limits
+    `start`: steps of the motors before the path
+    `targets`: steps of the poses of the path (one row per pose)
+    `max_rates`: steps per second every motor can make
+    `max_accels`: acceleration of every motor [steps/s²] (None: unlimited, every segment runs at its top speed)
+    `max_path_rate`: segments per second the path may not exceed (e.g. from a velocity on the path)
+    `returns`: array with the duration of every segment in [s]
+    """
+    deltas = np.diff(np.vstack((start, targets)), axis=0).astype(np.float64)
+    moved = np.abs(deltas)
+
+    with np.errstate(divide='ignore'):
+        # top speed of every segment (segments/s): its busiest motor runs at its limit
+        seg_rate = np.min(np.asarray(max_rates, dtype=np.float64) / moved, axis=1)
+    if max_path_rate is not None:
+        seg_rate = np.minimum(seg_rate, max_path_rate)
+    with np.errstate(divide='ignore'):
+        shortest = 1 / seg_rate  # 0 for segments without steps
+
+    if max_accels is None:
+        return shortest
+
+    max_accels = np.asarray(max_accels, dtype=np.float64)
+    if not np.all(np.isfinite(max_accels) & (max_accels >= np.finfo(np.float64).tiny)):
+        raise ValueError(f'The accelerations of the motors must be positive numbers, not {max_accels.tolist()}')
+    n = len(deltas)
+    with np.errstate(divide='ignore'):
+        # path acceleration every segment allows (segments/s²)
+        seg_accel = np.min(max_accels / moved, axis=1)
+        # at a pose the steps per segment change at once, at path speed ds/dt the motors accelerate by
+        # that change times (ds/dt)²
+        turn = np.min(max_accels / np.abs(np.diff(deltas, axis=0)), axis=1)
+
+    # limits of the squared path speed at the poses, at rest at both ends
+    x = np.zeros(n + 1)
+    x[1:-1] = np.minimum(np.minimum(seg_rate[:-1], seg_rate[1:]) ** 2, turn)
+
+    # backward pass: brake in time for every slower pose ahead, forward pass: accelerate from the start
+    for i in range(n - 1, -1, -1):
+        x[i] = min(x[i], x[i + 1] + 2 * seg_accel[i])
+    for i in range(n):
+        x[i + 1] = min(x[i + 1], x[i] + 2 * seg_accel[i])
+
+    speed = np.sqrt(x)
+    ends = speed[:-1] + speed[1:]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # constant path acceleration within a segment, a segment between two stops accelerates for one half
+        # and brakes for the other
+        durations = np.where(ends > 0, 2 / ends, 2 / np.sqrt(seg_accel))
+    return _limit_rate_changes(deltas, np.maximum(durations, shortest), max_accels)
+
+
+def _limit_rate_changes(deltas, durations, max_accels, passes: int = 200):
+    """
+    Stretches the `durations` of the segments until the step rate of no motor changes by more than its acceleration
+    allows between two segments (and at the start and end, which are at rest)
+    `deltas`: steps of every segment (one row per segment)
+    `passes`: passes with small stretches (close to the shortest durations), then larger ones finish quickly
+    `returns`: the stretched durations
+
+    Raises ValueError if the durations do not settle (e.g. with accelerations that are far too small)
+    """
+    durations = durations.copy()
+    # a larger stretch moves the slowdown on by about one segment per pass
+    for n in range(passes + len(deltas) + 10):
+        rates = np.zeros((len(deltas) + 2, deltas.shape[1]))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates[1:-1] = np.nan_to_num(deltas / durations[:, np.newaxis])
+        # time between the middles of two neighbouring segments (at rest before and after the path)
+        padded = np.concatenate(([0.0], durations, [0.0]))
+        gap = (padded[:-1] + padded[1:]) / 2
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.nan_to_num(np.max(np.abs(np.diff(rates, axis=0)) / max_accels, axis=1) / gap)
+        if ratio.max() <= 1 + 1e-9:
+            return durations
+        # stretching both segments of a pose by sqrt(ratio) lowers the change and lengthens the gap by that factor,
+        # smaller stretches spread the slowdown over the neighbouring poses
+        stretch = np.maximum(ratio, 1) ** (0.1 if n < passes else 0.5)
+        durations *= np.maximum(stretch[:-1], stretch[1:])
+    raise ValueError('The timing of the path does not keep the accelerations of the motors')
+
+
+def spline_points(points, parts, spacing=None):
+    """
+    Samples a cubic spline through `points` in joint space: Hermite segments with chord-length knots and the
+    tangent of the parabola through every point and its neighbours, so the velocity of the motors is continuous at
+    the points
+    `points`: steps at the start of the path and at its poses (one row per point)
+    `parts`: number of samples of every segment, the last sample of a segment is its end point
+    `spacing`: knot spacing of the segments (default: chord lengths of `points`). With the spacing of the steps,
+    other values of the points (e.g. the poses) are sampled at the same spline parameter as the steps
+    `returns`: array of the samples (without the first point)
+    """
+    points = np.asarray(points, dtype=np.float64)
+    parts = np.asarray(parts)
+    deltas = np.diff(points, axis=0)
+    h = np.linalg.norm(deltas, axis=1) if spacing is None else np.asarray(spacing, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slopes = np.where(h[:, np.newaxis] > 0, deltas / h[:, np.newaxis], 0.0)
+
+    tangents = np.empty_like(points)
+    tangents[0], tangents[-1] = slopes[0], slopes[-1]
+    if len(h) > 1:
+        spacing = (h[:-1] + h[1:])[:, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            tangents[1:-1] = np.where(spacing > 0,
+                                      (h[1:, np.newaxis] * slopes[:-1] + h[:-1, np.newaxis] * slopes[1:]) / spacing,
+                                      0.0)
+
+    seg = np.repeat(np.arange(len(deltas)), parts)  # segment of every sample
+    t = ((np.arange(len(seg)) - np.repeat(np.cumsum(parts) - parts, parts) + 1) / parts[seg])[:, np.newaxis]
+
+    # Hermite basis functions
+    t2, t3 = t ** 2, t ** 3
+    h00 = 2 * t3 - 3 * t2 + 1
+    h10 = t3 - 2 * t2 + t
+    h01 = -2 * t3 + 3 * t2
+    h11 = t3 - t2
+    width = h[seg, np.newaxis]
+    return (h00 * points[seg] + h10 * width * tangents[seg]
+            + h01 * points[seg + 1] + h11 * width * tangents[seg + 1])
@@ -0,0 +1,122 @@
+"""Automatic tuning of the step delay: finds the fastest speed and acceleration every motor follows without
+losing steps.
+
+Every arm starts at the edge of its light barrier (after `homing.homing_parallel`) and moves back and forth with an
+accelerating and decelerating profile, each round faster than the one before. After every round the edge is
+searched slowly: if the arm is not at the edge any more, the motor lost steps and the last round that passed sets
+the limit. The speed is tuned first (with a gentle acceleration), then the acceleration at that speed.
+"""
+
+import logging
+import math as m
+import time
+from time import sleep
+
+import RPi.GPIO as GPIO
+
+import stepper
+from homing import ramp_delay, towards_barrier
+
+TRAVEL = 30  # rotation of an arm for one back-and-forth move [deg]
+CYCLES = 3  # back-and-forth moves per round
+TOLERANCE = 3  # microsteps the edge may be off (hysteresis of the light barrier)
+SPEEDUP = 0.85  # factor of the delay from one round to the next
+MIN_DELAY = 0.00005  # shortest time between two microsteps that is tried [s]
+START_DELAY = 0.01  # delay of the first microstep while the speed is tuned (sets the acceleration) [s]
+PROBE_DELAY = 0.002  # delay between two microsteps while the edge is searched [s]
+SAFETY = 1.25  # margin between the found limits and the stored ones
+
+
+def edge_offset(step_pin, dir_pin, barrier_pin, towards, delay=PROBE_DELAY, max_steps=400):
+    """
+    Searches the edge of the light barrier slowly (a light barrier is blocked if its input is low)
+    `towards`: direction of the light barrier (> 0 -> positive)
+    `returns`: microsteps the arm had to move towards the barrier to reach its edge again
+    (positive: it ended short of the barrier, negative: it moved too far)
+    """
+    offset = 0
+    while GPIO.input(barrier_pin) == 0 and offset > -max_steps:  # inside: move out first
+        stepper.do_steps(step_pin, dir_pin, -towards, 1, delay / 2)
+        offset -= 1
+    while GPIO.input(barrier_pin) == 1 and offset < max_steps:
+        stepper.do_steps(step_pin, dir_pin, towards, 1, delay / 2)
+        offset += 1
+
+    if abs(offset) >= max_steps:
+        raise RuntimeError(f'Light barrier {barrier_pin} not found within {max_steps} steps')
+    return offset
+
+
+def move_profile(step_pin, dir_pin, direction, steps, start_delay, min_delay):
+    """makes `steps` steps with constant acceleration from standstill, top speed and deceleration to standstill"""
+    GPIO.output(dir_pin, int(direction > 0))
+
+    t_next = time.perf_counter()
+    for n in range(steps):
+        dt = t_next - time.perf_counter()
+        if dt > 0:
+            sleep(dt)
+        GPIO.output(step_pin, GPIO.HIGH)
+        GPIO.output(step_pin, GPIO.LOW)
+        # a late step does not make the next ones come faster (that would test a higher speed)
+        t_next = max(t_next, time.perf_counter()) + ramp_delay(min(n, steps - 1 - n), start_delay, min_delay)
+
+
+def passes(step_pin, dir_pin, barrier_pin, towards, steps, start_delay, min_delay, cycles=CYCLES,
+           tolerance=TOLERANCE):
+    """moves an arm back and forth from the edge of its light barrier and checks whether it returns to the edge"""
+    for _ in range(cycles):
+        move_profile(step_pin, dir_pin, -towards, steps, start_delay, min_delay)
+        move_profile(step_pin, dir_pin, towards, steps, start_delay, min_delay)
+
+    offset = edge_offset(step_pin, dir_pin, barrier_pin, towards)  # back at the edge for the next round
+    logging.debug(f'delay {min_delay * 1e3:.3f} ms, start delay {start_delay * 1e3:.2f} ms: {offset} steps off')
+    return abs(offset) <= tolerance
+
+
+def tune_axis(robot, axis, travel=TRAVEL, start_delay=START_DELAY):
+    """
+    Tunes one arm of `robot`, it has to be at the edge of its light barrier
+    `travel`: rotation of the arm for the back-and-forth moves in [deg]
+    `returns`: delay between two full steps [s] and acceleration [full steps/s²], both with the safety margin.
+    None if the arm already loses steps at the current step delay of the robot
+    """
+    pins = (robot.stepPins[axis], robot.dirPins[axis], robot.lightbarrierpins[axis])
+    towards = towards_barrier(robot.dof)[axis]
+    steps = int(m.radians(travel) / robot.stepAngle)
+
+    delay = 2 * robot.stepDelay  # time between two steps (the pulse is high and low for the step delay)
+    if not passes(*pins, towards, steps, start_delay, delay):
+        return None
+
+    # top speed with a gentle acceleration
+    while delay * SPEEDUP >= MIN_DELAY and passes(*pins, towards, steps, start_delay, delay * SPEEDUP):
+        delay *= SPEEDUP
+
+    # acceleration at that speed (a shorter first step accelerates harder)
+    while start_delay * SPEEDUP > delay and passes(*pins, towards, steps, start_delay * SPEEDUP, delay):
+        start_delay *= SPEEDUP
+
+    # ramp_delay: the n-th step is made after start_delay * sqrt(n) -> acceleration 2 / start_delay² [steps/s²]
+    step_delay = delay / 2 * SAFETY / robot.stepperMode
+    acceleration = 2 / start_delay ** 2 / SAFETY * robot.stepperMode
+    logging.info(f'Axis {axis}: {step_delay * 1e3:.3f} ms per full step, {acceleration:.0f} full steps/s²')
+    return step_delay, acceleration
+
+
+def tune(robot, travel=TRAVEL):
+    """
+    Tunes all arms of `robot` one after another (the arms have to be at the edges of their light barriers).
+    Raises RuntimeError if an arm already loses steps at the current step delay
+    `returns`: settings for the configuration: 'axis_step_delays', 'axis_accelerations' and 'step_delay' (of the
+    slowest arm, all arms move with it)
+    """
+    delays, accelerations = [], []
+    for axis in range(robot.dof):
+        result = tune_axis(robot, axis, travel)
+        if result is None:
+            raise RuntimeError(f'Axis {axis} loses steps at the current step delay, check the mechanics')
+        delays.append(result[0])
+        accelerations.append(result[1])
+
+    return {'axis_step_delays': delays, 'axis_accelerations': accelerations, 'step_delay': max(delays)}
@@ -0,0 +1,81 @@
+# Shared state between the website and the robot runtime.
+# Kept in its own module so the robot side does not have to import flask.
+
+import threading
+import time
+
+JOG_TIMEOUT = 0.5   # dead-man: a jog input without update for this time counts as released [s]
+JOG_MAX_RATE = 50   # updates per second of one input of one client, faster ones are dropped (not releases)
+
+global websiteInformation   # define global var as dict with important inputs from the website
+websiteInformation = {'mode': 'off','xCoord': 0, 'yCoord': 0, 'zCoord': 0,
+    'alphaPlus': 0, 'betaPlus': 0, 'gammaPlus': 0,
+    'alphaMinus': 0, 'betaMinus': 0, 'gammaMinus': 0,
+    'gcodeFile': None,      # G-code program to run in mode 'gcode'
+    'recording': None,      # name of the jog session that gets recorded in mode 'manual'
+    'replay': None }        # recording to replay in mode 'replay': {'name', 'tolerance', 'vel', 'speedup'}
+
+_mode_listeners = []    # functions that get called with the new mode if the website changes it
+
+
+def add_mode_listener(callback):
+    """registers `callback(mode)` to be called whenever the website selects a mode"""
+    _mode_listeners.append(callback)
+
+
+def set_mode(mode: str):
+    """sets the mode chosen on the website and delivers it to all listeners"""
+    websiteInformation['mode'] = mode
+    for callback in list(_mode_listeners):
+        callback(mode)
+
+
+class JogInputs:
+    """Jog inputs of the website clients. Updates are only stored (latest wins per client and input), the robot
+    reads the current values at its own rate. Inputs that were not updated for `timeout` count as released, so a
+    lost release can not leave the robot jogging (the website repeats held inputs)."""
+
+    def __init__(self, timeout: float = JOG_TIMEOUT, max_rate: float = JOG_MAX_RATE):
+        self.timeout = timeout
+        self.min_interval = 1 / max_rate
+        self._inputs = {}   # (client, input) -> (time of the client, time received, values)
+        self._lock = threading.Lock()
+
+    def update(self, client, name: str, values: dict, t: float = None) -> bool:
+        """
+        stores the values of input `name` (e.g. 'LJS') of `client`
+        `values`: keys of websiteInformation -> value
+        `t`: timestamp of the client, updates older than the stored one are dropped (arrived out of order)
+        `returns`: False if the update was dropped
+        """
+        now = time.monotonic()
+        released = not any(values.values())
+        with self._lock:
+            last = self._inputs.get((client, name))
+            if last is not None:
+                if t is not None and last[0] is not None and t <= last[0]:
+                    return False
+                if now - last[1] < self.min_interval and not released:
+                    return False
+            self._inputs[(client, name)] = (t, now, values)
+        return True
+
+    def apply(self, inputs: dict) -> dict:
+        """returns a copy of `inputs` with the current jog values (of the client that updated an input last)"""
+        inputs = dict(inputs)
+        now = time.monotonic()
+        latest = {}     # input -> (time received, values)
+        with self._lock:
+            for key, (_, received, values) in list(self._inputs.items()):
+                if now - received > self.timeout:
+                    del self._inputs[key]  # dead-man: released
+                elif key[1] not in latest or received > latest[key[1]][0]:
+                    latest[key[1]] = (received, values)
+
+        for _, values in latest.values():
+            inputs.update(values)
+        return inputs
+
+
+# jog inputs of the website, read by the runtime in mode 'manual'
+jog_inputs = JogInputs()
@@ -0,0 +1,178 @@
+import hashlib
+import itertools
+import logging
+import os
+import time
+
+import numpy as np
+
+from Robot import WorkspaceViolation
+
+# Maps are computed once per geometry and stored here, so a reboot only has to load them
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workspace_cache')
+
+# Part of the key of the stored maps, increased when the sampling changes (e.g. a new reachability check)
+MAP_VERSION = 3
+
+# Maps already loaded in this process, keyed by robot type, geometry and sampling grid
+_maps = {}
+
+
+class WorkspaceMap:
+    """Voxelized map of the reachable workspace of a robot.
+
+    The pose space of the robot (x, y, z and the rotations it can drive) is sampled on a regular grid and
+    every grid cell is marked as reachable if the inverse kinematics has a solution at its center. The
+    occupancy is kept as a packed bitset, so `is_reachable` is a single table lookup. `reachable` only solves the
+    inverse kinematics near the border of the workspace, where the cells are an approximation. Jog movements
+    are limited with `limit`, which keeps the current pose at the border."""
+
+    def __init__(self, lower, resolution, shape, bits):
+        """
+        `lower`: pose of the first grid cell (one value per sampled axis)
+        `resolution`: distance between two grid cells per axis ([mm] or [rad])
+        `shape`: number of grid cells per axis
+        `bits`: occupancy of all cells as packed bitset (C-order)
+        """
+        self.lower = np.asarray(lower, dtype=float)
+        self.resolution = np.asarray(resolution, dtype=float)
+        self.shape = tuple(int(n) for n in shape)
+        self.bits = np.asarray(bits, dtype=np.uint8)
+        self.ndim = len(self.shape)
+
+        # multiplier of each axis index for the flat index
+        self._strides = [int(np.prod(self.shape[i + 1:])) for i in range(self.ndim)]
+
+    @classmethod
+    def for_robot(cls, robot, bounds=None):
+        """Returns the workspace map of `robot`. The map is only sampled if it was not computed for this
+        geometry before (neither in this process nor on disk).
+
+        `robot`: instance of a Robot subclass
+        `bounds`: sampling grid as list of (min, max, resolution) for every degree of freedom.
+        Defaults to `robot.workspaceBounds`"""
+        if bounds is None:
+            bounds = robot.workspaceBounds
+        bounds = [tuple(float(v) for v in b) for b in bounds[:robot.dof]]
+
+        key = hashlib.sha1(repr((MAP_VERSION, type(robot).__name__, list(robot.geometricParams), bounds))
+                           .encode()).hexdigest()
+
+        if key in _maps:
+            return _maps[key]
+
+        path = os.path.join(CACHE_DIR, f'{type(robot).__name__.lower()}_{key[:16]}.npz')
+        try:
+            with np.load(path) as data:
+                ws_map = cls(data['lower'], data['resolution'], data['shape'], data['bits'])
+        except (OSError, KeyError, ValueError):
+            ws_map = cls.sample(robot, bounds)
+            try:
+                os.makedirs(CACHE_DIR, exist_ok=True)
+                ws_map.save(path)
+            except OSError as e:
+                logging.warning(f'Could not store workspace map: {e}')
+        else:
+            logging.info(f'Loaded workspace map from {path}')
+
+        _maps[key] = ws_map
+        return ws_map
+
+    @classmethod
+    def sample(cls, robot, bounds):
+        """Samples the inverse kinematics of `robot` over a grid and builds the map from it.
+        `bounds`: list of (min, max, resolution) for every sampled axis"""
+        t_st = time.time()
+        lower = [b[0] for b in bounds]
+        resolution = [b[2] for b in bounds]
+        axes = [np.arange(lo, hi + res / 2, res) for lo, hi, res in bounds]
+        shape = tuple(len(ax) for ax in axes)
+
+        occupancy = np.zeros(shape, dtype=bool)
+        for idx in itertools.product(*(range(n) for n in shape)):
+            pose = [ax[i] for ax, i in zip(axes, idx)]
+            occupancy[idx] = cls._solvable(robot, pose)
+
+        if not occupancy.any():
+            raise WorkspaceViolation('No reachable pose inside the sampled workspace bounds!')
+
+        logging.info(f'Sampled workspace map with {occupancy.size} cells ({occupancy.sum()} reachable) '
+                     f'in {time.time() - t_st:.1f} s')
+
+        return cls(lower, resolution, shape, np.packbits(occupancy.ravel()))
+
+    @staticmethod
+    def _solvable(robot, pose):
+        """checks if the inverse kinematics of the robot has a solution for `pose`"""
+        try:
+            angles = robot.inv_kinematic(list(pose))
+        except (WorkspaceViolation, ValueError, ZeroDivisionError):
+            return False
+        return bool(np.all(np.isfinite(angles)))
+
+    def save(self, path):
+        np.savez_compressed(path, lower=self.lower, resolution=self.resolution, shape=np.array(self.shape),
+                            bits=self.bits)
+
+    def _cell(self, pose):
+        """returns the grid index of every axis for `pose` (may lie outside of the grid)"""
+        return [int(round((float(pose[i]) - self.lower[i]) / self.resolution[i])) for i in range(self.ndim)]
+
+    def _flat(self, cell):
+        return sum(i * s for i, s in zip(cell, self._strides))
+
+    def _bit(self, flat):
+        return (self.bits[flat >> 3] >> (7 - (flat & 7))) & 1
+
+    def is_reachable(self, pose) -> bool:
+        """Checks if `pose` lies in a reachable cell. Poses outside of the sampled grid are unreachable.
+        `pose`: list [x, y, z, alpha, beta, gamma] (only the sampled axes are used)"""
+        cell = self._cell(pose)
+        if any(i < 0 or i >= n for i, n in zip(cell, self.shape)):
+            return False
+        return bool(self._bit(self._flat(cell)))
+
+    def reachable(self, pose, robot=None) -> bool:
+        """Checks if `pose` is reachable. Inside the workspace and far outside of it the map decides, only if the cell
+        of `pose` or one of its neighbours lies on the border the inverse kinematics of `robot` is solved.
+        `pose`: list [x, y, z, alpha, beta, gamma] (only the sampled axes are used)
+        `robot`: robot of the map (without it the map decides everywhere, like `is_reachable`)"""
+        cell = self._cell(pose)
+        if any(i < 0 or i >= n for i, n in zip(cell, self.shape)):
+            return False
+        inside = self._bit(self._flat(cell))
+        if robot is None:
+            return bool(inside)
+
+        for axis in range(self.ndim):
+            for step in (-1, 1):
+                neighbour = list(cell)
+                neighbour[axis] += step
+                # cells outside of the grid are unreachable
+                if 0 <= neighbour[axis] < self.shape[axis]:
+                    border = self._bit(self._flat(neighbour)) != inside
+                else:
+                    border = bool(inside)
+                if border:
+                    return self._solvable(robot, pose)
+        return bool(inside)
+
+    def limit(self, pose, target, robot=None):
+        """Limits a jog movement from `pose` to `target` to the workspace. Every axis that would leave the workspace
+        keeps its value from `pose` while the other axes move, so the pose slides along the border instead of
+        jumping to a grid cell. If no axis can move, `pose` is returned unchanged.
+        `pose`, `target`: lists [x, y, z, alpha, beta, gamma]
+        `robot`: checks the poses near the border exactly with the inverse kinematics of the robot (see
+        `reachable`)"""
+        if self.reachable(target, robot):
+            return list(target)
+
+        limited = list(pose)
+        for i, value in enumerate(target):
+            if value == limited[i]:
+                continue
+            trial = list(limited)
+            trial[i] = value
+            if self.reachable(trial, robot):
+                limited = trial
+        return limited